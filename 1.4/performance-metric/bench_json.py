@@ -0,0 +1,126 @@
+"""
+File: bench_json.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Benchmark the JSON providers on the typical bodies, the encode and the decode time.
+    Run it to pick config.json.provider.
+
+    - predict: the predict request body, small.
+    - predict+eeg: the body with the seconds of EEG, like the clients sending the data.
+    - train+eeg: the body with the minutes of EEG records, like the db returns.
+
+    The error response is measured too, the str(body) of the old Message.error_response
+    versus the summary of the current one.
+
+    Usage (from the 1.4 folder):
+        python performance-metric/bench_json.py --repeat 20 --channels 8
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from util.log import summarize
+from util.json_provider import NumpyJSONProvider, OrjsonProvider, orjson
+from util.data_access.seed import synthetic_eeg
+
+SRATE = 250
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def make_body(seconds: int, channels: int, as_records: bool) -> dict:
+    '''The request body, with the seconds of the EEG if seconds > 0.'''
+    body = dict(name='name', org_id='orgId', user_id='userId', project_name='projectName',
+                label_content='{"type":254,"time":1747646185506}')
+    if seconds <= 0:
+        return body
+    x = synthetic_eeg(np.random.default_rng(0), channels, seconds, attention=True)
+    if as_records:
+        t0 = 1747646185506
+        body['data'] = [dict(create_time=t0 + i * 1000, data=x[:, i * SRATE:(i + 1) * SRATE].tolist())
+                        for i in range(seconds)]
+    else:
+        body['data'] = x.tolist()
+    return body
+
+
+def median_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - tic)
+    return float(np.median(times))
+
+
+def bench(provider, body: dict, repeat: int) -> dict:
+    s = provider.dumps(body)
+    return dict(size=len(s),
+                encode=median_time(lambda: provider.dumps(body), repeat),
+                decode=median_time(lambda: provider.loads(s), repeat))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    from loguru import logger
+    logger.remove()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--channels', type=int, default=8)
+    parser.add_argument('--predict-seconds', type=int, default=10)
+    parser.add_argument('--train-seconds', type=int, default=120)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {'stdlib': DefaultJSONProvider(app),
+                 'numpy': NumpyJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+
+    bodies = {'predict': make_body(0, args.channels, False),
+              'predict+eeg': make_body(args.predict_seconds, args.channels, False),
+              'train+eeg': make_body(args.train_seconds, args.channels, True)}
+
+    print(f'{"body":>12} {"provider":>8} {"size (KB)":>10} {"encode (ms)":>12} {"decode (ms)":>12}')
+    for body_name, body in bodies.items():
+        for name, provider in providers.items():
+            row = bench(provider, body, args.repeat)
+            print(f'{body_name:>12} {name:>8} {row["size"] / 1024:10.1f} {row["encode"] * 1000:12.3f} {row["decode"] * 1000:12.3f}')
+
+    print()
+    print(f'{"error body":>12} {"size (KB)":>10} {"cost (ms)":>10}')
+    body = bodies['train+eeg']
+    for name, func in [('str', lambda: str(body)),
+                       ('summary', lambda: str(summarize(body)))]:
+        print(f'{name:>12} {len(func()) / 1024:10.1f} {median_time(func, args.repeat) * 1000:10.3f}')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
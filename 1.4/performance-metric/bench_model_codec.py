@@ -0,0 +1,147 @@
+"""
+File: bench_model_codec.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Benchmark the codecs of the model files, the size versus the save and the load time.
+    Run it against the model storage to pick config.model.compress,
+    the load time on the NAS is the one that matters for the cold predicts.
+
+    The load is warm by default, the file is just written and it is read from the page cache.
+    The --cold load reads a separate copy of the file after its pages are dropped
+    by posix_fadvise(DONTNEED), so the storage is read. The posix_fadvise is not on Windows,
+    the cold column is empty there, and on the network shares only the local cache is dropped.
+
+    The zstd is not a joblib compressor, so it is not in the options.
+    The lz4 is skipped if the lz4 package is not installed.
+
+    Usage (from the 1.4 folder):
+        python performance-metric/bench_model_codec.py --dir D:/BCIProject/model/bench --repeat 5
+        python performance-metric/bench_model_codec.py --dir /mnt/nas/model/bench --cold
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from util.machine_learning.model_storage.model_cache import ChecksumSystem
+
+CODECS = [0, 'lz4', 'lz4:9', 'zlib:1', 'zlib:3', 'zlib:6', 'gzip:3', 'bz2:3', 'lzma:3']
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def make_model(n_channels: int = 64, n_features: int = 4096):
+    '''The synthetic model, the smooth spatial filters and the noisy classifier weights.'''
+    rng = np.random.default_rng(0)
+    t = np.linspace(0, 1, n_features)
+    return {
+        'filters': np.array([np.sin(2 * np.pi * (k + 1) * t) for k in range(n_channels)]),
+        'weights': rng.standard_normal((n_features, 16)).astype(np.float32),
+        'mean': np.zeros(n_features),
+        'classes': ['low', 'high'],
+    }
+
+
+def drop_cache(path: Path) -> bool:
+    '''Drop the pages of the file from the page cache, False if it is not supported.'''
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        # The dirty pages are not dropped, write them first
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def bench(codec, model: dict, directory: Path, repeat: int, cold: bool = False):
+    try:
+        cs = ChecksumSystem(compress=codec)
+    except (AssertionError, ImportError) as e:
+        return None
+    path = directory.joinpath(f'{str(codec).replace(":", "-")}.model')
+    # The copy is never read warm, its pages are dropped before every read
+    cold_path = path.with_suffix('.cold.model')
+    save, load, load_cold = [], [], []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        checksum = cs.save_model({'codec': str(codec)}, model, path)
+        save.append(time.perf_counter() - tic)
+        tic = time.perf_counter()
+        cs.read_model(path, checksum)
+        load.append(time.perf_counter() - tic)
+        if cold:
+            shutil.copyfile(path, cold_path)
+            if drop_cache(cold_path):
+                tic = time.perf_counter()
+                cs.read_model(cold_path, checksum)
+                load_cold.append(time.perf_counter() - tic)
+    cold_path.unlink(missing_ok=True)
+    return dict(codec=str(codec),
+                size=path.stat().st_size,
+                save=np.median(save),
+                load=np.median(load),
+                load_cold=np.median(load_cold) if load_cold else None)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    from loguru import logger
+    logger.remove()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=None,
+                        help='The directory on the storage to test, default is the temp dir.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--channels', type=int, default=64)
+    parser.add_argument('--features', type=int, default=4096)
+    parser.add_argument('--cold', action='store_true',
+                        help='Also load the copy whose pages are dropped from the page cache.')
+    args = parser.parse_args()
+
+    if args.cold and not hasattr(os, 'posix_fadvise'):
+        print('The posix_fadvise is not supported, only the warm load is measured')
+
+    directory = Path(args.dir or tempfile.mkdtemp())
+    directory.mkdir(parents=True, exist_ok=True)
+    model = make_model(args.channels, args.features)
+
+    print(f'{"codec":>8} {"size (KB)":>10} {"save (ms)":>10} {"load (ms)":>10} {"cold (ms)":>10}')
+    for codec in CODECS:
+        row = bench(codec, model, directory, args.repeat, args.cold)
+        if row is None:
+            print(f'{str(codec):>8} {"unavailable":>10}')
+            continue
+        cold = '' if row['load_cold'] is None else f'{row["load_cold"] * 1000:10.2f}'
+        print(f'{row["codec"]:>8} {row["size"] / 1024:10.1f} {row["save"] * 1000:10.2f} {row["load"] * 1000:10.2f} {cold:>10}')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,83 @@
+"""
+File: bench_nonlinear_features.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Benchmark the fast nonlinear features against nolds.
+    The windows are 5 s, 30 s and 5 min of one 250 Hz channel.
+    The nolds sampen is O(N^2), it is skipped for the windows longer than --nolds-max-seconds.
+
+    Usage (from the 1.4 folder):
+        python performance-metric/bench_nonlinear_features.py --nolds-max-seconds 30
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import nolds
+from util.machine_learning.nonlinear_features import sample_entropy, dfa, higuchi_fd
+
+SRATE = 250
+WINDOWS = {'5s': 5, '30s': 30, '5min': 300}
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def timeit(func, *args, **kwargs):
+    tic = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - tic
+
+
+def bench(seconds: float, nolds_max_seconds: float):
+    x = np.cumsum(np.random.randn(int(SRATE * seconds))) * \
+        0.1 + np.random.randn(int(SRATE * seconds))
+    run_nolds = seconds <= nolds_max_seconds
+    rows = [
+        ('sampen', timeit(sample_entropy, x),
+         timeit(nolds.sampen, x) if run_nolds else None),
+        ('dfa', timeit(dfa, x),
+         timeit(nolds.dfa, x, fit_exp='poly') if run_nolds else None),
+        ('hfd', timeit(higuchi_fd, x), None),
+    ]
+    return rows
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nolds-max-seconds', type=float, default=30)
+    args = parser.parse_args()
+
+    print(f'{"window":>8} {"feature":>8} {"fast(s)":>10} {"nolds(s)":>10} {"speedup":>8}')
+    for name, seconds in WINDOWS.items():
+        for feature, fast, slow in bench(seconds, args.nolds_max_seconds):
+            slow_str = f'{slow:10.4f}' if slow else f'{"-":>10}'
+            speedup = f'{slow / fast:8.1f}' if slow else f'{"-":>8}'
+            print(f'{name:>8} {feature:>8} {fast:10.4f} {slow_str} {speedup}')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,302 @@
+"""
+File: clients.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Clients of the load test, they replay the /predict and /train requests.
+
+    - The payloads are synthetic for the seeded subjects, or recorded as the JSON lines of {route, body},
+      or the bodies in the dumps of the server.
+    - The open loop sends the requests on the Poisson arrivals of the given rate,
+      the latency is measured from the scheduled time, so the queueing is not hidden.
+    - The closed loop keeps the given number of requests in flight.
+    - The clients run in the threads, or in the processes when the client itself is the bottleneck.
+
+    The server is launched by launcher.py, or run it against the running server:
+
+        python performance-metric/clients.py --url http://localhost:7384 --subjects 10 --rate 20 --duration 30
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import json
+import time
+import random
+import itertools
+import joblib
+import argparse
+import threading
+import numpy as np
+import requests
+
+from pathlib import Path
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+
+# The label types of the seeded subjects
+LABEL_TYPES = (1, 2)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def subjects_of(n: int, project_name: str = 'attention') -> list:
+    '''The subjects seeded by util/data_access/seed.py.'''
+    return [dict(org_id='org', user_id=f'user-{i}', project_name=project_name, name=f'name-{i}')
+            for i in range(n)]
+
+
+def synthetic_payloads(subjects: list, label_types: tuple = LABEL_TYPES) -> dict:
+    '''The /predict and /train bodies of the subjects, {route: [body, ...]}.'''
+    predict = []
+    for subject in subjects:
+        for t in label_types:
+            label = json.dumps({'type': t, 'time': int(time.time() * 1000)})
+            predict.append(dict(subject, label_content=label))
+    return {'predict': predict, 'train': [dict(s) for s in subjects]}
+
+
+def recorded_payloads(path: Path) -> dict:
+    '''The recorded bodies, the JSON lines of {route, body}.'''
+    payloads = {}
+    for line in open(path, encoding='utf-8'):
+        if line.strip():
+            record = json.loads(line)
+            payloads.setdefault(record['route'], []).append(record['body'])
+    return payloads
+
+
+def dumped_payloads(dumps_dir: Path) -> dict:
+    '''The bodies in the dumps of the server, <route>-dump.*.dump.'''
+    payloads = {}
+    for path in Path(dumps_dir).rglob('*-dump.*.dump'):
+        route = path.name.split('-dump.')[0]
+        try:
+            body = joblib.load(path)['body']
+        except Exception:
+            continue
+        payloads.setdefault(route, []).append(body)
+    return payloads
+
+
+def parse_mix(mix: str) -> dict:
+    '''Parse the route mix, 'predict=0.9,train=0.1'.'''
+    output = {}
+    for item in mix.split(','):
+        route, _, weight = item.partition('=')
+        output[route.strip()] = float(weight or 1)
+    return output
+
+
+class Client:
+    '''The HTTP client, every thread has its keep-alive session.'''
+
+    def __init__(self, urls: list, timeout: float = 60):
+        self.urls = urls
+        self.timeout = timeout
+        self.local = threading.local()
+        # The next() of the count is atomic, the threads share it
+        self.count = itertools.count()
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def post(self, route: str, body: dict) -> int:
+        # Round robin across the server processes
+        url = self.urls[next(self.count) % len(self.urls)]
+        try:
+            response = self.session().post(
+                f'{url}/{route}', json=body, timeout=self.timeout)
+            return response.status_code
+        except requests.RequestException:
+            return -1
+
+
+class Workload:
+    '''Pick the route by the mix and the body of the route at random.'''
+
+    def __init__(self, payloads: dict, mix: dict, seed: int = 0):
+        self.routes = [r for r in mix if payloads.get(r)]
+        assert self.routes, f'No payloads for the routes: {list(mix)}'
+        self.weights = [mix[r] for r in self.routes]
+        self.payloads = payloads
+        self.rng = random.Random(seed)
+
+    def next(self) -> tuple:
+        route = self.rng.choices(self.routes, self.weights)[0]
+        return route, self.rng.choice(self.payloads[route])
+
+
+def open_loop(urls: list, payloads: dict, mix: dict, rate: float, duration: float, max_workers: int = 256, seed: int = 0) -> list:
+    '''
+    Send the requests on the Poisson arrivals.
+
+    :return list: the records, (route, scheduled time, latency, status code).
+    '''
+    client = Client(urls)
+    workload = Workload(payloads, mix, seed)
+    rng = np.random.default_rng(seed)
+    records = []
+
+    def send(route, body, scheduled):
+        status = client.post(route, body)
+        records.append((route, scheduled, time.perf_counter() - scheduled, status))
+
+    start = time.perf_counter()
+    scheduled = start
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            scheduled += rng.exponential(1 / rate)
+            if scheduled - start > duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            route, body = workload.next()
+            executor.submit(send, route, body, scheduled)
+    return records
+
+
+def closed_loop(urls: list, payloads: dict, mix: dict, concurrency: int, duration: float, seed: int = 0) -> list:
+    '''
+    Keep the concurrency requests in flight.
+
+    :return list: the records, (route, scheduled time, latency, status code).
+    '''
+    client = Client(urls)
+    records = []
+    stop = time.perf_counter() + duration
+
+    def loop(i):
+        workload = Workload(payloads, mix, seed + i)
+        while time.perf_counter() < stop:
+            route, body = workload.next()
+            tic = time.perf_counter()
+            status = client.post(route, body)
+            records.append((route, tic, time.perf_counter() - tic, status))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(loop, range(concurrency)))
+    return records
+
+
+def _run_worker(kwargs: dict) -> list:
+    if kwargs.pop('mode') == 'open':
+        return open_loop(**kwargs)
+    return closed_loop(**kwargs)
+
+
+def run_clients(urls: list, payloads: dict, mix: dict, duration: float, rate: float = None, concurrency: int = 8, processes: int = 0, seed: int = 0) -> list:
+    '''
+    Run the clients, the open loop if the rate is given, otherwise the closed loop.
+
+    :param processes int: the number of the client processes, 0 for the threads in this process.
+    :return list: the records.
+    '''
+    def kwargs_of(i, n):
+        kwargs = dict(urls=urls, payloads=payloads, mix=mix,
+                      duration=duration, seed=seed + i * 1000)
+        if rate:
+            return dict(kwargs, mode='open', rate=rate / n)
+        return dict(kwargs, mode='closed', concurrency=max(1, concurrency // n))
+
+    if processes <= 0:
+        return _run_worker(kwargs_of(0, 1))
+    with Pool(processes) as pool:
+        parts = pool.map(_run_worker, [kwargs_of(i, processes)
+                                       for i in range(processes)])
+    return [r for part in parts for r in part]
+
+
+def report(records: list, duration: float) -> dict:
+    '''The latency percentiles in ms and the throughput per route, and of all.'''
+    output = {}
+    groups = {'all': records}
+    for r in records:
+        groups.setdefault(r[0], []).append(r)
+    for route, group in groups.items():
+        ok = np.array([r[2] for r in group if r[3] == 200]) * 1000
+        output[route] = dict(count=len(group),
+                             errors=sum(r[3] != 200 for r in group),
+                             throughput=len(ok) / duration,
+                             p50=float(np.percentile(ok, 50)) if len(ok) else None,
+                             p95=float(np.percentile(ok, 95)) if len(ok) else None,
+                             p99=float(np.percentile(ok, 99)) if len(ok) else None,
+                             mean=float(ok.mean()) if len(ok) else None)
+    return output
+
+
+def print_report(summary: dict, title: str = ''):
+    if title:
+        print(f'---- {title} ----')
+    print(f'{"route":>10} {"count":>7} {"errors":>7} {"req/s":>8} {"p50":>9} {"p95":>9} {"p99":>9}')
+    for route, row in summary.items():
+        def ms(v):
+            return f'{v:9.1f}' if v is not None else f'{"-":>9}'
+        print(f'{route:>10} {row["count"]:7d} {row["errors"]:7d} {row["throughput"]:8.1f} {ms(row["p50"])} {ms(row["p95"])} {ms(row["p99"])}')
+
+
+def parser_of() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--subjects', type=int, default=10,
+                        help='The number of the seeded subjects for the synthetic payloads.')
+    parser.add_argument('--project-name', default='attention')
+    parser.add_argument('--payloads', type=Path, default=None,
+                        help='The recorded payloads, the JSON lines of {route, body}.')
+    parser.add_argument('--dumps', type=Path, default=None,
+                        help='Replay the bodies in the dumps directory of the server.')
+    parser.add_argument('--mix', default='predict=0.9,train=0.1')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='The open loop arrival rate in req/s, the closed loop if not given.')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='The requests in flight of the closed loop.')
+    parser.add_argument('--client-processes', type=int, default=0,
+                        help='The number of the client processes, 0 for the threads.')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def payloads_of(args) -> dict:
+    if args.payloads:
+        return recorded_payloads(args.payloads)
+    if args.dumps:
+        return dumped_payloads(args.dumps)
+    return synthetic_payloads(subjects_of(args.subjects, args.project_name))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(parents=[parser_of()])
+    parser.add_argument('--url', nargs='+', default=['http://localhost:7384'])
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Save the report as JSON.')
+    args = parser.parse_args()
+
+    records = run_clients(args.url, payloads_of(args), parse_mix(args.mix),
+                          args.duration, args.rate, args.concurrency,
+                          args.client_processes, args.seed)
+    summary = report(records, args.duration)
+    print_report(summary)
+    if args.output:
+        json.dump(summary, open(args.output, 'w'), indent=2)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
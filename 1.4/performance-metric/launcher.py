@@ -0,0 +1,215 @@
+"""
+File: launcher.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Launch the real server.py on the seeded sqlite stand-in, and run the load test against it.
+    The concurrency modes are compared in the sweep:
+
+    - The waitress threads of every server process, --threads 4 8 16.
+    - The number of the server processes on the consecutive ports, the clients round robin across them, --server-processes 1 2.
+    - The clients in the threads or in the processes, --client-processes.
+
+    The project is made in the temp dir, so the models, the dumps and the logs do not touch the production ones.
+    Every subject is trained once before the test, and its models are inserted into the sqlite model table,
+    so the /predict finds them in the db, not only in the latest-model index.
+
+    Usage (from the 1.4 folder):
+        python performance-metric/launcher.py --threads 4 8 16 --server-processes 1 2 --rate 20 --duration 30
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import requests
+
+from pathlib import Path
+from omegaconf import OmegaConf
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(Path(__file__).parent))
+
+from clients import LABEL_TYPES, parser_of, payloads_of, parse_mix, run_clients, report, print_report, subjects_of
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def prepare_project(directory: Path, subjects: int, seconds: int, project_name: str) -> Path:
+    '''
+    Seed the sqlite db and write the config of the load test.
+
+    :return Path: the config path.
+    '''
+    from util.data_access.seed import seed
+
+    conf = OmegaConf.load(ROOT.joinpath('config.yaml'))
+    conf.project.dir = directory.as_posix()
+    conf.db.backend = 'sqlite'
+    conf.db.sqlite.path = 'load-test.sqlite'
+    # The log is not the thing to be measured
+    conf.log.console_level = 'WARNING'
+    conf.log.level = 'INFO'
+
+    # The seeded project in the lookup tables of the registry
+    conf.registry.projects = {project_name: {'predict': list(LABEL_TYPES),
+                                             'train': [list(LABEL_TYPES)]}}
+
+    seed(directory.joinpath(conf.db.sqlite.path),
+         subjects=subjects, seconds=seconds, project_name=project_name)
+    path = directory.joinpath('config.yaml')
+    OmegaConf.save(conf, path)
+    return path
+
+
+def start_server(config: Path, port: int, threads: int) -> subprocess.Popen:
+    '''Start the server.py by waitress, in the project dir.'''
+    env = dict(os.environ,
+               BCI_CONFIG=config.as_posix(),
+               PYTHONPATH=os.pathsep.join([str(ROOT), os.environ.get('PYTHONPATH', '')]))
+    return subprocess.Popen([sys.executable, '-m', 'waitress',
+                             f'--threads={threads}',
+                             '--host=127.0.0.1',
+                             f'--port={port}',
+                             'server:app'],
+                            cwd=config.parent,
+                            env=env,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url: str, timeout: float = 120):
+    '''Wait for the server to answer /echo and finish its warm up.'''
+    stop = time.time() + timeout
+    while time.time() < stop:
+        try:
+            if requests.get(f'{url}/ready', timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f'The server is not ready: {url}')
+
+
+def train_all(url: str, subjects: list, db_path: Path):
+    '''
+    Train every subject once, and insert the returned models into the sqlite model table,
+    like the upstream service does, so the /predict finds them after the latest-model index expires.
+    It raises when any subject is not trained, the sweep would measure the error responses.
+    '''
+    from util.data_access.sqlite_db import SQLiteDB
+
+    db = SQLiteDB(db_path)
+    failed = []
+    with requests.Session() as session:
+        for subject in subjects:
+            try:
+                response = session.post(f'{url}/train', json=subject, timeout=600)
+                models = response.json()['body']['models'] if response.status_code == 200 else None
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                print(f'Train failed: {subject}, {e}')
+                models = None
+            else:
+                if not models:
+                    print(f'Train failed: {subject}, {response.status_code}')
+            if not models:
+                failed.append(subject)
+                continue
+            db.insert_model(models, **subject)
+    db.pool.close()
+    if failed:
+        raise RuntimeError(f'Train failed on {len(failed)} of {len(subjects)} subjects')
+
+
+def run_case(config: Path, args, threads: int, server_processes: int, payloads: dict, mix: dict) -> dict:
+    ports = [args.port + i for i in range(server_processes)]
+    urls = [f'http://127.0.0.1:{port}' for port in ports]
+    servers = [start_server(config, port, threads) for port in ports]
+    try:
+        for url in urls:
+            wait_ready(url)
+        records = run_clients(urls, payloads, mix, args.duration, args.rate,
+                              args.concurrency, args.client_processes, args.seed)
+        return report(records, args.duration)
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(parents=[parser_of()])
+    parser.add_argument('--threads', type=int, nargs='+', default=[4, 8, 16],
+                        help='The waitress threads of every server process.')
+    parser.add_argument('--server-processes', type=int, nargs='+', default=[1],
+                        help='The number of the server processes.')
+    parser.add_argument('--seconds', type=int, default=120,
+                        help='The seconds of the seeded EEG per subject.')
+    parser.add_argument('--port', type=int, default=7390)
+    parser.add_argument('--project-dir', type=Path, default=None,
+                        help='The project dir of the load test, default is the temp dir.')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Save the reports as JSON.')
+    args = parser.parse_args()
+
+    directory = args.project_dir or Path(tempfile.mkdtemp(prefix='bci-load-'))
+    directory.mkdir(parents=True, exist_ok=True)
+    config = prepare_project(directory, args.subjects,
+                             args.seconds, args.project_name)
+    print(f'Project: {directory}')
+
+    # Train the subjects on the single server first
+    server = start_server(config, args.port, 4)
+    try:
+        wait_ready(f'http://127.0.0.1:{args.port}')
+        train_all(f'http://127.0.0.1:{args.port}',
+                  subjects_of(args.subjects, args.project_name),
+                  directory.joinpath(OmegaConf.load(config).db.sqlite.path))
+    finally:
+        server.terminate()
+        server.wait()
+
+    payloads = payloads_of(args)
+    mix = parse_mix(args.mix)
+    results = []
+    for server_processes in args.server_processes:
+        for threads in args.threads:
+            title = f'server processes: {server_processes}, waitress threads: {threads}, client processes: {args.client_processes}'
+            summary = run_case(config, args, threads,
+                               server_processes, payloads, mix)
+            print_report(summary, title)
+            results.append(dict(server_processes=server_processes,
+                                threads=threads,
+                                client_processes=args.client_processes,
+                                rate=args.rate,
+                                concurrency=args.concurrency,
+                                report=summary))
+
+    if args.output:
+        json.dump(results, open(args.output, 'w'), indent=2)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,344 @@
+"""
+File: micro_bench.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Micro benchmarks of the ML and the storage hot paths, on the synthetic EEG.
+    The results are saved per commit in performance-metric/results/<commit>.json (ignored by git),
+    or in the --output dir, and compared between two commits, so the regressions show up in numbers.
+    The logs of the util modules are not written, the benchmark prints its own table.
+
+    The cases of the model packages are skipped when the packages are not found.
+    The report cases use the unreachable ollama host unless --ollama is given,
+    so only the figures and the PDF are measured.
+
+    Usage (from the 1.4 folder):
+        python performance-metric/micro_bench.py
+        python performance-metric/micro_bench.py --filter storage --repeat 10
+        python performance-metric/micro_bench.py --compare results/abc1234.json results/def5678.json
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import numpy as np
+
+from pathlib import Path
+from datetime import datetime
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+RESULTS_DIR = Path(__file__).parent.joinpath('results')
+SRATE = 250
+# Whether the report cases call the ollama server
+OLLAMA = False
+
+# name -> setup, the setup returns the function to be timed
+CASES = {}
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def case(name: str):
+    '''Register the case, the decorated setup returns the function to be timed.'''
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+class Skip(Exception):
+    '''The case is not runnable in this environment.'''
+
+
+def synthetic_records(seconds: int = 60, channels: int = 8, seed: int = 0) -> list:
+    '''The EEG records like the db returns, one record per second.'''
+    from util.data_access.seed import synthetic_eeg
+    rng = np.random.default_rng(seed)
+    x = synthetic_eeg(rng, channels, seconds, attention=True)
+    t0 = int(time.time() * 1000) - seconds * 1000
+    return [dict(create_time=t0 + i * 1000, data=x[:, i * SRATE:(i + 1) * SRATE].tolist())
+            for i in range(seconds)]
+
+
+def synthetic_labels(seconds: int = 60, block_seconds: int = 10, types: tuple = (1, 2)) -> list:
+    t0 = int(time.time() * 1000) - seconds * 1000
+    return [dict(type=types[(i // block_seconds) % 2], time=t0 + i * 1000)
+            for i in range(0, seconds, block_seconds)]
+
+
+def synthetic_model(n_features: int = 2048) -> dict:
+    rng = np.random.default_rng(0)
+    return dict(name='Synthetic',
+                weights=rng.standard_normal((n_features, 16)),
+                mean=rng.standard_normal(n_features),
+                classes=[1, 2])
+
+
+@case('storage.save_model')
+def _save_model():
+    from util.machine_learning.model_storage.model_cache import ChecksumSystem
+    cs = ChecksumSystem()
+    model = synthetic_model()
+    path = Path(tempfile.mkdtemp(), 'a.model')
+    return lambda: cs.save_model({'name': 'bench'}, model, path)
+
+
+@case('storage.read_model')
+def _read_model():
+    from util.machine_learning.model_storage.model_cache import ChecksumSystem
+    cs = ChecksumSystem()
+    path = Path(tempfile.mkdtemp(), 'a.model')
+    checksum = cs.save_model({'name': 'bench'}, synthetic_model(), path)
+    return lambda: cs.read_model(path, checksum)
+
+
+@case('storage.cache_insert')
+def _cache_insert():
+    from util.machine_learning.model_storage.model_cache import ModelCache
+    mc = ModelCache()
+    # The own buffer, not the class-level one, and it is cleared per round
+    mc.buffer = {}
+    model = synthetic_model()
+    keys = iter(range(10 ** 9))
+
+    def run():
+        mc.insert(model, {'name': 'bench'}, f'bench-{next(keys)}')
+    run.reset = mc.buffer.clear
+    return run
+
+
+@case('eeg.concatenate')
+def _concatenate():
+    records = synthetic_records(60)
+    return lambda: np.concatenate([np.array(r['data']) for r in records], axis=1)
+
+
+def _model_case(import_model):
+    try:
+        Model = import_model()
+    except ImportError as e:
+        raise Skip(e)
+    return Model
+
+
+@case('model.attention.train')
+def _attention_train():
+    def imp():
+        from util.machine_learning.attention_calculator.attention_model import AttentionModel
+        return AttentionModel
+    model = _model_case(imp)()
+    data, labels = synthetic_records(120), synthetic_labels(120)
+    return lambda: model.train(data, labels)
+
+
+@case('model.attention.predict')
+def _attention_predict():
+    def imp():
+        from util.machine_learning.attention_calculator.attention_model import AttentionModel
+        return AttentionModel
+    model = _model_case(imp)()
+    trained = model.train(synthetic_records(120), synthetic_labels(120))
+    data = synthetic_records(10, seed=1)
+    label = json.dumps({'type': 1, 'time': int(time.time() * 1000)})
+    return lambda: model.predict(trained, data, label)
+
+
+@case('model.visual_focus.train')
+def _visual_focus_train():
+    def imp():
+        from util.machine_learning.visual_focus_predictor.visual_focus_model import VISUAL_FOCUS_MODEL
+        return VISUAL_FOCUS_MODEL
+    model = _model_case(imp)()
+    data, labels = synthetic_records(120), synthetic_labels(120)
+    return lambda: model.train(data, labels)
+
+
+@case('model.visual_focus.predict')
+def _visual_focus_predict():
+    def imp():
+        from util.machine_learning.visual_focus_predictor.visual_focus_model import VISUAL_FOCUS_MODEL
+        return VISUAL_FOCUS_MODEL
+    model = _model_case(imp)()
+    trained = model.train(synthetic_records(120), synthetic_labels(120))
+    data = synthetic_records(10, seed=1)
+    label = json.dumps({'type': 1, 'time': int(time.time() * 1000)})
+    return lambda: model.predict(trained, data, label)
+
+
+def _report_case(report_name: str, n: int):
+    try:
+        from util.auto_report import main
+    except Exception as e:
+        # The fonts and the assets are required on import
+        raise Skip(e)
+    if not OLLAMA:
+        # Refused at once, the report falls back to the placeholder text
+        main.ollama_host = 'http://127.0.0.1:9'
+    path = Path(tempfile.mkdtemp(), f'{report_name}.pdf')
+    return lambda: main.generate_report(path, report_name, [None] * n)
+
+
+@case('report.car')
+def _report_car():
+    return _report_case('car', 6)
+
+
+@case('report.mouse')
+def _report_mouse():
+    return _report_case('mouse', 3)
+
+
+def measure(func, repeat: int, min_time: float = 0.2) -> dict:
+    '''
+    Time the func, the fast ones are called in the loops of at least min_time.
+    The reset of the func is called before every round, out of the timing.
+
+    :return dict: the per-call seconds.
+    '''
+    reset = getattr(func, 'reset', lambda: None)
+    func()
+    number = 1
+    while True:
+        reset()
+        tic = time.perf_counter()
+        for _ in range(number):
+            func()
+        cost = time.perf_counter() - tic
+        if cost >= min_time or number >= 1 << 20:
+            break
+        number *= 10
+    times = [cost / number]
+    for _ in range(repeat - 1):
+        reset()
+        tic = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - tic) / number)
+    reset()
+    return dict(min=min(times),
+                median=statistics.median(times),
+                mean=statistics.mean(times),
+                stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+                number=number,
+                repeat=repeat)
+
+
+def commit_of() -> str:
+    '''The short commit, with -dirty for the uncommitted changes.'''
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = subprocess.check_output(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, text=True).strip()
+        return f'{commit}-dirty' if dirty else commit
+    except Exception:
+        return 'unknown'
+
+
+def run(pattern: str, repeat: int) -> dict:
+    results = {}
+    for name, setup in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            func = setup()
+            results[name] = measure(func, repeat)
+            print(f'{name:>28} {results[name]["median"] * 1000:10.3f} ms')
+        except Skip as e:
+            results[name] = dict(skipped=str(e))
+            print(f'{name:>28} {"skipped":>10} ({e})')
+    return dict(commit=commit_of(),
+                date=datetime.now().isoformat(),
+                python=platform.python_version(),
+                numpy=np.__version__,
+                machine=f'{platform.system()} {platform.machine()} {platform.processor()}',
+                results=results)
+
+
+def silence_logs():
+    '''
+    Import the util logs with their file sinks in the temp dir, and remove all the sinks.
+    The util modules are imported lazily by the cases, their import adds no sink again.
+    '''
+    from loguru import logger
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        import util.log
+        import util.machine_learning.log
+        import util.auto_report.util.log
+    finally:
+        os.chdir(cwd)
+    logger.remove()
+
+
+def compare(base: dict, head: dict, threshold: float = 1.1):
+    '''Print the ratios of the medians, head / base, the ones beyond threshold are marked.'''
+    print(f'{base["commit"]} -> {head["commit"]}')
+    for name, b in base['results'].items():
+        h = head['results'].get(name)
+        if not h or 'median' not in b or 'median' not in h:
+            continue
+        ratio = h['median'] / b['median']
+        mark = 'REGRESSION' if ratio > threshold else (
+            'improved' if ratio < 1 / threshold else '')
+        print(f'{name:>28} {b["median"] * 1000:10.3f} {h["median"] * 1000:10.3f} ms {ratio:6.2f}x {mark}')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    silence_logs()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filter', default='',
+                        help='Run the cases whose names contain it.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--ollama', action='store_true',
+                        help='Include the ollama call in the report cases.')
+    parser.add_argument('--compare', type=Path, nargs=2, default=None,
+                        metavar=('BASE', 'HEAD'))
+    parser.add_argument('--threshold', type=float, default=1.1)
+    parser.add_argument('--output', type=Path, default=RESULTS_DIR,
+                        help='The dir of the result files.')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(json.load(open(args.compare[0])),
+                json.load(open(args.compare[1])), args.threshold)
+        sys.exit(0)
+
+    OLLAMA = args.ollama
+    result = run(args.filter, args.repeat)
+    args.output.mkdir(parents=True, exist_ok=True)
+    path = args.output.joinpath(f'{result["commit"]}.json')
+    json.dump(result, open(path, 'w'), indent=2)
+    print(f'Saved to {path}')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
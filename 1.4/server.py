@@ -18,66 +18,240 @@ Functions:
 
 # %% ---- 2025-05-19 ------------------------
 # Requirements and constants
+import os
 import sys
 import time
+import atexit
 
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, Response, request, jsonify
 from pathlib import Path
 from omegaconf import OmegaConf
 
 # Local util
 from util.io import MyReport, DirSystem
-from util.log import logger
+from util.json_provider import use_json_provider
+from util.response import register_compression, requested_fields, project
+from util.log import logger, summarize, ROUTE_LOGS, configure as configure_log
 from util.known_errors import ERRORS
+from util.metrics import METRICS, timed, stage, set_labels, wrap
 
 # Machine learning
 from util.machine_learning.known_errors import TrainingError, PredictingError
 from util.machine_learning.model_storage.model_cache import ModelCache, ChecksumSystem
+from util.machine_learning.feature_store import FeatureStore, use_feature_store
 from util.machine_learning.tellme_which_model_to_use import tellme_predict_model, tellme_train_model, checkout_model
+from util.machine_learning.model_registry import ModelRegistry, latest_of, model_type_of, model_time_of
+from util.machine_learning.model_storage.latest_index import LatestModelIndex
+from util.machine_learning.model_storage.shared_cache import SharedModelArena
+from util.machine_learning.model_storage.gc import sharded_path
+from util.machine_learning.inference_pool import InferencePool
+from util.machine_learning.model_storage.warmup import ModelWarmup, list_from_index, list_from_mtime, list_from_db
 from util.machine_learning.attention_calculator.attention_model import AttentionModel
 
 # Auto report
 from util.auto_report.main import generate_report
 
-# Local db
-try:
-    import db.init_connection
-    from db.model_module.model_func import get_model
-    from db.predict_module.predict_func import get_predict_data
-    from db.train_data_module.train_data_func import get_train_data
-    from db.train_label_module.train_label_func import get_train_label
-except:
-    pass
+# Data access
+from util.data_access.backend import load_backend
 
-CONF = OmegaConf.load('./config.yaml')
+# The load tests run the server with their own config
+CONF = OmegaConf.load(os.environ.get('BCI_CONFIG', './config.yaml'))
+configure_log(CONF.log)
+
+# Local db, the db package or the sqlite stand-in
+DB = load_backend(CONF)
+get_model = DB.get_model
+get_predict_data = DB.get_predict_data
+get_train_data = DB.get_train_data
+get_train_label = DB.get_train_label
+
+# The I/O bound steps of a request run concurrently in the pool
+FETCHER = ThreadPoolExecutor(max_workers=CONF.db.fetch_workers,
+                             thread_name_prefix='fetch')
 
 DS = DirSystem()
 DS.load_config(CONF)
 
 MC = ModelCache()
-CS = ChecksumSystem()
-
-MR = MyReport(DS.report_dir)
+CS = ChecksumSystem(compress=CONF.model.compress, model_dir=DS.model_dir)
+if CONF.model.shared.enabled:
+    MC.use_shared(SharedModelArena(
+        DS.model_dir.joinpath(CONF.model.shared.subdir)))
+
+# The (project_name, label type) -> model lookup tables
+MREG = ModelRegistry(tellme_train_model, tellme_predict_model, checkout_model)
+MREG.build(OmegaConf.to_container(CONF.registry.projects))
+
+# The latest model per (subject, model type), updated by /train
+LMI = LatestModelIndex(DS.model_dir.joinpath('latest'),
+                       ttl=CONF.model.index.ttl_seconds)
+
+# Preload the most recently used models
+def _list_warmup_models():
+    conf = CONF.model.warmup
+    if conf.source == 'db':
+        if hasattr(DB, 'get_recent_models'):
+            return list_from_db(DB.get_recent_models, conf.n)
+        logger.warning(f'The {DB.name} backend has no get_recent_models, '
+                       'warm up from the latest-model index instead')
+        return list_from_index(LMI.directory, conf.n)
+    if conf.source == 'index':
+        return list_from_index(LMI.directory, conf.n)
+    return list_from_mtime(DS.model_dir, conf.n)
+
+
+# The models ask for the features by key through get_feature_store()
+FS = use_feature_store(FeatureStore(DS.features_dir, CONF.features.capacity))
+
+MR = MyReport(DS.report_dir, shard=CONF.report.get('shard', True))
+
+# The model predict in the worker processes, the web threads only parse and dispatch
+INFERENCE = None
+if CONF.inference.workers > 0:
+    INFERENCE = InferencePool(CONF.inference.workers,
+                              DS.model_dir,
+                              compress=CONF.model.compress,
+                              shared_dir=DS.model_dir.joinpath(
+                                  CONF.model.shared.subdir) if CONF.model.shared.enabled else None,
+                              features_dir=DS.features_dir,
+                              features_capacity=CONF.features.capacity,
+                              pin_cores=CONF.inference.pin_cores,
+                              start_method=CONF.inference.start_method)
+    atexit.register(INFERENCE.shutdown)
+
+# The models are warmed up in the web process, or in the inference workers they are routed to
+WARMUP = ModelWarmup(MC, CS, _list_warmup_models,
+                     load=INFERENCE.warm if INFERENCE else None)
+if CONF.model.warmup.n > 0:
+    WARMUP.start(background=CONF.model.warmup.background)
 
 app = Flask(__name__)
+use_json_provider(app, CONF.json.provider)
+if CONF.response.compression.enabled:
+    register_compression(app, CONF.response.compression)
+
+# The admin-only profiling, not registered at all when it is disabled
+if CONF.admin.profiling.enabled:
+    from util.profiling import register_profiling
+    register_profiling(app, CONF.admin.profiling, CONF.admin.token,
+                       DS.root.joinpath(CONF.admin.profiling.subdir))
+
+# The memory diagnostics, the tracemalloc is started only when it is enabled
+if CONF.admin.memory.enabled:
+    from util.memory_diagnostics import MemoryDiagnostics, register_memory_diagnostics
+    MD = MemoryDiagnostics(interval=CONF.admin.memory.interval_seconds,
+                           top=CONF.admin.memory.top,
+                           frames=CONF.admin.memory.frames)
+    MD.register_cache('model_cache', lambda: MC.buffer)
+    MD.register_cache('feature_store', lambda: FS.buffer)
+    MD.register_cache('predictors', lambda: MREG.instances)
+    MD.register_cache('latest_index', lambda: LMI.cache)
+    register_memory_diagnostics(app, MD.start(), CONF.admin.token)
 
 # %% ---- 2025-05-19 ------------------------
 # Function and class
 
 
+def route_log():
+    '''The log of the current route.'''
+    return ROUTE_LOGS.get(request.path.strip('/'))
+
+
 class Message:
     def success_response(self, body: dict) -> Response:
-        logger.debug(f'Response success: {body}')
-        return jsonify({'status': 'success', 'body': body})
+        # Only the fields the client asks for
+        body = project(body, requested_fields(request.args, body))
+        route_log().debug('Response success: {}', body)
+        with stage('response'):
+            return jsonify({'status': 'success', 'body': body})
 
     def error_response(self, body: dict, msg: str) -> Response:
-        logger.error(f'Response error: {msg}, {body}')
-        return jsonify({'status': 'error', 'msg': str(msg), 'body': str(body)})
+        logger.opt(lazy=True).error('Response error: {}, {}',
+                                    lambda: msg, lambda: summarize(body))
+        with stage('response'):
+            # The summary, not the whole payload with the EEG arrays
+            return jsonify({'status': 'error', 'msg': str(msg), 'body': str(summarize(body))})
 
 
 MSG = Message()
 
 
+def latest_model_from_db(subject: tuple, model_name: str, query_kwargs: dict):
+    '''
+    Find the latest model in the stored models of the db, and reconcile the index with it.
+
+    :return latest_model dict: the latest model.
+    :return latest_models list: the candidates of the model.
+    '''
+    latest_models_raw: list = get_model(**query_kwargs)
+
+    # Index the models by the model type, once per record set of the subject
+    models_index = MREG.index(subject, latest_models_raw)
+    ROUTE_LOGS.get('predict').debug('Got latest_models: {}', models_index)
+
+    # Filter the required model
+    latest_models = MREG.lookup(models_index, model_name)
+    latest_model = latest_of(latest_models)
+    # The db is the source of truth, its latest model overrides the indexed one
+    LMI.update(subject,
+               model_type_of(latest_model['model_name']),
+               latest_model['model_path'],
+               latest_model['model_name'],
+               model_time_of(latest_model['model_name']),
+               reconcile=True)
+    return latest_model, latest_models
+
+
+def find_latest_model(body: dict, model_name: str, query_kwargs: dict, load: bool = True):
+    '''
+    Find the latest model of the subject and load it.
+    The index is used when its entry is fresh, otherwise the db is looked up.
+    The indexed model not loadable is dropped and the db is looked up.
+
+    :param load bool: load the model in the process, or load it in the inference worker.
+    :return model: the loaded model, or (model_path, checksum) when not load.
+    :return latest_models list: the candidates of the model.
+    '''
+    subject = LMI.subject_of(body)
+
+    # Find the latest model in the index
+    latest_model = LMI.get(subject, model_name)
+    latest_models = [latest_model]
+    for indexed in ([True, False] if latest_model else [False]):
+        # Not indexed yet or stale, fallback to scan the stored models and reconcile the index
+        if not indexed:
+            latest_model, latest_models = latest_model_from_db(
+                subject, model_name, query_kwargs)
+
+        model_path, checksum = latest_model['model_path'].split(',')
+        try:
+            if not load:
+                # The inference worker the model is routed to loads it, its load error is raised here
+                INFERENCE.warm(model_path, checksum)
+                return (model_path, checksum), latest_models
+            # The model file is read only when it is not cached
+            model_record = MC.load(model_path, checksum, CS)
+            return model_record['model'], latest_models
+        except Exception as e:
+            if not indexed:
+                raise
+            logger.warning(f'The indexed model is not loadable: {model_path}, {e}')
+            LMI.drop(subject, model_type_of(latest_model['model_name']))
+
+
+def predict_with(predicting_model, model_name: str, model, data, label):
+    '''
+    Predict in the current thread, or in the inference worker when the pool is used.
+
+    :param model: the loaded model, or (model_path, checksum) for the inference worker.
+    '''
+    if INFERENCE is None:
+        return predicting_model.predict(model, data, label)
+    model_path, checksum = model
+    return INFERENCE.predict(model_path, checksum, model_name, data, label)
+
+
 @app.route('/echo', methods=['GET', 'POST'])
 def _echo():
     '''Just echo the input'''
@@ -94,17 +268,53 @@ def _echo():
     return MSG.error_response(body={}, msg="Invalid request method"), 400
 
 
+@app.route('/ready', methods=['GET'])
+def _ready():
+    '''The readiness, the models warm up progress'''
+    status = WARMUP.status()
+    # Nothing to warm up
+    if CONF.model.warmup.n <= 0:
+        status.update({'state': 'done', 'ready': True})
+    if status['ready']:
+        return MSG.success_response(body=status)
+    # Not an error, the progress is polled until it is ready
+    return jsonify({'status': 'pending', 'msg': ERRORS.not_ready_error.msg, 'body': status}), \
+        ERRORS.not_ready_error.code
+
+
+@app.route('/db/stats', methods=['GET'])
+def _db_stats():
+    '''The connection pool and the query latency of the db'''
+    return MSG.success_response(body={'backend': DB.name, 'stats': DB.stats()})
+
+
+@app.route('/inference/stats', methods=['GET'])
+def _inference_stats():
+    '''The workers of the inference pool, their cores and the cached models'''
+    workers = INFERENCE.stats() if INFERENCE else []
+    return MSG.success_response(body={'workers': workers})
+
+
+@app.route('/metrics', methods=['GET'])
+def _metrics():
+    '''The per-stage latency histograms in the Prometheus text format'''
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/train', methods=['POST'])
+@timed('train')
 def _train():
     '''Train the model'''
     # Get the request body
     # Check the request body
     try:
-        required_keys = ['name', 'org_id', 'user_id', 'project_name']
-        body = request.get_json()
-        logger.debug(f'body: {body}')
-        assert all(key in body
-                   for key in required_keys), 'Missing keys in request body'
+        with stage('parse'):
+            required_keys = ['name', 'org_id', 'user_id', 'project_name']
+            body = request.get_json()
+            route_log().debug('body: {}', body)
+            assert all(key in body
+                       for key in required_keys), 'Missing keys in request body'
+        set_labels(project_name=body['project_name'])
     except Exception as e:
         logger.exception(e)
         return MSG.error_response(body={}, msg=ERRORS.request_error.msg), 400
@@ -117,15 +327,20 @@ def _train():
             'project_name': body['project_name'],
             'name': body['name'],
         }
-        data = get_train_data(**query_kwargs)
-        label = get_train_label(**query_kwargs)
+        # The data and label are fetched concurrently
+        with stage('fetch'):
+            data_future = FETCHER.submit(get_train_data, **query_kwargs)
+            label_future = FETCHER.submit(get_train_label, **query_kwargs)
+            data = data_future.result()
+            label = label_future.result()
     except Exception as e:
         logger.exception(e)
         return MSG.error_response(body=body, msg=ERRORS.data_fetching_error.msg), 400
 
     # Determine model name
     try:
-        model_names = tellme_train_model(label, body['project_name'])
+        with stage('dispatch'):
+            model_names = MREG.train_models(label, body['project_name'])
         # Just make model_names is iterable
         _count = 0
         for _ in model_names:
@@ -141,7 +356,7 @@ def _train():
     for model_name in model_names:
         logger.debug(f'Training process uses model: {model_name}')
         try:
-            Model = checkout_model(model_name)
+            Model = MREG.checkout(model_name)
             training_model = Model()
             logger.debug(f'Using train model: {model_name}')
         except Exception as e:
@@ -152,23 +367,30 @@ def _train():
         try:
             # Train the model
             try:
-                trained_model: dict = training_model.train(data, label)
+                with stage('train', model_type=model_name):
+                    trained_model: dict = training_model.train(data, label)
                 logger.debug(f'Trained model: {model_name}')
             except Exception as e:
                 logger.exception(e)
                 raise e
 
+            t = time.time()
             info = dict(
                 name=body['name'],
                 org_id=body['org_id'],
                 user_id=body['user_id'],
                 project_name=body['project_name'],
+                # No train time, the identical models are the byte-identical files for the dedupe,
+                # the time is in the unique model name of the db row
             )
             name = trained_model.get('name', 'Unnamed')
             fname = name+'.'+CS.generate_random_filename(info)
-            unique_model_name = f'{name}.{time.time()}'
-            dst = Path(DS.model_dir, fname)
-            checksum = CS.save_model(info, trained_model, dst)
+            unique_model_name = f'{name}.{t}'
+            dst = sharded_path(DS.model_dir, fname)
+            with stage('save', model_type=model_name):
+                checksum = CS.save_model(info, trained_model, dst)
+                LMI.update(LMI.subject_of(body), name,
+                           f'{dst.as_posix()},{checksum}', unique_model_name, t)
 
             # body.update({'model_path': f'{dst.as_posix()},{checksum}',
             #             'model_name': unique_model_name})
@@ -258,16 +480,19 @@ def _report_get():
 
 
 @app.route('/report', methods=['POST', 'GET'])
+@timed('report')
 def _report():
     '''Generate the report'''
     # Get the request body
     # Check the request body
     try:
-        required_keys = ['name', 'org_id', 'user_id', 'project_name']
-        body = request.get_json()
-        logger.debug(f'body: {body}')
-        assert all(key in body
-                   for key in required_keys), 'Missing keys in request body'
+        with stage('parse'):
+            required_keys = ['name', 'org_id', 'user_id', 'project_name']
+            body = request.get_json()
+            route_log().debug('body: {}', body)
+            assert all(key in body
+                       for key in required_keys), 'Missing keys in request body'
+        set_labels(project_name=body['project_name'])
     except Exception as e:
         logger.exception(e)
         return MSG.error_response(body={}, msg=ERRORS.request_error.msg), 400
@@ -297,7 +522,8 @@ def _report():
             raise ValueError(f'Unknown report name: {report_name}')
 
 
-        path, need_saves = generate_report(output_path, report_name, report_data)
+        with stage('generate', model_type=report_name):
+            path, need_saves = generate_report(output_path, report_name, report_data)
         body.update({'report_path': path.as_posix(),
                     'report_name': path.name,
                      'npe': {'npe': None},
@@ -328,86 +554,87 @@ def _report():
 
 
 @app.route('/predict', methods=['POST'])
+@timed('predict')
 def _predict():
     '''Predict with the model'''
     # Get the request body
     # Check the request body
 
     try:
-        required_keys = ['name', 'org_id', 'user_id',
-                         'project_name', 'label_content']
-        body = request.get_json()
-        # Require label once
-        label = body['label_content']
-        # logger.debug(f'body: {body}')
-        assert all(key in body
-                   for key in required_keys), 'Missing keys in request body'
+        with stage('parse'):
+            required_keys = ['name', 'org_id', 'user_id',
+                             'project_name', 'label_content']
+            body = request.get_json()
+            # Require label once
+            label = body['label_content']
+            # logger.debug(f'body: {body}')
+            assert all(key in body
+                       for key in required_keys), 'Missing keys in request body'
+        set_labels(project_name=body['project_name'])
     except Exception as e:
         logger.exception(e)
         return MSG.error_response(body={}, msg=ERRORS.request_error.msg), 400
 
     # Determine model name
     try:
-        model_name: str = tellme_predict_model(label, body['project_name'])
-        Model = checkout_model(model_name)
-        predicting_model = Model()
-        logger.debug(f'Using predict model: {model_name}')
+        with stage('dispatch'):
+            model_name: str = MREG.predict_model(label, body['project_name'])
+            predicting_model = MREG.instance(model_name)
+        set_labels(model_type=model_name)
+        route_log().debug('Using predict model: {}', model_name)
     except Exception as e:
         logger.exception(e)
         return MSG.error_response(body=body, msg=ERRORS.model_loading_error.msg), 400
 
+    query_kwargs = {
+        'name': body['name'],
+        'org_id': body['org_id'],
+        'user_id': body['user_id'],
+        'project_name': body['project_name'],
+    }
+    predict_body = {
+        'org_id': body['org_id'],
+        'user_id': body['user_id'],
+        'project_name': body['project_name'],
+        'name': body['name'],
+    }
+
+    # Find the model and fetch the data concurrently
+    # The model is loaded by the inference worker when the pool is used
+    model_future = FETCHER.submit(wrap('model_load', find_latest_model),
+                                  body, model_name, query_kwargs, INFERENCE is None)
+    data_future = FETCHER.submit(wrap('fetch', get_predict_data),
+                                 **predict_body)
+
     # Find the model
     try:
-        query_kwargs = {
-            'name': body['name'],
-            'org_id': body['org_id'],
-            'user_id': body['user_id'],
-            'project_name': body['project_name'],
-        }
-        latest_models_raw: list = get_model(**query_kwargs)
-
-        latest_models = []
-        for rec in latest_models_raw:
-            # Found multiple models
-            if m := rec.get('models'):
-                latest_models.extend(m)
-            # Found single model
-            else:
-                latest_models.append(rec)
-        logger.debug(f'Got latest_models: {latest_models}')
-
-        # Filter the required model
-        latest_models = [e for e in latest_models if e.get(
-            'model_name').startswith(model_name)]
-        model_path, checksum = latest_models[-1]['model_path'].split(',')
-        model, info, checksum = CS.read_model(model_path, checksum)
-        model_record = MC.insert(model, info, checksum)
-        model = model_record['model']
+        model, latest_models = model_future.result()
     except Exception as e:
         logger.exception(e)
+        data_future.cancel()
         return MSG.error_response(body=body, msg=ERRORS.model_loading_error.msg), 400
 
     data = None
     try:
-        predict_body = {
-            'org_id': body['org_id'],
-            'user_id': body['user_id'],
-            'project_name': body['project_name'],
-            'name': body['name'],
-        }
-
         # Fetch data from db
         # Try maximum 10 times for data when the data is not enough
         for i in range(10):
             try:
-                data = get_predict_data(**predict_body)
+                # The first fetch is done along with finding the model
+                if i == 0:
+                    data = data_future.result()
+                else:
+                    with stage('fetch'):
+                        data = get_predict_data(**predict_body)
                 # logger.info(f'getpredict data: {data}')
             except Exception as e:
                 return MSG.error_response(body=body, msg=ERRORS.data_fetching_error.msg), 400
             try:
                 # Predict with the model
-                predicted = predicting_model.predict(model, data, label)
-                logger.debug(f'Predicted: {predicted}')
+                with stage('inference'):
+                    predicted = predict_with(
+                        predicting_model, model_name, model, data, label)
+                route_log().debug('Predicted: {}', predicted)
                 body.update({'pred': predicted})
                 body.pop('label_content')
 
@@ -449,7 +676,7 @@ def _report_deprecated():
     try:
         required_keys = ['name', 'org_id', 'user_id', 'project_name', 'event']
         body = request.get_json()
-        logger.debug(f'body: {body}')
+        route_log().debug('body: {}', body)
         assert all(key in body
                    for key in required_keys), 'Missing keys in request body'
     except Exception as e:
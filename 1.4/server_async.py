@@ -0,0 +1,347 @@
+"""
+File: server_async.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The async serving mode of the server, on the ASGI server.
+    The objects of server.py are shared, like the db, the model cache and the registry,
+    so the two modes are the same except the concurrency.
+
+    - The db queries run in the FETCHER pool and are awaited,
+      the waiting of the retries does not hold the thread.
+    - The ollama call of the report is awaited by its async client.
+    - The CPU-bound model and figure code runs in the CPU pool.
+    - The /predict/stream route pushes the predictions as the server-sent events,
+      instead of the client polling /predict.
+
+    The JSON contracts are the same as the Message of server.py.
+    The /train and the other routes stay in the WSGI mode.
+
+    Usage (from the 1.4 folder):
+        hypercorn server_async:app --bind localhost:7384
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import sys
+import time
+import asyncio
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, Response, request, jsonify
+
+# The shared objects of the WSGI server
+from server import (CONF, FETCHER, DS, MREG, WARMUP, MR, INFERENCE,
+                    find_latest_model, predict_with, get_predict_data)
+
+from util.log import logger, summarize, ROUTE_LOGS
+from util.known_errors import ERRORS
+from util.json_provider import use_json_provider
+from util.response import requested_fields, project
+from util.metrics import METRICS, timed, stage, set_labels, wrap
+from util.machine_learning.known_errors import PredictingError
+from util.auto_report.main import build_report, ask_ollama_async, finish_report
+
+# The CPU-bound model and figure code
+CPU = ThreadPoolExecutor(max_workers=CONF.asgi.cpu_workers,
+                         thread_name_prefix='cpu')
+
+app = Quart(__name__)
+use_json_provider(app, CONF.json.provider)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+async def run_in(executor: ThreadPoolExecutor, func, *args, **kwargs):
+    '''Run the blocking func in the executor and await it.'''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+class Message:
+    '''The same contracts as the Message of server.py.'''
+
+    def __init__(self, route: str):
+        self.log = ROUTE_LOGS.get(route)
+
+    def success_response(self, body: dict) -> Response:
+        # Only the fields the client asks for
+        body = project(body, requested_fields(request.args, body))
+        self.log.debug('Response success: {}', body)
+        with stage('response'):
+            return jsonify({'status': 'success', 'body': body})
+
+    def error_response(self, body: dict, msg: str) -> Response:
+        logger.opt(lazy=True).error('Response error: {}, {}',
+                                    lambda: msg, lambda: summarize(body))
+        with stage('response'):
+            # The summary, not the whole payload with the EEG arrays
+            return jsonify({'status': 'error', 'msg': str(msg), 'body': str(summarize(body))})
+
+
+def check_predict_body(body: dict) -> str:
+    '''Check the predict request body, and return the label content.'''
+    required_keys = ['name', 'org_id', 'user_id',
+                     'project_name', 'label_content']
+    label = body['label_content']
+    assert all(key in body
+               for key in required_keys), 'Missing keys in request body'
+    return label
+
+
+def dispatch_predict(body: dict, label: str):
+    '''
+    Determine the predict model.
+
+    :return model_name str: the predict model.
+    :return predicting_model: the predictor instance.
+    :return query_kwargs dict: the query of the models and the data.
+    '''
+    model_name: str = MREG.predict_model(label, body['project_name'])
+    predicting_model = MREG.instance(model_name)
+    query_kwargs = {
+        'name': body['name'],
+        'org_id': body['org_id'],
+        'user_id': body['user_id'],
+        'project_name': body['project_name'],
+    }
+    return model_name, predicting_model, query_kwargs
+
+
+@app.route('/echo', methods=['GET', 'POST'])
+async def _echo():
+    '''Just echo the input'''
+    msg = Message('echo')
+    if request.method == 'POST':
+        return msg.success_response(body=await request.get_json())
+    return msg.success_response(body={})
+
+
+@app.route('/ready', methods=['GET'])
+async def _ready():
+    '''The readiness, the models warm up progress'''
+    msg = Message('ready')
+    status = WARMUP.status()
+    # Nothing to warm up
+    if CONF.model.warmup.n <= 0:
+        status.update({'state': 'done', 'ready': True})
+    if status['ready']:
+        return msg.success_response(body=status)
+    # Not an error, the progress is polled until it is ready
+    return jsonify({'status': 'pending', 'msg': ERRORS.not_ready_error.msg, 'body': status}), \
+        ERRORS.not_ready_error.code
+
+
+@app.route('/metrics', methods=['GET'])
+async def _metrics():
+    '''The per-stage latency histograms in the Prometheus text format'''
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/predict', methods=['POST'])
+@timed('predict')
+async def _predict():
+    '''Predict with the model'''
+    msg = Message('predict')
+    try:
+        with stage('parse'):
+            body = await request.get_json()
+            label = check_predict_body(body)
+        set_labels(project_name=body['project_name'])
+    except Exception as e:
+        logger.exception(e)
+        return msg.error_response(body={}, msg=ERRORS.request_error.msg), 400
+
+    # Determine model name
+    try:
+        with stage('dispatch'):
+            model_name, predicting_model, query_kwargs = dispatch_predict(body, label)
+        set_labels(model_type=model_name)
+        msg.log.debug('Using predict model: {}', model_name)
+    except Exception as e:
+        logger.exception(e)
+        return msg.error_response(body=body, msg=ERRORS.model_loading_error.msg), 400
+
+    # Find the model and fetch the data concurrently
+    model_task = asyncio.ensure_future(run_in(
+        FETCHER, wrap('model_load', find_latest_model), body, model_name, query_kwargs,
+        INFERENCE is None))
+    data_task = asyncio.ensure_future(run_in(
+        FETCHER, wrap('fetch', get_predict_data), **query_kwargs))
+
+    # Find the model
+    try:
+        model, latest_models = await model_task
+    except Exception as e:
+        logger.exception(e)
+        data_task.cancel()
+        return msg.error_response(body=body, msg=ERRORS.model_loading_error.msg), 400
+
+    data = None
+    try:
+        # Try maximum 10 times for data when the data is not enough
+        for i in range(10):
+            try:
+                # The first fetch is done along with finding the model
+                if i == 0:
+                    data = await data_task
+                else:
+                    data = await run_in(FETCHER, wrap('fetch', get_predict_data), **query_kwargs)
+            except Exception as e:
+                return msg.error_response(body=body, msg=ERRORS.data_fetching_error.msg), 400
+            try:
+                predicted = await run_in(CPU, wrap('inference', predict_with),
+                                         predicting_model, model_name, model, data, label)
+                msg.log.debug('Predicted: {}', predicted)
+                body.update({'pred': predicted})
+                body.pop('label_content')
+                return msg.success_response(body=body)
+            except Exception:
+                # The thread is not held while waiting for the data
+                await asyncio.sleep(1)
+                continue
+        raise PredictingError.ExceedMaximumPredictingTimes
+    except Exception as e:
+        logger.exception(e)
+        dump_body = dict(
+            data=data,
+            label=label,
+            body=body,
+            query_kwargs=query_kwargs,
+            latest_models=latest_models,
+            error=f'{e}'
+        )
+        await run_in(FETCHER, DS.dump_variables, 'predict-dump', dump_body)
+        return msg.error_response(body=body, msg=ERRORS.inference_error.msg), 400
+
+
+@app.route('/predict/stream', methods=['POST'])
+async def _predict_stream():
+    '''
+    Predict on the interval and push the predictions as the server-sent events.
+    The body is the same as /predict, with the optional seconds and interval.
+    '''
+    msg = Message('predict')
+    try:
+        body = await request.get_json()
+        label = check_predict_body(body)
+        model_name, predicting_model, query_kwargs = dispatch_predict(body, label)
+        seconds = min(float(body.pop('seconds', 60)), CONF.asgi.stream.max_seconds)
+        interval = max(float(body.pop('interval', CONF.asgi.stream.interval)),
+                       CONF.asgi.stream.interval)
+        model, _ = await run_in(FETCHER, find_latest_model, body, model_name, query_kwargs,
+                                INFERENCE is None)
+    except Exception as e:
+        logger.exception(e)
+        return msg.error_response(body={}, msg=ERRORS.request_error.msg), 400
+
+    body.pop('label_content')
+
+    async def events():
+        stop = time.monotonic() + seconds
+        while time.monotonic() < stop:
+            tic = time.monotonic()
+            try:
+                data = await run_in(FETCHER, get_predict_data, **query_kwargs)
+                predicted = await run_in(CPU, predict_with,
+                                         predicting_model, model_name, model, data, label)
+                payload = {'status': 'success', 'body': dict(body, pred=predicted)}
+            except Exception as e:
+                # The data is not enough yet, the stream goes on
+                msg.log.debug('Stream predict failed: {}', e)
+                payload = {'status': 'error',
+                           'msg': ERRORS.inference_error.msg, 'body': str(summarize(body))}
+            yield f'data: {app.json.dumps(payload)}\n\n'.encode()
+            await asyncio.sleep(max(0, interval - (time.monotonic() - tic)))
+
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # The stream is bounded by the seconds, not by the response timeout
+    response.timeout = None
+    return response
+
+
+@app.route('/report', methods=['POST', 'GET'])
+@timed('report')
+async def _report():
+    '''Generate the report'''
+    msg = Message('report')
+    try:
+        with stage('parse'):
+            required_keys = ['name', 'org_id', 'user_id', 'project_name']
+            body = await request.get_json()
+            msg.log.debug('body: {}', body)
+            assert all(key in body
+                       for key in required_keys), 'Missing keys in request body'
+        set_labels(project_name=body['project_name'])
+    except Exception as e:
+        logger.exception(e)
+        return msg.error_response(body={}, msg=ERRORS.request_error.msg), 400
+
+    # report_name = 'car' | 'mouse'
+    report_name = 'car'
+    try:
+        output_path = MR.mk_report_path(prefix=f'report-{report_name}')
+
+        # TODO: Request data
+        report_data = {'car': [None] * 6, 'mouse': [None] * 3}[report_name]
+
+        # The figures in the CPU pool, the ollama is awaited
+        with stage('generate', model_type=report_name):
+            generator, placeholder_idx, ollama_msg, need_saves = await run_in(
+                CPU, build_report, report_name, report_data)
+        with stage('llm'):
+            try:
+                advice = await ask_ollama_async(ollama_msg)
+            except Exception as e:
+                logger.warning(f'Ollama is not reachable: {e}')
+                advice = None
+        with stage('pdf'):
+            path = await run_in(CPU, finish_report, generator, placeholder_idx, advice, output_path)
+
+        body.update({'report_path': path.as_posix(),
+                     'report_name': path.name,
+                     'npe': {'npe': None},
+                     'file_report': {'file_report': None},
+                     'app_report': {'app_report': None}
+                     })
+        body.update(need_saves)
+        return msg.success_response(body=body)
+    except Exception as e:
+        logger.exception(e)
+        dump_body = dict(
+            body=body,
+            report_name=report_name,
+            error=f'{e}'
+        )
+        await run_in(FETCHER, DS.dump_variables, 'report-dump', dump_body)
+        return msg.error_response(body=body, msg=ERRORS.report_error.msg), 400
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == "__main__":
+    # Main entry point for debug.
+    # Use start-server-async.ps1 for production usage.
+    host = CONF.connection.host
+    port = CONF.connection.port
+    sys.exit(app.run(host=host, port=port, debug=True))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
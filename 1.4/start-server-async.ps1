@@ -0,0 +1,9 @@
+# Ensure Quart and Hypercorn are installed
+pip install quart hypercorn
+
+# Setup
+$hostname = "localhost"
+$port = 7384
+
+# Run the async server with Hypercorn
+hypercorn --bind "$($hostname):$($port)" server_async:app
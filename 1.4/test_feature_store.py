@@ -0,0 +1,174 @@
+"""
+File: test_feature_store.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the feature store, the atomic write of the entries, the reload after the LRU eviction,
+    the invalidation by the feature config and the pruning of the directory.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import time
+import tempfile
+import numpy as np
+from rich import print
+from pathlib import Path
+
+from util.machine_learning import feature_store
+from util.machine_learning.feature_store import FeatureStore
+from util.machine_learning.spectral_features import SpectralFeatureExtractor
+
+SRATE = 250
+RNG = np.random.default_rng(20261019)
+SUBJECT = dict(org_id='org', user_id='user', project_name='project', name='name')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def new_store(capacity: int = 64) -> FeatureStore:
+    return FeatureStore(Path(tempfile.mkdtemp()), capacity=capacity)
+
+
+def test_atomic_put():
+    store = new_store()
+    key = store.fingerprint(SUBJECT, {'srate': SRATE}, records=[1, 2, 3])
+    features = {'psd': RNG.standard_normal((8, 251)), 'powers': RNG.standard_normal((8, 5))}
+
+    # The entry is not visible until all its arrays are written
+    save = np.save
+    seen = []
+
+    def checked_save(path, value):
+        seen.append(store.path(key).exists())
+        save(path, value)
+
+    np.save = checked_save
+    try:
+        store.put(key, features)
+    finally:
+        np.save = save
+    assert seen == [False, False], seen
+    assert sorted(p.name for p in store.path(key).iterdir()) == ['powers.npy', 'psd.npy']
+    assert not list(store.path(key).parent.glob('*.tmp'))
+
+    # The other worker has written the key, its entry is kept and the temporary folder is removed
+    other = {'psd': np.zeros((8, 251))}
+    store.put(key, other)
+    assert sorted(p.name for p in store.path(key).iterdir()) == ['powers.npy', 'psd.npy']
+    assert not list(store.path(key).parent.glob('*.tmp'))
+    store.buffer.clear()
+    assert np.array_equal(store.get(key)['psd'], features['psd'])
+
+
+def test_reload_after_eviction():
+    store = new_store(capacity=2)
+    keys = [store.fingerprint(SUBJECT, {'srate': SRATE}, records=[i]) for i in range(3)]
+    features = [{'psd': RNG.standard_normal((4, 251))} for _ in keys]
+    for key, f in zip(keys, features):
+        store.put(key, f)
+    assert list(store.buffer) == keys[1:]
+
+    computed = []
+    loaded = store.get_or_compute(keys[0], lambda: computed.append(1) or {})
+    assert not computed
+    assert isinstance(loaded['psd'], np.memmap)
+    assert not loaded['psd'].flags.writeable
+    assert np.array_equal(loaded['psd'], features[0]['psd'])
+    # The reloaded entry is the most recent one, the next is evicted
+    assert list(store.buffer) == [keys[2], keys[0]]
+    assert store.get(keys[0]) is loaded
+    assert store.stats()['misses'] == 0
+
+
+def test_invalidate_by_config():
+    store = new_store()
+    data = RNG.standard_normal((8, SRATE * 4))
+    computed = []
+
+    def compute(extractor):
+        computed.append(extractor.config())
+        freqs, psd = extractor.psd(data)
+        return {'psd': psd}
+
+    extractor = SpectralFeatureExtractor(SRATE)
+    key = store.fingerprint(SUBJECT, extractor.config(), records=[{'data': data}])
+    first = store.get_or_compute(key, lambda: compute(extractor))
+    assert store.get_or_compute(key, lambda: compute(extractor)) is first
+    assert len(computed) == 1
+
+    # The same data with the other extractor configs
+    for other in [SpectralFeatureExtractor(SRATE, noverlap=100),
+                  SpectralFeatureExtractor(SRATE, nperseg=250),
+                  SpectralFeatureExtractor(SRATE, bands={'alpha': (8, 12)})]:
+        other_key = store.fingerprint(SUBJECT, other.config(), records=[{'data': data}])
+        assert other_key != key
+        features = store.get_or_compute(other_key, lambda: compute(other))
+        assert features['psd'].shape[-1] == len(other.freqs)
+    assert len(computed) == 4
+
+    # The same config is the same key, even from the other instance
+    assert store.fingerprint(SUBJECT, SpectralFeatureExtractor(SRATE).config(), records=[{'data': data}]) == key
+
+
+def test_prune():
+    store = new_store()
+    keys = [store.fingerprint(SUBJECT, {'srate': SRATE}, records=[i]) for i in range(4)]
+    for i, key in enumerate(keys):
+        store.put(key, {'psd': np.zeros(1024)})
+        # From the oldest to the newest, the first one is 40 days old
+        t = time.time() - [40, 3, 2, 1][i] * 86400
+        os.utime(store.path(key), (t, t))
+    size = sum(p.stat().st_size for p in store.path(keys[0]).glob('*.npy'))
+    stale = store.path(keys[0]).with_name(f'{keys[0]}.1.1.tmp')
+    stale.mkdir()
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+
+    report = store.prune(max_bytes=size * 2, max_age_days=30, dry_run=True)
+    assert report['removed'] == 2 and report['stale_tmp'] == 1
+    assert all(store.path(key).is_dir() for key in keys)
+
+    # The oldest by the age, the next by the size
+    report = store.prune(max_bytes=size * 2, max_age_days=30)
+    assert report['removed'] == 2 and report['bytes'] == size * 2
+    assert [store.path(key).is_dir() for key in keys] == [False, False, True, True]
+    assert not stale.exists()
+    assert list(store.buffer) == keys[2:]
+
+    # The loaded entry is young again
+    store.buffer.clear()
+    os.utime(store.path(keys[2]), (1, 1))
+    store.get(keys[2])
+    assert store.prune(max_age_days=30)['removed'] == 0
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    test_atomic_put()
+    print('atomic_put: OK')
+    test_reload_after_eviction()
+    print('reload_after_eviction: OK')
+    test_invalidate_by_config()
+    print('invalidate_by_config: OK')
+    test_prune()
+    print('prune: OK')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
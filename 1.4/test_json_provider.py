@@ -0,0 +1,121 @@
+"""
+File: test_json_provider.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the JSON providers of the app, the orjson one against the stdlib one.
+    The bodies are the same on both, except the non-finite values,
+    the orjson writes them as null.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import math
+import json
+import numpy as np
+from pathlib import Path
+from flask import Flask, request, jsonify
+from rich import print
+
+from util.json_provider import use_json_provider, orjson
+
+PROVIDERS = ['orjson', 'stdlib'] if orjson is not None else ['stdlib']
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def mk_app(name: str) -> Flask:
+    app = Flask(__name__)
+    use_json_provider(app, name)
+
+    @app.route('/echo', methods=['POST'])
+    def _echo():
+        return jsonify({'status': 'success', 'body': request.get_json()})
+
+    return app
+
+
+def test_numpy_types():
+    body = {'data': np.arange(6, dtype=np.float32).reshape(2, 3),
+            'pred': np.float64(0.5),
+            'label': np.int64(254),
+            'path': Path('a/b.pdf'),
+            'types': {1}}
+    expected = {'data': [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]],
+                'pred': 0.5,
+                'label': 254,
+                'path': 'a/b.pdf',
+                'types': [1]}
+    for name in PROVIDERS:
+        app = mk_app(name)
+        assert json.loads(app.json.dumps(body)) == expected, name
+        # The order of the body is kept
+        assert list(app.json.loads(app.json.dumps(body))) == list(body), name
+
+
+def test_round_trip():
+    body = {'name': 'name', 'org_id': 'orgId', 'user_id': 'userId', 'project_name': 'projectName',
+            'label_content': '{"type":254,"time":1747646185506}',
+            'data': np.random.default_rng(0).standard_normal((8, 250)).tolist()}
+    for name in PROVIDERS:
+        client = mk_app(name).test_client()
+        response = client.post('/echo', json=body)
+        assert response.status_code == 200, name
+        assert response.mimetype == 'application/json', name
+        assert response.get_json() == {'status': 'success', 'body': body}, name
+
+
+def test_non_finite():
+    body = {'pred': [float('nan'), float('inf'), -float('inf'), 1.0],
+            'data': np.array([np.nan, 1.0])}
+    if orjson is not None:
+        app = mk_app('orjson')
+        assert json.loads(app.json.dumps(body)) == {'pred': [None, None, None, 1.0],
+                                                    'data': [None, 1.0]}
+    app = mk_app('stdlib')
+    s = app.json.dumps(body)
+    assert 'NaN' in s and 'Infinity' in s
+    decoded = app.json.loads(s)
+    assert math.isnan(decoded['pred'][0]) and decoded['pred'][1] == math.inf
+
+
+def test_non_finite_request():
+    # The EEG samples of the clients may be NaN, the stdlib json writes them as the literals
+    s = '{"data": [[NaN, 1.0], [Infinity, -Infinity]], "label_content": "{}"}'
+    for name in PROVIDERS:
+        client = mk_app(name).test_client()
+        response = client.post('/echo', data=s, content_type='application/json')
+        assert response.status_code == 200, name
+        data = json.loads(response.get_data())['body']['data']
+        assert data[0][1] == 1.0, name
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    test_numpy_types()
+    print('numpy types: OK')
+    test_round_trip()
+    print('round trip: OK')
+    test_non_finite()
+    print('non finite: OK')
+    test_non_finite_request()
+    print('non finite request: OK')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
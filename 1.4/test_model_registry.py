@@ -0,0 +1,126 @@
+"""
+File: test_model_registry.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the lookup tables of the model registry against the labels of the seeded sqlite db,
+    and the index of the stored models.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import json
+import tempfile
+from pathlib import Path
+from rich import print
+
+from util.data_access.seed import seed
+from util.data_access.sqlite_db import SQLiteDB
+from util.machine_learning.model_registry import ModelRegistry, label_type
+
+PROJECTS = {'attention': {'predict': [1, 2], 'train': [[1, 2]]}}
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+class Tellme:
+    '''The tellme functions, the calls are counted.'''
+
+    def __init__(self):
+        self.calls = 0
+
+    def train(self, label, project_name):
+        self.calls += 1
+        return ['AttentionModel', 'AttentionModelV2']
+
+    def predict(self, label, project_name):
+        self.calls += 1
+        return 'AttentionModel'
+
+    def checkout(self, model_name):
+        return dict
+
+
+def mk_registry():
+    tellme = Tellme()
+    registry = ModelRegistry(tellme.train, tellme.predict, tellme.checkout)
+    registry.build(PROJECTS)
+    return registry, tellme
+
+
+def test_train_table():
+    directory = Path(tempfile.mkdtemp())
+    subject = seed(directory.joinpath('test.sqlite'), subjects=1, seconds=120, block_seconds=30)[0]
+    db = SQLiteDB(directory.joinpath('test.sqlite'))
+    label = db.get_train_label(**subject)
+    db.pool.close()
+    assert label and all(set(e) == {'id', 'type', 'time'} for e in label)
+    assert label_type(label) == (1, 2)
+
+    registry, tellme = mk_registry()
+    calls = tellme.calls
+    assert registry.train_models(label, 'attention') == ('AttentionModel', 'AttentionModelV2')
+    assert tellme.calls == calls, 'The train label misses the table'
+
+    # The project not registered is resolved per request
+    registry.train_models(label, 'other')
+    assert tellme.calls == calls + 1
+
+
+def test_predict_table():
+    registry, tellme = mk_registry()
+    calls = tellme.calls
+    label = json.dumps({'type': 2, 'time': 1747646185506})
+    assert registry.predict_model(label, 'attention') == 'AttentionModel'
+    assert tellme.calls == calls
+    registry.predict_model(json.dumps({'type': 254, 'time': 0}), 'attention')
+    assert tellme.calls == calls + 1
+
+
+def test_lookup():
+    records = [{'id': 1, 'models': [{'model_name': 'AttentionModel.1747646185.5', 'model_path': 'a,1'},
+                                    {'model_name': 'AttentionModelV2.1747646185.5', 'model_path': 'b,2'}]},
+               {'id': 2, 'models': [{'model_name': 'AttentionModel.1747646190.1', 'model_path': 'c,3'}]}]
+    registry = ModelRegistry()
+    subject = ('org', 'user', 'attention', 'name')
+    index = registry.index(subject, records)
+    assert registry.index(subject, records) is index, 'The index is built once per record set'
+
+    # The model type first, the prefix of the model types when it misses
+    assert [m['model_path'] for m in registry.lookup(index, 'AttentionModel')] == ['a,1', 'c,3']
+    assert [m['model_path'] for m in registry.lookup(index, 'AttentionModelV')] == ['b,2']
+    assert registry.lookup(index, 'Visual') == []
+
+    # The new record rebuilds the index
+    records.append({'id': 3, 'models': [{'model_name': 'AttentionModel.1747646199.1', 'model_path': 'd,4'}]})
+    index = registry.index(subject, records)
+    assert len(registry.lookup(index, 'AttentionModel')) == 3
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    test_train_table()
+    print('train table: OK')
+    test_predict_table()
+    print('predict table: OK')
+    test_lookup()
+    print('lookup: OK')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,105 @@
+"""
+File: test_nonlinear_features.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the numerical parity of the fast nonlinear features against nolds.
+    The Higuchi fractal dimension is not in nolds, it is tested against the textbook loops.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import nolds
+import numpy as np
+from rich import print
+
+from util.machine_learning.nonlinear_features import sample_entropy, dfa, higuchi_fd
+
+SRATE = 250
+RNG = np.random.default_rng(20261019)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def synthetic_eeg(shape: tuple, seconds: float = 2) -> np.ndarray:
+    '''Alpha rhythm with pink-ish noise.'''
+    n = int(SRATE * seconds)
+    t = np.arange(n) / SRATE
+    noise = np.cumsum(RNG.standard_normal((*shape, n)), axis=-1) * 0.1
+    noise += RNG.standard_normal((*shape, n))
+    return np.sin(2 * np.pi * 10 * t) * 2 + noise
+
+
+def higuchi_fd_reference(x: np.ndarray, kmax: int = 10) -> float:
+    n = len(x)
+    lk = []
+    for k in range(1, kmax + 1):
+        lm = []
+        for m in range(k):
+            count = (n - m - 1) // k
+            s = sum(abs(x[m + i * k] - x[m + (i - 1) * k])
+                    for i in range(1, count + 1))
+            lm.append(s * (n - 1) / (count * k) / k)
+        lk.append(np.mean(lm))
+    return np.polyfit(np.log(1.0 / np.arange(1, kmax + 1)), np.log(lk), 1)[0]
+
+
+def test_sample_entropy():
+    data = synthetic_eeg((2, 3), seconds=2)
+    fast = sample_entropy(data)
+    assert fast.shape == (2, 3)
+    for idx in np.ndindex(2, 3):
+        expected = nolds.sampen(data[idx])
+        assert np.isclose(fast[idx], expected), (idx, fast[idx], expected)
+
+    # The explicit tolerance and the embedding
+    fast = sample_entropy(data, emb_dim=3, tolerance=0.5, lag=2)
+    for idx in np.ndindex(2, 3):
+        expected = nolds.sampen(data[idx], emb_dim=3, tolerance=0.5, lag=2)
+        assert np.isclose(fast[idx], expected), (idx, fast[idx], expected)
+
+
+def test_dfa():
+    data = synthetic_eeg((2, 3), seconds=4)
+    for overlap in [True, False]:
+        fast = dfa(data, overlap=overlap)
+        for idx in np.ndindex(2, 3):
+            expected = nolds.dfa(data[idx], overlap=overlap, fit_exp='poly')
+            assert np.isclose(fast[idx], expected), (idx, fast[idx], expected)
+
+
+def test_higuchi_fd():
+    data = synthetic_eeg((2, 3), seconds=1)
+    fast = higuchi_fd(data)
+    for idx in np.ndindex(2, 3):
+        expected = higuchi_fd_reference(data[idx])
+        assert np.isclose(fast[idx], expected), (idx, fast[idx], expected)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    test_sample_entropy()
+    print('sample_entropy: OK')
+    test_dfa()
+    print('dfa: OK')
+    test_higuchi_fd()
+    print('higuchi_fd: OK')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,123 @@
+"""
+File: test_online_band_power.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the incremental band powers against the batch SpectralFeatureExtractor.band_powers.
+    The stream is pushed in the chunks of the irregular sizes,
+    the covered samples are the latest segments on the segment grid of the stream.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import numpy as np
+from rich import print
+
+from util.machine_learning.spectral_features import SpectralFeatureExtractor
+from util.machine_learning.online_band_power import OnlineBandPower
+
+SRATE = 250
+RNG = np.random.default_rng(20261019)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def synthetic_stream(n_channels: int, n_samples: int) -> np.ndarray:
+    '''Alpha rhythm with white noise.'''
+    t = np.arange(n_samples) / SRATE
+    return np.sin(2 * np.pi * 10 * t) * 2 + RNG.standard_normal((n_channels, n_samples))
+
+
+def covered(extractor: SpectralFeatureExtractor, online: OnlineBandPower, n: int) -> tuple:
+    '''The samples covered by the online estimator after n samples are pushed.'''
+    segments = (n - extractor.nperseg) // extractor.step + 1
+    m = min(segments, online.n_segments)
+    start = (segments - m) * extractor.step
+    return start, start + extractor.nperseg + (m - 1) * extractor.step
+
+
+def assert_powers_close(powers: dict, expected: dict):
+    assert powers.keys() == expected.keys(), (powers.keys(), expected.keys())
+    for name in expected:
+        assert np.allclose(powers[name], expected[name]), name
+
+
+def test_irregular_chunks():
+    extractor = SpectralFeatureExtractor(SRATE, nperseg=250, noverlap=150)
+    window = extractor.nperseg + extractor.step * 7
+    online = OnlineBandPower(window, extractor)
+    stream = synthetic_stream(3, window * 6)
+
+    # The sizes around and across the segments, the step and the window
+    sizes = [0, 1, 99, 150, 101, 7, 250, window + 33, 3, 0, 180, 100, 2 * window]
+    sizes += list(RNG.integers(1, 400, size=40))
+    n = checked = 0
+    for size in sizes:
+        if n + size > stream.shape[-1]:
+            break
+        online.push(stream[:, n:n + size])
+        n += size
+        if n < extractor.nperseg:
+            assert not online.ready
+            continue
+        start, end = covered(extractor, online, n)
+        assert_powers_close(online.band_powers(),
+                            extractor.band_powers(stream[:, start:end]))
+        assert_powers_close(online.band_powers(relative=True),
+                            extractor.band_powers(stream[:, start:end], relative=True))
+        # Exactly at the segment boundary, no leftover is pending
+        checked += int(end == n)
+    assert checked > 0, checked
+
+
+def test_irregular_windows():
+    extractor = SpectralFeatureExtractor(SRATE, nperseg=200, noverlap=120)
+    window = extractor.nperseg + extractor.step * 5
+    online = OnlineBandPower(window, extractor)
+    stream = synthetic_stream(2, window * 8)
+
+    # The windows of the prediction requests, they end on the segment boundaries after the irregular advances
+    end = window
+    ends = [end]
+    for k in [1, 3, 1, 2, 5, 7, 1, 4]:
+        end += k * extractor.step
+        ends.append(end)
+    for end in ends:
+        online.update_window(stream[:, end - window:end],
+                             end_time=end / SRATE * 1000)
+        assert_powers_close(online.band_powers(),
+                            extractor.band_powers(stream[:, end - window:end]))
+
+    # The stream goes back, the estimator restarts on the window
+    end = ends[2]
+    online.update_window(stream[:, end - window:end],
+                         end_time=end / SRATE * 1000)
+    assert_powers_close(online.band_powers(),
+                        extractor.band_powers(stream[:, end - window:end]))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    test_irregular_chunks()
+    print('irregular_chunks: OK')
+    test_irregular_windows()
+    print('irregular_windows: OK')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,158 @@
+"""
+File: test_spectral_features.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the numerical parity of the batched spectral features against scipy.signal.welch.
+    The band powers are tested against the textbook loops over the frequency bins.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import warnings
+import numpy as np
+from rich import print
+from scipy.signal import welch
+
+from util.machine_learning.spectral_features import SpectralFeatureExtractor, BANDS
+
+SRATE = 250
+RNG = np.random.default_rng(20261019)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def synthetic_eeg(shape: tuple, seconds: float = 4) -> np.ndarray:
+    '''Alpha rhythm with white noise.'''
+    n = int(SRATE * seconds)
+    t = np.arange(n) / SRATE
+    return np.sin(2 * np.pi * 10 * t) * 2 + RNG.standard_normal((*shape, n))
+
+
+def band_powers_reference(freqs: np.ndarray, psd: np.ndarray, bands: dict) -> dict:
+    df = freqs[1] - freqs[0]
+    powers = {}
+    for name, (low, high) in bands.items():
+        power = np.zeros(psd.shape[:-1])
+        for i, f in enumerate(freqs):
+            if low <= f < high:
+                power += psd[..., i] * df
+        powers[name] = power
+    powers['total'] = sum(powers[name] for name in bands)
+    return powers
+
+
+def assert_powers_close(powers: dict, expected: dict):
+    assert powers.keys() == expected.keys(), (powers.keys(), expected.keys())
+    for name in expected:
+        assert np.allclose(powers[name], expected[name]), name
+
+
+def test_psd_batched():
+    data = synthetic_eeg((5, 3))
+    extractor = SpectralFeatureExtractor(SRATE)
+    freqs, psd = extractor.psd(data)
+    f, p = welch(data, fs=SRATE, nperseg=extractor.nperseg)
+    assert psd.shape == (5, 3, len(f))
+    assert np.allclose(freqs, f)
+    assert np.allclose(psd, p)
+
+    # The single channel and the odd segment length
+    extractor = SpectralFeatureExtractor(SRATE, nperseg=125)
+    freqs, psd = extractor.psd(data[0, 0])
+    f, p = welch(data[0, 0], fs=SRATE, nperseg=125)
+    assert np.allclose(freqs, f)
+    assert np.allclose(psd, p)
+
+
+def test_psd_noverlap():
+    data = synthetic_eeg((2, 3), seconds=3)
+    for nperseg, noverlap in [(250, 0), (250, 200), (128, 37)]:
+        extractor = SpectralFeatureExtractor(
+            SRATE, nperseg=nperseg, noverlap=noverlap)
+        freqs, psd = extractor.psd(data)
+        f, p = welch(data, fs=SRATE, nperseg=nperseg, noverlap=noverlap)
+        assert np.allclose(freqs, f), (nperseg, noverlap)
+        assert np.allclose(psd, p), (nperseg, noverlap)
+
+
+def test_psd_short():
+    # Shorter than the 2 seconds segment, scipy uses the whole data as the segment
+    data = synthetic_eeg((2, 3), seconds=1.5)
+    extractor = SpectralFeatureExtractor(SRATE)
+    assert data.shape[-1] < extractor.nperseg
+    freqs, psd = extractor.psd(data)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        f, p = welch(data, fs=SRATE, nperseg=extractor.nperseg)
+    assert np.allclose(freqs, f)
+    assert np.allclose(psd, p)
+
+    powers = extractor.band_powers(data)
+    assert_powers_close(powers, band_powers_reference(f, p, BANDS))
+
+
+def test_band_powers():
+    data = synthetic_eeg((5, 3))
+    extractor = SpectralFeatureExtractor(SRATE)
+    f, p = welch(data, fs=SRATE, nperseg=extractor.nperseg)
+    expected = band_powers_reference(f, p, BANDS)
+    assert_powers_close(extractor.band_powers(data), expected)
+
+    relative = extractor.band_powers(data, relative=True)
+    assert np.allclose(relative['total'], 1)
+    assert np.allclose(relative['alpha'], expected['alpha'] / expected['total'])
+
+    array = extractor.band_power_array(data)
+    assert array.shape == (5, 3, len(BANDS))
+    for i, name in enumerate(BANDS):
+        assert np.allclose(array[..., i], expected[name]), name
+
+
+def test_integrate_foreign_grid():
+    data = synthetic_eeg((2, 3))
+    extractor = SpectralFeatureExtractor(SRATE)
+    # The finer and the coarser grids
+    for nperseg in [1000, 128]:
+        f, p = welch(data, fs=SRATE, nperseg=nperseg)
+        powers = extractor.integrate(f, p)
+        assert_powers_close(powers, band_powers_reference(f, p, BANDS))
+
+    # The grid of the same length but the other sampling rate
+    f, p = welch(data, fs=SRATE * 2, nperseg=extractor.nperseg)
+    assert len(f) == len(extractor.freqs)
+    powers = extractor.integrate(f, p)
+    assert_powers_close(powers, band_powers_reference(f, p, BANDS))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    test_psd_batched()
+    print('psd_batched: OK')
+    test_psd_noverlap()
+    print('psd_noverlap: OK')
+    test_psd_short()
+    print('psd_short: OK')
+    test_band_powers()
+    print('band_powers: OK')
+    test_integrate_foreign_grid()
+    print('integrate_foreign_grid: OK')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
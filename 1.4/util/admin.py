@@ -0,0 +1,57 @@
+"""
+File: admin.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The admin-only routes, they require the token in the X-Admin-Token header.
+    The admin routes are disabled when the token is empty.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import hmac
+import functools
+
+from flask import request, jsonify
+
+from .log import logger
+
+ADMIN_HEADER = 'X-Admin-Token'
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def admin_required(token: str):
+    '''Reject the requests without the admin token.'''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            given = request.headers.get(ADMIN_HEADER, '')
+            if not token or not hmac.compare_digest(given, token):
+                logger.warning(f'Admin route is rejected: {request.path}, {request.remote_addr}')
+                return jsonify({'status': 'error', 'msg': 'Forbidden', 'body': '{}'}), 403
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
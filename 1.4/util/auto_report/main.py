@@ -20,7 +20,7 @@ Functions:
 # Requirements and constants
 import markdown
 from pathlib import Path
-from ollama import Client, ChatResponse
+from ollama import Client, AsyncClient, ChatResponse
 
 
 from .util.generator import PDFGenerator
@@ -93,7 +93,15 @@ def checkout_figworkers(report_name: str, report_data: list):
     return workers
 
 
-def generate_report(output_path: Path, report_name: str, report_data: list):
+def build_report(report_name: str, report_data: list):
+    '''
+    Make the figures and the PDF elements, and the message to the ollama.
+
+    :return generator PDFGenerator: the generator with the elements.
+    :return placeholder_idx int: where the ollama advice is inserted.
+    :return msg dict: the message to the ollama.
+    :return need_saves dict: the values to be saved.
+    '''
     title = f'Report: {report_name}'
 
     generator = PDFGenerator()
@@ -161,18 +169,44 @@ def generate_report(output_path: Path, report_name: str, report_data: list):
 
             # generator.insert_page_break()
 
-    try:
-        client = Client(host=ollama_host)
-        print(f'连接到 Ollama 服务器: {ollama_host}')
-        response: ChatResponse = client.chat(
-            model=ollama_model_name,
-            messages=[msg]
-        )
-        ret = response['message']['content']
-        lines = ret.split('</think>', 1)[-1].split('\n')
+    return generator, placeholder_idx, msg, need_saves
+
+
+def ask_ollama(msg: dict) -> str:
+    '''Ask the ollama for the advice, it blocks until the whole answer is generated.'''
+    client = Client(host=ollama_host)
+    print(f'连接到 Ollama 服务器: {ollama_host}')
+    response: ChatResponse = client.chat(
+        model=ollama_model_name,
+        messages=[msg]
+    )
+    return response['message']['content']
+
+
+async def ask_ollama_async(msg: dict) -> str:
+    '''Ask the ollama for the advice, it is awaited by the async server.'''
+    client = AsyncClient(host=ollama_host)
+    print(f'连接到 Ollama 服务器: {ollama_host}')
+    response: ChatResponse = await client.chat(
+        model=ollama_model_name,
+        messages=[msg]
+    )
+    return response['message']['content']
+
+
+def finish_report(generator: PDFGenerator, placeholder_idx: int, advice: str, output_path: Path):
+    '''
+    Insert the ollama advice and generate the PDF.
+
+    :param advice str: the answer of the ollama, None if the ollama is not reachable.
+    '''
+    b = generator.elements[placeholder_idx:]
+    generator.elements = generator.elements[:placeholder_idx]
+    if advice is None:
+        generator.insert_paragraph('AI助手忙线中，请稍后再试。')
+    else:
+        lines = advice.split('</think>', 1)[-1].split('\n')
         # print(lines)
-        b = generator.elements[placeholder_idx:]
-        generator.elements = generator.elements[:placeholder_idx]
         for line in lines:
             if line.strip():
                 generator.insert_paragraph(
@@ -180,16 +214,23 @@ def generate_report(output_path: Path, report_name: str, report_data: list):
         # html_contents = markdown.markdown('\n'.join(lines))
         # generator.insert_paragraph(html_contents, style='Normal')
         generator.insert_page_break()
-        generator.elements.extend(b)
+    generator.elements.extend(b)
+
+    generator.generate(output_path)
+    return output_path
+
+
+def generate_report(output_path: Path, report_name: str, report_data: list):
+    generator, placeholder_idx, msg, need_saves = build_report(
+        report_name, report_data)
+
+    try:
+        advice = ask_ollama(msg)
     except Exception as e:
         print(f'连接到 Ollama 服务器失败: {e}')
-        b = generator.elements[placeholder_idx:]
-        generator.elements = generator.elements[:placeholder_idx]
-        generator.insert_paragraph('AI助手忙线中，请稍后再试。')
-        generator.elements.extend(b)
-        pass
+        advice = None
 
-    generator.generate(output_path)
+    finish_report(generator, placeholder_idx, advice, output_path)
     return output_path, need_saves
 
 
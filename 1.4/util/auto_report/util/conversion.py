@@ -20,14 +20,22 @@ Functions:
 # Requirements and constants
 from io import BytesIO
 from PIL import Image as PILImage
+import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 
 
 # %% ---- 2025-06-09 ------------------------
 # Function and class
-def fig_to_bytes(fig: Figure):
+def fig_to_bytes(fig: Figure, close: bool = True):
+    '''
+    Save the fig into the png bytes.
+
+    :param close bool: close the fig after saving, or the pyplot keeps it for the process life.
+    '''
     buf = BytesIO()
     fig.savefig(buf, format='png')
+    if close:
+        plt.close(fig)
     buf.seek(0)
     return buf
 
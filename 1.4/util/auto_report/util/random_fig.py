@@ -19,15 +19,16 @@ Functions:
 # %% ---- 2025-06-09 ------------------------
 # Requirements and constants
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 
 
 # %% ---- 2025-06-09 ------------------------
 # Function and class
 def mk_random_fig(width: float = 6, height: float = 4):
     pos = np.random.randn(100, 2)
-    fig = plt.figure(figsize=(width, height))
-    fig, ax = plt.subplots(1, 1, figsize=(width, height))
+    # Not registered to the pyplot, it is freed with its last reference
+    fig = Figure(figsize=(width, height))
+    ax = fig.subplots(1, 1)
     ax.scatter(pos[:, 0], pos[:, 1])
     ax.set_title('Random points (100)')
     fig.tight_layout()
@@ -0,0 +1,130 @@
+"""
+File: backend.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Pluggable data access layer.
+    The backend is selected by config.db.backend:
+
+    - mysql: the production db package.
+    - sqlite: the local stand-in, for the development and the load tests.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import contextlib
+
+from pathlib import Path
+from types import SimpleNamespace
+
+from ..log import logger
+
+FUNCTIONS = ['get_train_data', 'get_train_label',
+             'get_predict_data', 'get_model']
+HOT_FUNCTIONS = ['get_predict_data', 'get_model']
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def _unavailable(name: str, error: Exception):
+    def func(*args, **kwargs):
+        raise RuntimeError(f'The data access function is unavailable: {name}, {error}')
+    return func
+
+
+def load_mysql_backend(config) -> SimpleNamespace:
+    '''
+    The db package, its functions raise on call if the package is not found.
+    The pool shared by the db helpers is initialized first when config.db.mysql.host is set,
+    the connections of the db package are borrowed from it.
+    '''
+    conf = config.db.mysql
+    pool = None
+    if conf.host:
+        from .mysql_pool import init_pool, routed_import, route_db_package
+        pool = init_pool(conf)
+
+    try:
+        # The connections made on import are borrowed from the pool too
+        with routed_import(pool) if pool else contextlib.nullcontext():
+            import db.init_connection
+            from db.model_module.model_func import get_model
+            from db.predict_module.predict_func import get_predict_data
+            from db.train_data_module.train_data_func import get_train_data
+            from db.train_label_module.train_label_func import get_train_label
+        if pool is not None:
+            route_db_package(pool)
+        backend = SimpleNamespace(name='mysql',
+                                  get_train_data=get_train_data,
+                                  get_train_label=get_train_label,
+                                  get_predict_data=get_predict_data,
+                                  get_model=get_model)
+    except Exception as e:
+        logger.warning(f'Failed to load the db package: {e}')
+        backend = SimpleNamespace(
+            name='mysql', **{name: _unavailable(name, e) for name in FUNCTIONS})
+
+    if pool is not None:
+        # The hot helpers use the prepared statements
+        hot = HOT_FUNCTIONS if conf.prepared_hot_queries else []
+        for name in FUNCTIONS:
+            setattr(backend, name, pool.instrument(
+                name, getattr(backend, name), hot=name in hot))
+        if conf.health_check_seconds > 0:
+            pool.start_health_checks(conf.health_check_seconds)
+
+    backend.stats = pool.stats if pool else lambda: {}
+    return backend
+
+
+def load_sqlite_backend(config):
+    '''The local sqlite stand-in.'''
+    from .sqlite_db import SQLiteDB
+    conf = config.db.sqlite
+    path = Path(conf.path)
+    if not path.is_absolute():
+        path = Path(config.project.dir, path)
+    backend = SQLiteDB(path, pool_size=conf.pool_size,
+                       predict_seconds=config.db.predict_seconds)
+    backend.name = 'sqlite'
+    return backend
+
+
+def load_backend(config):
+    '''
+    Load the data access backend.
+
+    :param config: the OmegaConf config.
+    :return: the backend, it has the functions of FUNCTIONS.
+    '''
+    name = config.db.backend
+    if name == 'mysql':
+        backend = load_mysql_backend(config)
+    elif name == 'sqlite':
+        backend = load_sqlite_backend(config)
+    else:
+        raise ValueError(f'Unknown db backend: {name}')
+    logger.info(f'Using db backend: {name}')
+    return backend
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
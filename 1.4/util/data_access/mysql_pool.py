@@ -0,0 +1,423 @@
+"""
+File: mysql_pool.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Pooled MySQL connections shared by all the db helpers.
+
+    - The db package opens its connections by mysql.connector.connect,
+      it is routed to the pool only in the modules of the db package by route_db_package(),
+      the connections made while the package is imported are routed by routed_import(),
+      so the helpers borrow the pooled connections and return them on close.
+      The other users of mysql.connector are not affected.
+    - The borrowers wait when the pool is exhausted, for checkout_timeout seconds, then PoolError is raised.
+    - The pool pings the connection on checkout and reconnects it when it is broken,
+      and health_check() pings on the timer, its result is in the stats of /db/stats.
+    - The sessions are not reset on return, so the prepared statements are kept per connection.
+      The cursors of the hot helpers are the server-side prepared ones, kept per connection,
+      they are evicted when the connection is reconnected or closed.
+    - The latency of every db helper is recorded.
+
+    The connection the db package keeps open forever holds its slot of the pool,
+    the borrowers fail by the timeout instead of waiting forever when all the slots are held.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import sys
+import time
+import functools
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from ..log import logger
+
+# The db helper running in the thread, set by MySQLPool.instrument
+_LOCAL = threading.local()
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+class QueryMetrics:
+    '''The latency of the named queries.'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def record(self, name: str, cost: float, error: bool = False):
+        with self.lock:
+            m = self.queries.setdefault(
+                name, dict(count=0, errors=0, total=0.0, max=0.0, last=0.0))
+            m['count'] += 1
+            m['errors'] += int(error)
+            m['total'] += cost
+            m['max'] = max(m['max'], cost)
+            m['last'] = cost
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {name: dict(m, mean=m['total'] / m['count'] if m['count'] else 0.0)
+                    for name, m in self.queries.items()}
+
+
+class KeptCursor:
+    '''The prepared cursor kept on the connection, close() drains the rows and keeps the statement.'''
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def close(self):
+        try:
+            if self.cursor.with_rows:
+                self.cursor.fetchall()
+        except Exception:
+            pass
+        return True
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class PooledConnection:
+    '''The pooled connection handed to the db helpers, close() returns it to the pool.'''
+
+    def __init__(self, pool, conn):
+        self.pool = pool
+        self.conn = conn
+        self.closed = False
+
+    def cursor(self, *args, **kwargs):
+        if getattr(_LOCAL, 'hot', False) and not args and 'prepared' not in kwargs:
+            return self.pool.prepared_cursor(self.conn, **kwargs)
+        return self.conn.cursor(*args, **kwargs)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pool.release(self.conn)
+
+    def disconnect(self):
+        '''Really close the connection, the pool reconnects it on the next checkout.'''
+        self.pool.evict(self.conn.connection_id)
+        try:
+            self.conn.disconnect()
+        finally:
+            self.close()
+
+    shutdown = disconnect
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        # The helper forgot to close it
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class MySQLPool:
+    '''The pooled MySQL connections shared by the db helpers.'''
+
+    def __init__(self, host: str, port: int, user: str, password: str, database: str, pool_size: int = 8, pool_name: str = 'bci', checkout_timeout: float = 30):
+        '''
+        :param checkout_timeout float: the seconds the borrower waits for the free connection.
+        '''
+        from mysql.connector.pooling import MySQLConnectionPool
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.pool = MySQLConnectionPool(pool_name=pool_name,
+                                        pool_size=pool_size,
+                                        # Keep the prepared statements across the borrows
+                                        pool_reset_session=False,
+                                        host=host,
+                                        port=port,
+                                        user=user,
+                                        password=password,
+                                        database=database,
+                                        autocommit=True)
+        # Block the borrowers when the pool is exhausted, up to checkout_timeout
+        self.available = threading.BoundedSemaphore(pool_size)
+        # (connection id, cursor kwargs) -> KeptCursor
+        self.prepared = {}
+        # The connection ids by the last checkout, only pool_size of them are alive
+        self.connection_ids = OrderedDict()
+        self.evictions = 0
+        self.metrics = QueryMetrics()
+        self.lock = threading.Lock()
+        self.borrowed = 0
+        self.statement_resets = 0
+        self.checkout_failures = 0
+        self.health = dict(ok=None, checked=None, latency=None, error=None, failures=0)
+        self.stopped = threading.Event()
+        self.unrouted = set()
+        logger.info(f'Initialize mysql pool: {host}:{port}/{database}, size: {pool_size}')
+
+    def checkout(self):
+        '''Borrow the connection, the pool pings it and reconnects it if it is broken.'''
+        from mysql.connector.errors import PoolError
+        tic = time.perf_counter()
+        if not self.available.acquire(timeout=self.checkout_timeout):
+            with self.lock:
+                self.checkout_failures += 1
+            raise PoolError(f'No free connection in {self.checkout_timeout} seconds, '
+                            f'{self.borrowed} of {self.pool_size} are borrowed')
+        try:
+            conn = self.pool.get_connection()
+        except Exception:
+            self.available.release()
+            with self.lock:
+                self.checkout_failures += 1
+            raise
+        self._seen(conn.connection_id)
+        self.metrics.record('_checkout', time.perf_counter() - tic)
+        with self.lock:
+            self.borrowed += 1
+        _LOCAL.connects = getattr(_LOCAL, 'connects', 0) + 1
+        return conn
+
+    def release(self, conn):
+        with self.lock:
+            self.borrowed -= 1
+        try:
+            conn.close()
+        finally:
+            self.available.release()
+
+    def connect(self, *args, **kwargs) -> PooledConnection:
+        '''The mysql.connector.connect of the db package, the arguments are ignored.'''
+        return PooledConnection(self, self.checkout())
+
+    @contextmanager
+    def connection(self):
+        '''Borrow the connection in the context.'''
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def _seen(self, connection_id: int):
+        '''
+        Track the connection id of the checkout.
+        The reconnected connection has the new id, the ids beyond the pool size are the dead ones.
+        '''
+        with self.lock:
+            self.connection_ids[connection_id] = True
+            self.connection_ids.move_to_end(connection_id)
+            dead = []
+            while len(self.connection_ids) > self.pool_size:
+                dead.append(self.connection_ids.popitem(last=False)[0])
+        for connection_id in dead:
+            self.evict(connection_id)
+
+    def evict(self, connection_id: int):
+        '''Drop the prepared cursors of the connection, it is reconnected or closed.'''
+        with self.lock:
+            keys = [key for key in self.prepared if key[0] == connection_id]
+            cursors = [self.prepared.pop(key) for key in keys]
+            self.connection_ids.pop(connection_id, None)
+            self.evictions += int(bool(keys))
+        for cursor in cursors:
+            try:
+                cursor.cursor.close()
+            except Exception:
+                pass
+
+    def prepared_cursor(self, conn, **kwargs) -> KeptCursor:
+        '''The prepared cursor kept on the connection, the statements live with its session.'''
+        key = (conn.connection_id, tuple(sorted(kwargs.items())))
+        with self.lock:
+            cursor = self.prepared.get(key)
+        if cursor is None:
+            cursor = KeptCursor(conn.cursor(prepared=True, **kwargs))
+            with self.lock:
+                self.prepared[key] = cursor
+        return cursor
+
+    def instrument(self, name: str, func, hot: bool = False):
+        '''
+        Record the latency of the db helper.
+
+        :param hot bool: the cursors of the helper are the prepared ones.
+        '''
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _LOCAL.hot = hot
+            _LOCAL.connects = 0
+            tic = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                # Drop the statements, the failed connection may be reconnected with the new session
+                with self.lock:
+                    self.prepared.clear()
+                    self.statement_resets += 1
+                raise
+            finally:
+                _LOCAL.hot = False
+                self.metrics.record(name, time.perf_counter() - tic, error)
+                if not error and _LOCAL.connects == 0 and name not in self.unrouted:
+                    self.unrouted.add(name)
+                    logger.warning(f'The db helper does not use the pooled connections: {name}')
+        return wrapper
+
+    def health_check(self) -> bool:
+        '''Ping one connection, the result is kept in the stats.'''
+        tic = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                connection_id = conn.connection_id
+                conn.ping(reconnect=True, attempts=1)
+                if conn.connection_id != connection_id:
+                    # Reconnected, the statements of the old session are gone
+                    self.evict(connection_id)
+                    self._seen(conn.connection_id)
+            ok, error = True, None
+        except Exception as e:
+            logger.warning(f'MySQL health check failed: {e}')
+            ok, error = False, str(e)
+        with self.lock:
+            self.health.update(ok=ok,
+                               checked=time.time(),
+                               latency=time.perf_counter() - tic,
+                               error=error,
+                               failures=self.health['failures'] + int(not ok))
+        return ok
+
+    def start_health_checks(self, interval: float):
+        '''Run the health check in the background thread every interval seconds.'''
+        def loop():
+            while not self.stopped.wait(interval):
+                self.health_check()
+
+        self.health_check()
+        threading.Thread(target=loop, name='mysql-health', daemon=True).start()
+        return self
+
+    def stats(self) -> dict:
+        with self.lock:
+            pool = dict(size=self.pool_size,
+                        borrowed=self.borrowed,
+                        prepared_cursors=len(self.prepared),
+                        prepared_evictions=self.evictions,
+                        statement_resets=self.statement_resets,
+                        checkout_failures=self.checkout_failures,
+                        unrouted_helpers=sorted(self.unrouted))
+            health = dict(self.health)
+        return dict(pool=pool, health=health, queries=self.metrics.stats())
+
+
+POOL: MySQLPool = None
+
+
+def init_pool(conf) -> MySQLPool:
+    '''
+    Initialize the pool shared by the db helpers.
+
+    :param conf: the config.db.mysql.
+    '''
+    global POOL
+    POOL = MySQLPool(host=conf.host,
+                     port=conf.port,
+                     user=conf.user,
+                     password=conf.password,
+                     database=conf.database,
+                     pool_size=conf.pool_size,
+                     checkout_timeout=conf.checkout_timeout)
+    return POOL
+
+
+def get_pool() -> MySQLPool:
+    '''Get the pool shared by the db helpers.'''
+    assert POOL is not None, 'The mysql pool is not initialized'
+    return POOL
+
+
+class RoutedModule:
+    '''The mysql or the mysql.connector module seen by the db package, the connect borrows from the pool.'''
+
+    def __init__(self, module, **attrs):
+        self._module = module
+        self.__dict__.update(attrs)
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+
+@contextmanager
+def routed_import(pool: MySQLPool):
+    '''Route the mysql.connector.connect to the pool while the db package is imported, then restore it.'''
+    import mysql.connector
+    connect = mysql.connector.connect
+    mysql.connector.connect = pool.connect
+    try:
+        yield
+    finally:
+        mysql.connector.connect = connect
+
+
+def route_db_package(pool: MySQLPool, package: str = 'db') -> list:
+    '''
+    Route the mysql.connector.connect of the modules of the db package to the pool,
+    the global mysql.connector is not changed.
+
+    :return list: the names of the routed modules.
+    '''
+    import mysql
+    import mysql.connector
+    connector = RoutedModule(mysql.connector, connect=pool.connect)
+    routes = {id(mysql): RoutedModule(mysql, connector=connector),
+              id(mysql.connector): connector,
+              id(mysql.connector.connect): pool.connect}
+    routed = []
+    for name, module in list(sys.modules.items()):
+        if module is None or not (name == package or name.startswith(f'{package}.')):
+            continue
+        for attr, value in list(vars(module).items()):
+            if id(value) in routes:
+                setattr(module, attr, routes[id(value)])
+                routed.append(name)
+    routed = sorted(set(routed))
+    logger.info(f'The mysql.connector.connect is routed to the pool in: {routed}')
+    return routed
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,129 @@
+"""
+File: seed.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Seed the local sqlite db with the synthetic EEG.
+    The EEG is 250 Hz, the 1/f background with the alpha, theta and beta rhythms.
+    The labelled blocks alternate between the attention and non-attention states,
+    the attention state has the lower theta / beta ratio.
+
+    Usage (from the 1.4 folder):
+        python -m util.data_access.seed --db D:/BCIProject/local.sqlite --subjects 10 --seconds 300
+
+    Then set config.db.backend to "sqlite".
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import argparse
+import numpy as np
+
+from pathlib import Path
+
+from .sqlite_db import SQLiteDB, now_ms
+
+SRATE = 250
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def pink_noise(rng: np.random.Generator, channels: int, samples: int) -> np.ndarray:
+    '''The 1/f noise by shaping the white noise in the frequency domain.'''
+    spec = np.fft.rfft(rng.standard_normal((channels, samples)), axis=-1)
+    freqs = np.fft.rfftfreq(samples, 1.0 / SRATE)
+    freqs[0] = freqs[1]
+    spec /= np.sqrt(freqs)
+    return np.fft.irfft(spec, n=samples, axis=-1)
+
+
+def synthetic_eeg(rng: np.random.Generator, channels: int, seconds: float, attention: bool, t0: float = 0) -> np.ndarray:
+    '''
+    Generate the synthetic EEG in microvolts.
+
+    :param attention bool: the attention state, the theta is weaker and the beta is stronger.
+    :return np.ndarray: the (channels, samples) array.
+    '''
+    samples = int(seconds * SRATE)
+    t = t0 + np.arange(samples) / SRATE
+    theta, beta = (0.6, 1.4) if attention else (1.4, 0.6)
+    rhythms = [(10, 1.0), (6, theta), (20, beta)]
+    x = pink_noise(rng, channels, samples) * 5
+    for freq, amp in rhythms:
+        phase = rng.uniform(0, 2 * np.pi, (channels, 1))
+        x += amp * 10 * np.sin(2 * np.pi * freq * t + phase)
+    return x
+
+
+def seed_subject(db: SQLiteDB, subject: dict, seconds: int, channels: int, block_seconds: int, label_types: tuple, rng: np.random.Generator, t_start: int):
+    '''Seed the EEG records and the labels of the subject.'''
+    records = []
+    labels = []
+    for block_start in range(0, seconds, block_seconds):
+        attention = (block_start // block_seconds) % 2 == 0
+        labels.append({'type': label_types[0 if attention else 1],
+                       'time': t_start + block_start * 1000})
+        n = min(block_seconds, seconds - block_start)
+        x = synthetic_eeg(rng, channels, n, attention, t0=block_start)
+        for i in range(n):
+            records.append((t_start + (block_start + i) * 1000,
+                            x[:, i * SRATE:(i + 1) * SRATE]))
+    db.insert_eeg(records, **subject)
+    db.insert_labels(labels, **subject)
+
+
+def seed(path: Path, subjects: int = 10, seconds: int = 300, channels: int = 8, block_seconds: int = 30, label_types: tuple = (1, 2), project_name: str = 'attention', seed: int = 0):
+    '''
+    Seed the sqlite db.
+
+    :return list: the subjects.
+    '''
+    db = SQLiteDB(path)
+    rng = np.random.default_rng(seed)
+    t_start = now_ms() - seconds * 1000
+    output = []
+    for i in range(subjects):
+        subject = dict(org_id='org', user_id=f'user-{i}',
+                       project_name=project_name, name=f'name-{i}')
+        seed_subject(db, subject, seconds, channels,
+                     block_seconds, label_types, rng, t_start)
+        output.append(subject)
+    db.pool.close()
+    return output
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed the local sqlite db with the synthetic EEG.')
+    parser.add_argument('--db', type=Path, default=Path('local.sqlite'))
+    parser.add_argument('--subjects', type=int, default=10)
+    parser.add_argument('--seconds', type=int, default=300)
+    parser.add_argument('--channels', type=int, default=8)
+    parser.add_argument('--block-seconds', type=int, default=30)
+    parser.add_argument('--label-types', type=int, nargs=2, default=[1, 2])
+    parser.add_argument('--project-name', default='attention')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    subjects = seed(args.db, args.subjects, args.seconds, args.channels,
+                    args.block_seconds, tuple(args.label_types), args.project_name, args.seed)
+    print(f'Seeded {len(subjects)} subjects into {args.db}')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
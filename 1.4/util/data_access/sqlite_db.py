@@ -0,0 +1,316 @@
+"""
+File: sqlite_db.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Local SQLite stand-in for the db package.
+    It exposes the same functions as the db package,
+    get_train_data, get_train_label, get_predict_data and get_model,
+    plus the bulk, time-range and incremental ("since timestamp") variants.
+
+    The EEG records are 1 second (channels x 250 samples) chunks,
+    they are stored as float32 blobs and returned as nested lists, like the json from the db.
+    The times are milliseconds.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import json
+import time
+import queue
+import sqlite3
+import threading
+import numpy as np
+
+from pathlib import Path
+from contextlib import contextmanager
+
+from ..log import logger
+
+SUBJECT_KEYS = ['org_id', 'user_id', 'project_name', 'name']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS eeg_record (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    org_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    channels INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS eeg_record_subject_time
+    ON eeg_record (org_id, user_id, project_name, name, create_time);
+
+CREATE TABLE IF NOT EXISTS train_label (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    org_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type INTEGER NOT NULL,
+    time INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS train_label_subject_time
+    ON train_label (org_id, user_id, project_name, name, time);
+
+CREATE TABLE IF NOT EXISTS model (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    org_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    models TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS model_subject_time
+    ON model (org_id, user_id, project_name, name, create_time);
+'''
+
+SUBJECT_WHERE = 'org_id=? AND user_id=? AND project_name=? AND name=?'
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def subject_of(**kwargs) -> tuple:
+    return tuple(str(kwargs[k]) for k in SUBJECT_KEYS)
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class SQLitePool:
+    '''The pool of the sqlite connections, the connections are shared across the threads.'''
+
+    def __init__(self, path: Path, size: int = 8):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self.connections.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+        logger.info(f'Initialize sqlite pool: {self.path}, size: {size}')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        '''Borrow a connection, the transaction is committed on success.'''
+        conn = self.connections.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.connections.put(conn)
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get().close()
+
+
+class SQLiteDB:
+    '''The data access functions on the sqlite file.'''
+
+    def __init__(self, path: Path, pool_size: int = 8, predict_seconds: int = 10):
+        '''
+        :param path Path: the sqlite file.
+        :param pool_size int: the size of the connection pool.
+        :param predict_seconds int: the length of the predict data, in seconds.
+        '''
+        self.pool = SQLitePool(path, pool_size)
+        self.predict_seconds = predict_seconds
+
+    def stats(self) -> dict:
+        return dict(pool=dict(size=self.pool.size,
+                              available=self.pool.connections.qsize()))
+
+    # ----------------------------------------
+    # ---- Rows conversion ----
+    @staticmethod
+    def _eeg(row: sqlite3.Row) -> dict:
+        data = np.frombuffer(row['data'], dtype=np.float32).reshape(
+            row['channels'], row['samples'])
+        return dict(id=row['id'],
+                    org_id=row['org_id'],
+                    user_id=row['user_id'],
+                    project_name=row['project_name'],
+                    name=row['name'],
+                    create_time=row['create_time'],
+                    data=data.tolist())
+
+    @staticmethod
+    def _label(row: sqlite3.Row) -> dict:
+        return dict(id=row['id'], type=row['type'], time=row['time'])
+
+    @staticmethod
+    def _model(row: sqlite3.Row) -> dict:
+        return dict(id=row['id'],
+                    create_time=row['create_time'],
+                    models=json.loads(row['models']))
+
+    def _select(self, sql: str, params: tuple, convert) -> list:
+        with self.pool.connection() as conn:
+            return [convert(row) for row in conn.execute(sql, params)]
+
+    # ----------------------------------------
+    # ---- The db package functions ----
+    def get_train_data(self, **kwargs) -> list:
+        '''All the EEG records of the subject, time ascending.'''
+        return self._select(f'SELECT * FROM eeg_record WHERE {SUBJECT_WHERE} ORDER BY create_time',
+                            subject_of(**kwargs), self._eeg)
+
+    def get_train_label(self, **kwargs) -> list:
+        '''All the labels of the subject, time ascending.'''
+        return self._select(f'SELECT * FROM train_label WHERE {SUBJECT_WHERE} ORDER BY time',
+                            subject_of(**kwargs), self._label)
+
+    def get_predict_data(self, **kwargs) -> list:
+        '''The latest predict_seconds EEG records of the subject, time ascending.'''
+        rows = self._select(f'SELECT * FROM eeg_record WHERE {SUBJECT_WHERE} ORDER BY create_time DESC LIMIT ?',
+                            subject_of(**kwargs) + (self.predict_seconds,), self._eeg)
+        return rows[::-1]
+
+    def get_model(self, **kwargs) -> list:
+        '''All the model records of the subject, time ascending.'''
+        return self._select(f'SELECT * FROM model WHERE {SUBJECT_WHERE} ORDER BY create_time',
+                            subject_of(**kwargs), self._model)
+
+    # ----------------------------------------
+    # ---- Time-range and incremental variants ----
+    def get_train_data_range(self, start: int, stop: int, **kwargs) -> list:
+        '''The EEG records of the subject in [start, stop) milliseconds.'''
+        return self._select(f'SELECT * FROM eeg_record WHERE {SUBJECT_WHERE} AND create_time >= ? AND create_time < ? ORDER BY create_time',
+                            subject_of(**kwargs) + (start, stop), self._eeg)
+
+    def get_train_label_range(self, start: int, stop: int, **kwargs) -> list:
+        '''The labels of the subject in [start, stop) milliseconds.'''
+        return self._select(f'SELECT * FROM train_label WHERE {SUBJECT_WHERE} AND time >= ? AND time < ? ORDER BY time',
+                            subject_of(**kwargs) + (start, stop), self._label)
+
+    def get_predict_data_since(self, since: int, **kwargs) -> list:
+        '''The EEG records of the subject newer than since milliseconds, for the sliding predictions.'''
+        return self._select(f'SELECT * FROM eeg_record WHERE {SUBJECT_WHERE} AND create_time > ? ORDER BY create_time',
+                            subject_of(**kwargs) + (since,), self._eeg)
+
+    def get_model_since(self, since: int, **kwargs) -> list:
+        '''The model records of the subject newer than since milliseconds.'''
+        return self._select(f'SELECT * FROM model WHERE {SUBJECT_WHERE} AND create_time > ? ORDER BY create_time',
+                            subject_of(**kwargs) + (since,), self._model)
+
+    def get_recent_models(self, n: int) -> list:
+        '''The models of the latest n model records of all the subjects, newest first.'''
+        records = self._select('SELECT * FROM model ORDER BY create_time DESC LIMIT ?',
+                               (n,), self._model)
+        return [m for rec in records for m in rec['models']][:n]
+
+    # ----------------------------------------
+    # ---- Bulk variants ----
+    def _bulk(self, table: str, order: str, subjects: list, convert) -> dict:
+        keys = [subject_of(**s) for s in subjects]
+        output = {k: [] for k in keys}
+        if not keys:
+            return output
+        values = ', '.join(['(?, ?, ?, ?)'] * len(keys))
+        params = tuple(v for k in keys for v in k)
+        sql = f'SELECT * FROM {table} WHERE (org_id, user_id, project_name, name) IN (VALUES {values}) ORDER BY {order}'
+        with self.pool.connection() as conn:
+            for row in conn.execute(sql, params):
+                output[tuple(row[k] for k in SUBJECT_KEYS)].append(
+                    convert(row))
+        return output
+
+    def get_train_data_bulk(self, subjects: list) -> dict:
+        '''The EEG records of the subjects in one query, {subject tuple: records}.'''
+        return self._bulk('eeg_record', 'create_time', subjects, self._eeg)
+
+    def get_train_label_bulk(self, subjects: list) -> dict:
+        '''The labels of the subjects in one query, {subject tuple: labels}.'''
+        return self._bulk('train_label', 'time', subjects, self._label)
+
+    def get_model_bulk(self, subjects: list) -> dict:
+        '''The model records of the subjects in one query, {subject tuple: records}.'''
+        return self._bulk('model', 'create_time', subjects, self._model)
+
+    # ----------------------------------------
+    # ---- Inserts, for the seeding and the load tests ----
+    def insert_eeg(self, records: list, **kwargs):
+        '''
+        Insert the EEG records.
+
+        :param records list: the [(create_time, (channels, samples) array), ...].
+        '''
+        subject = subject_of(**kwargs)
+        rows = []
+        for t, data in records:
+            data = np.asarray(data, dtype=np.float32)
+            rows.append(subject + (int(t), data.shape[0],
+                        data.shape[1], data.tobytes()))
+        with self.pool.connection() as conn:
+            conn.executemany('INSERT INTO eeg_record (org_id, user_id, project_name, name, create_time, channels, samples, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             rows)
+
+    def insert_labels(self, labels: list, **kwargs):
+        '''
+        Insert the labels.
+
+        :param labels list: the [{'type', 'time'}, ...].
+        '''
+        subject = subject_of(**kwargs)
+        with self.pool.connection() as conn:
+            conn.executemany('INSERT INTO train_label (org_id, user_id, project_name, name, type, time) VALUES (?, ?, ?, ?, ?, ?)',
+                             [subject + (int(e['type']), int(e['time'])) for e in labels])
+
+    def insert_model(self, models: list, create_time: int = None, **kwargs):
+        '''
+        Insert the model record, like the upstream service does with the /train response.
+
+        :param models list: the [{'model_path', 'model_name'}, ...].
+        '''
+        with self.pool.connection() as conn:
+            conn.execute('INSERT INTO model (org_id, user_id, project_name, name, create_time, models) VALUES (?, ?, ?, ?, ?, ?)',
+                         subject_of(**kwargs) + (create_time or now_ms(), json.dumps(models)))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    import tempfile
+    db = SQLiteDB(Path(tempfile.mkdtemp(), 'local.sqlite'))
+    subject = dict(org_id='org', user_id='user',
+                   project_name='project', name='name')
+    db.insert_eeg([(i * 1000, np.random.randn(8, 250))
+                  for i in range(30)], **subject)
+    db.insert_labels([{'type': 1, 'time': 0}, {'type': 2, 'time': 15000}],
+                     **subject)
+    print(len(db.get_train_data(**subject)), db.get_train_label(**subject))
+    print([e['create_time'] for e in db.get_predict_data(**subject)])
+    print(len(db.get_predict_data_since(25000, **subject)))
+    print({k: len(v) for k, v in db.get_train_data_bulk([subject]).items()})
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -20,10 +20,23 @@ Functions:
 # Requirements and constants
 import time
 import joblib
+import hashlib
 from pathlib import Path
+from datetime import datetime
 from .log import logger
 
 
+def shard_path(directory: Path, fname: str, by_day: bool = True) -> Path:
+    '''
+    The sharded path of the file, <directory>/<YYYYMMDD>/<sha256(fname)[:2]>/<fname>.
+    The flat directories with 1e5+ entries are slow on both NTFS and ext4.
+    '''
+    shard = hashlib.sha256(fname.encode()).hexdigest()[:2]
+    if by_day:
+        return Path(directory, datetime.now().strftime('%Y%m%d'), shard, fname)
+    return Path(directory, shard, fname)
+
+
 # %% ---- 2025-05-19 ------------------------
 # Function and class
 class DirSystem:
@@ -31,6 +44,8 @@ class DirSystem:
     model_dir: Path
     report_dir: Path
     dumps_dir: Path
+    features_dir: Path
+    shard_dumps: bool = True
 
     @logger.catch(reraise=True)
     def load_config(self, config):
@@ -41,6 +56,9 @@ class DirSystem:
             Path(config.project.dir, config.report.subdir))
         self.dumps_dir = self.mkdir(
             Path(config.project.dir, config.dumps.subdir))
+        self.features_dir = self.mkdir(
+            Path(config.project.dir, config.features.subdir))
+        self.shard_dumps = config.dumps.get('shard', True)
 
     @logger.catch(reraise=True)
     def mkdir(self, dir: Path):
@@ -53,12 +71,14 @@ class DirSystem:
 
     @logger.catch
     def dump_variables(self, dump_name: str, dump_body: dict):
-        from datetime import datetime
         import random
         day = datetime.now().strftime('%Y%m%d')
         detail = datetime.now().strftime('%Y%m%d-%H%M%S')
-        path = self.dumps_dir.joinpath(
-            f'{day}', f'{dump_name}.{detail}-{random.random():0.8f}.dump')
+        fname = f'{dump_name}.{detail}-{random.random():0.8f}.dump'
+        if self.shard_dumps:
+            path = shard_path(self.dumps_dir, fname)
+        else:
+            path = self.dumps_dir.joinpath(f'{day}', fname)
         path.parent.mkdir(parents=True, exist_ok=True)
         joblib.dump(dump_body, path)
         logger.debug(f'Dump variables: {list(dump_body.keys())} -> {path}')
@@ -68,14 +88,20 @@ class DirSystem:
 class MyReport:
     directory: Path
 
-    def __init__(self, directory: Path):
+    def __init__(self, directory: Path, shard: bool = True):
         self.directory = Path(directory)
         self.directory.mkdir(parents=True, exist_ok=True)
+        self.shard = shard
         logger.info(f'Initialize with directory: {directory}')
 
     def mk_report_path(self, prefix='report'):
         rnd = time.time()
-        return self.directory.joinpath(f'{prefix}-{rnd}.pdf')
+        fname = f'{prefix}-{rnd}.pdf'
+        if self.shard:
+            path = shard_path(self.directory, fname)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            return path
+        return self.directory.joinpath(fname)
 
 
 class ModelCache:
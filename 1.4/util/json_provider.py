@@ -0,0 +1,126 @@
+"""
+File: json_provider.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The fast JSON provider of the app, for the large bodies with the EEG arrays.
+    The request.get_json() and the jsonify use it once it is set on the app.
+
+    - The orjson encodes and decodes several times faster than the stdlib json,
+      and it serializes the numpy arrays natively.
+    - The stdlib provider is the fallback when orjson is not installed,
+      the numpy arrays are converted by the default hook.
+
+    The keys are not sorted, the order of the body is kept.
+
+    The NaN and the Infinity are not JSON, the providers differ on them:
+    the orjson writes them as null, the stdlib writes the NaN and Infinity literals,
+    which the strict parsers of the clients reject. The predictions and the features
+    with the non-finite values are received as null with the orjson provider.
+    On reading, the orjson rejects them, so the body is read again by the stdlib json,
+    the request bodies with the NaN samples are accepted as before.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import json
+import numpy as np
+
+from pathlib import Path
+from flask.json.provider import DefaultJSONProvider
+
+from .log import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def _default(o):
+    '''The types the encoders do not know.'''
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, Path):
+        return o.as_posix()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    return DefaultJSONProvider.default(o)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    '''The stdlib provider with the numpy support.'''
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    '''The orjson provider, the numpy arrays are serialized natively.'''
+    option = 0 if orjson is None else (orjson.OPT_SERIALIZE_NUMPY |
+                                       orjson.OPT_NON_STR_KEYS)
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # The NaN and Infinity of the bodies, the stdlib json accepts them
+            return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        # The bytes are sent as they are, not decoded and encoded again
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.option),
+            mimetype=self.mimetype)
+
+
+def use_json_provider(app, name: str = 'orjson'):
+    '''
+    Set the JSON provider of the app.
+
+    :param name str: orjson | stdlib, the stdlib is used when orjson is not installed.
+    '''
+    if name == 'orjson' and orjson is None:
+        logger.warning('The orjson is not installed, use the stdlib json')
+        name = 'stdlib'
+    provider = OrjsonProvider if name == 'orjson' else NumpyJSONProvider
+    app.json_provider_class = provider
+    app.json = provider(app)
+    logger.info(f'Use the JSON provider: {provider.__name__}')
+    return app.json
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    from flask import Flask
+    app = Flask(__name__)
+    for name in ['orjson', 'stdlib']:
+        provider = use_json_provider(app, name)
+        s = provider.dumps({'data': np.arange(4).reshape(2, 2), 'x': np.float32(1.5)})
+        print(name, s, provider.loads(s))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -59,6 +59,11 @@ class ERRORS:
         name = 'Internal Server Error'
         code = 500
 
+    class not_ready_error:
+        msg = '模型预热中，服务尚未就绪'
+        name = 'Service Unavailable'
+        code = 503
+
 
 # %% ---- 2025-05-07 ------------------------
 # Play ground
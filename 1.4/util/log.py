@@ -7,6 +7,14 @@ Copyright & Email: chuncheng.zhang@ia.ac.cn
 Purpose:
     The log for the project.
 
+    The hot paths log by the RouteLog of their routes:
+
+    - The payloads are summarized, the arrays and the long lists are logged by their shapes.
+    - The summary is built only when the record is emitted, by the lazy option of loguru.
+    - The records below WARNING are filtered by the per-route level and sampled by the per-route rate.
+
+    The levels of the sinks and the routes are set by configure(config.log).
+
 Functions:
     1. Requirements and constants
     2. Function and class
@@ -18,26 +26,167 @@ Functions:
 
 # %% ---- 2025-05-07 ------------------------
 # Requirements and constants
+import sys
+import random
+import functools
+import numpy as np
+
 from loguru import logger
 from datetime import datetime
 
 t = datetime.strftime(datetime.now(), '%Y%m%d-%H%M%S')
 
+# The payload summary
+MAX_ITEMS = 8
+MAX_STR = 200
+
 # %% ---- 2025-05-07 ------------------------
 # Function and class
-logger.add(f'log/debug.{t}.log',
-           level='DEBUG',
-           enqueue=True,
-           backtrace=True,
-           diagnose=True,
-           )
-
-logger.add(f'log/info.{t}.log',
-           level='INFO',
-           enqueue=True,
-           backtrace=True,
-           diagnose=True,
-           )
+SINKS = [
+    logger.add(f'log/debug.{t}.log',
+               level='DEBUG',
+               enqueue=True,
+               backtrace=True,
+               diagnose=True,
+               ),
+
+    logger.add(f'log/info.{t}.log',
+               level='INFO',
+               enqueue=True,
+               backtrace=True,
+               diagnose=True,
+               ),
+]
+
+
+def _shape_of(obj: list) -> list:
+    shape = []
+    while isinstance(obj, (list, tuple)):
+        shape.append(len(obj))
+        if not obj:
+            break
+        obj = obj[0]
+    return shape
+
+
+def summarize(obj, max_items: int = None, max_str: int = None):
+    '''
+    Summarize the payload for the log, the arrays and the long lists are replaced by their shapes.
+
+    :param obj: the payload, like the request body.
+    :return: the summary, it is small whatever the payload is.
+    '''
+    max_items = max_items or MAX_ITEMS
+    max_str = max_str or MAX_STR
+    if isinstance(obj, np.ndarray):
+        return f'<ndarray {obj.dtype} {obj.shape}>'
+    if isinstance(obj, dict):
+        output = {k: summarize(v, max_items, max_str)
+                  for k, v in list(obj.items())[:max_items]}
+        if len(obj) > max_items:
+            output['...'] = f'<{len(obj) - max_items} more keys>'
+        return output
+    if isinstance(obj, (list, tuple)):
+        if len(obj) > max_items or (obj and isinstance(obj[0], (list, tuple))):
+            return f'<{type(obj).__name__} {_shape_of(obj)}>'
+        return type(obj)(summarize(v, max_items, max_str) for v in obj)
+    if isinstance(obj, (str, bytes)) and len(obj) > max_str:
+        return f'{obj[:max_str]!r}...<{len(obj)} chars>'
+    return obj
+
+
+class RouteLog:
+    '''The log of the route, filtered by its level and sampled by its rate.'''
+
+    def __init__(self, name: str, level: str = 'DEBUG', sample: float = 1.0):
+        '''
+        :param level str: the lowest level of the route.
+        :param sample float: the rate of the records below WARNING to be kept.
+        '''
+        self.name = name
+        self.level = logger.level(level).no
+        self.sample = sample
+
+    def enabled(self, level: str) -> bool:
+        no = logger.level(level).no
+        if no < self.level:
+            return False
+        if no < logger.level('WARNING').no and self.sample < 1.0:
+            return random.random() < self.sample
+        return True
+
+    def log(self, level: str, msg: str, *payloads):
+        '''Log the msg, the payloads are summarized only when the record is emitted.'''
+        if not self.enabled(level):
+            return
+        logger.opt(lazy=True, depth=2).log(
+            level, msg, *(functools.partial(summarize, p) for p in payloads))
+
+    def debug(self, msg: str, *payloads):
+        self.log('DEBUG', msg, *payloads)
+
+    def info(self, msg: str, *payloads):
+        self.log('INFO', msg, *payloads)
+
+    def warning(self, msg: str, *payloads):
+        self.log('WARNING', msg, *payloads)
+
+    def error(self, msg: str, *payloads):
+        self.log('ERROR', msg, *payloads)
+
+
+class RouteLogs:
+    '''The logs of the routes, the unknown routes use the default.'''
+
+    def __init__(self):
+        self.default = RouteLog('default')
+        self.routes = {}
+
+    def get(self, name: str) -> RouteLog:
+        return self.routes.get(name, self.default)
+
+
+ROUTE_LOGS = RouteLogs()
+
+
+def configure(conf):
+    '''
+    Configure the sinks and the route logs.
+
+    :param conf: the config.log, with level, diagnose, max_items, max_str and routes: {name: {level, sample}}.
+    '''
+    global MAX_ITEMS, MAX_STR
+    MAX_ITEMS = conf.get('max_items', MAX_ITEMS)
+    MAX_STR = conf.get('max_str', MAX_STR)
+
+    # The diagnose formats the variables of every frame on the exceptions
+    diagnose = conf.get('diagnose', True)
+    for sink in SINKS:
+        logger.remove(sink)
+    try:
+        # The default stderr sink
+        logger.remove(0)
+    except ValueError:
+        pass
+    SINKS[:] = [
+        logger.add(sys.stderr,
+                   level=conf.get('console_level', 'DEBUG'),
+                   diagnose=diagnose),
+        logger.add(f'log/debug.{t}.log',
+                   level=conf.get('level', 'DEBUG'),
+                   enqueue=True,
+                   backtrace=True,
+                   diagnose=diagnose),
+        logger.add(f'log/info.{t}.log',
+                   level='INFO',
+                   enqueue=True,
+                   backtrace=True,
+                   diagnose=diagnose),
+    ]
+
+    ROUTE_LOGS.routes = {name: RouteLog(name, route.get('level', 'DEBUG'), route.get('sample', 1.0))
+                         for name, route in conf.get('routes', {}).items()}
+    return ROUTE_LOGS
 
 
 # %% ---- 2025-05-07 ------------------------
@@ -0,0 +1,278 @@
+"""
+File: feature_store.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Feature store keyed by the raw-data fingerprint.
+    The key is the hash of (subject, record ids or time range or raw data, feature config).
+    The features are stored on disk as .npy files and loaded as read-only memmap,
+    an in-memory LRU is in front of the disk.
+    The disk is capped by prune(), by the size and by the age of the entries,
+    it runs with the model GC job, see config.features.
+
+    The models ask for the features by key:
+
+        store = get_feature_store()
+        key = store.fingerprint(subject, extractor.config(), records=data)
+        features = store.get_or_compute(key, lambda: {'psd': ...})
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import numpy as np
+
+from typing import Callable
+from pathlib import Path
+from collections import OrderedDict
+
+from .log import logger
+from ..metrics import stage
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def _canonical(obj):
+    '''Convert the object into json-able content, the arrays are replaced by their hashes.'''
+    if isinstance(obj, np.ndarray):
+        h = hashlib.sha256(np.ascontiguousarray(obj).tobytes()).hexdigest()
+        return {'ndarray': h, 'shape': list(obj.shape), 'dtype': str(obj.dtype)}
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda e: str(e[0]))}
+    if isinstance(obj, (list, tuple)):
+        # The long numeric lists are the raw data, hash them as arrays
+        if len(obj) > 64 and all(isinstance(e, (int, float)) for e in obj[:64]):
+            return _canonical(np.asarray(obj))
+        return [_canonical(e) for e in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+class FeatureStore:
+    '''Feature store with in-memory LRU in front of the disk.'''
+    directory: Path
+    capacity: int
+    buffer: OrderedDict
+
+    def __init__(self, directory: Path, capacity: int = 64):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self.buffer = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        logger.info(f'Initialize feature store with directory: {directory}')
+
+    @staticmethod
+    def fingerprint(subject: dict, config: dict, records=None, time_range=None) -> str:
+        '''
+        Compute the key of the features.
+
+        :param subject dict: the subject, like {'org_id', 'user_id', 'project_name', 'name'}.
+        :param config dict: the feature config, like SpectralFeatureExtractor.config().
+        :param records: the record ids, or the raw records themselves.
+        :param time_range: the (start, stop) of the records.
+        :return str: the sha256 key.
+        '''
+        content = _canonical(dict(subject=subject,
+                                  config=config,
+                                  records=records,
+                                  time_range=time_range))
+        u = json.dumps(content, sort_keys=True, ensure_ascii=False,
+                       default=str)
+        return hashlib.sha256(u.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        '''The folder of the features, sharded by the key prefix.'''
+        return self.directory.joinpath(key[:2], key)
+
+    def _remember(self, key: str, features: dict):
+        with self.lock:
+            self.buffer[key] = features
+            self.buffer.move_to_end(key)
+            while len(self.buffer) > self.capacity:
+                self.buffer.popitem(last=False)
+
+    def get(self, key: str):
+        '''
+        Get the features by key.
+
+        :return dict: the features, {name: array}, or None if the key is not found.
+        '''
+        with self.lock:
+            if key in self.buffer:
+                self.buffer.move_to_end(key)
+                self.hits += 1
+                return self.buffer[key]
+
+        folder = self.path(key)
+        if not folder.is_dir():
+            with self.lock:
+                self.misses += 1
+            return None
+
+        features = {p.stem: np.load(p, mmap_mode='r')
+                    for p in folder.glob('*.npy')}
+        # The age of the entry is since it is last loaded from disk
+        try:
+            os.utime(folder)
+        except OSError:
+            pass
+        self._remember(key, features)
+        with self.lock:
+            self.hits += 1
+        logger.debug(f'Feature store loads from disk: {key}')
+        return features
+
+    @logger.catch(reraise=True)
+    def put(self, key: str, features: dict) -> dict:
+        '''
+        Put the features into the store.
+
+        :param features dict: the features, {name: array}.
+        :return dict: the features.
+        '''
+        folder = self.path(key)
+        folder.parent.mkdir(parents=True, exist_ok=True)
+        # Write into a temporary folder and rename it, so the readers never see a partial entry
+        tmp = folder.with_name(f'{key}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name, value in features.items():
+            np.save(tmp.joinpath(f'{name}.npy'), np.asarray(value))
+        try:
+            os.replace(tmp, folder)
+        except OSError:
+            # The other worker has written the same key
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._remember(key, features)
+        logger.debug(f'Feature store saves: {key}, {list(features.keys())}')
+        return features
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> dict:
+        '''
+        Get the features by key, compute and store them when they are not found.
+
+        :param compute Callable: the function computes the features, {name: array}.
+        :return dict: the features.
+        '''
+        features = self.get(key)
+        if features is None:
+            # The feature extraction stage of the request
+            with stage('features'):
+                features = compute()
+            features = self.put(key, features)
+        return features
+
+    def prune(self, max_bytes: int = None, max_age_days: float = None, dry_run: bool = False) -> dict:
+        '''
+        Remove the entries older than max_age_days, then the oldest ones until the store is within max_bytes.
+        The age is since the entry is written or last loaded from disk.
+        The temporary folders of the crashed writers are removed after an hour.
+
+        :param max_bytes int: the size cap of the directory, None for no cap.
+        :param max_age_days float: the age cap of the entries, None for no cap.
+        :param dry_run bool: only report what would be removed.
+        :return dict: the report.
+        '''
+        now = time.time()
+        entries = []
+        stale = []
+        for folder in self.directory.glob('*/*'):
+            try:
+                mtime = folder.stat().st_mtime
+                if folder.name.endswith('.tmp'):
+                    if now - mtime > 3600:
+                        stale.append(folder)
+                    continue
+                size = sum(p.stat().st_size for p in folder.glob('*.npy'))
+            except OSError:
+                continue
+            entries.append((mtime, size, folder))
+
+        # The oldest first
+        entries.sort(key=lambda e: e[0])
+        total = sum(e[1] for e in entries)
+        remove = []
+        for mtime, size, folder in entries:
+            expired = max_age_days is not None and now - mtime > max_age_days * 86400
+            oversize = max_bytes is not None and total > max_bytes
+            if not (expired or oversize):
+                break
+            remove.append(folder)
+            total -= size
+
+        if not dry_run:
+            for folder in remove + stale:
+                shutil.rmtree(folder, ignore_errors=True)
+            with self.lock:
+                for folder in remove:
+                    self.buffer.pop(folder.name, None)
+
+        report = dict(dry_run=dry_run,
+                      scanned=len(entries),
+                      removed=len(remove),
+                      stale_tmp=len(stale),
+                      bytes=total)
+        logger.info(f'Feature store prune: {report}')
+        return report
+
+    def stats(self) -> dict:
+        return dict(entries=len(self.buffer),
+                    capacity=self.capacity,
+                    hits=self.hits,
+                    misses=self.misses)
+
+
+FEATURE_STORE: FeatureStore = None
+
+
+def use_feature_store(store: FeatureStore):
+    '''Set the feature store shared by the models.'''
+    global FEATURE_STORE
+    FEATURE_STORE = store
+    return store
+
+
+def get_feature_store() -> FeatureStore:
+    '''Get the feature store shared by the models, it is set by the server.'''
+    assert FEATURE_STORE is not None, 'The feature store is not set'
+    return FEATURE_STORE
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    import tempfile
+    store = FeatureStore(Path(tempfile.mkdtemp()), capacity=2)
+    subject = dict(org_id='org', user_id='user',
+                   project_name='project', name='name')
+    key = store.fingerprint(subject, {'srate': 250},
+                            records=[{'data': np.random.randn(8, 500)}])
+    print(store.get_or_compute(key, lambda: {'psd': np.random.randn(8, 251)})['psd'].shape)
+    store.buffer.clear()
+    print(type(store.get(key)['psd']), store.stats())
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,235 @@
+"""
+File: inference_pool.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The process pool of the model predict, so the CPU-bound features and predict escape the GIL.
+
+    - Every worker is the single process executor, pinned to its core.
+    - Every worker keeps its own warm ModelCache, predictors and FeatureStore.
+    - The requests are routed by the model checksum, so the model of the subject
+      is always predicted by the same worker, and it is loaded only once.
+    - The web threads only parse the request, fetch the data and dispatch.
+
+    The BLAS threads of the workers are limited to one, so the workers do not oversubscribe the cores.
+    The warm up loads the models into the workers they are routed to, by warm.
+    The broken worker is restarted on its next request.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import threading
+import multiprocessing
+
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .log import logger
+
+# The states of the worker process, set by _init_worker
+_WORKER = {}
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def available_cores() -> list:
+    '''The cores the process is allowed to run on.'''
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    try:
+        import psutil
+        return sorted(psutil.Process().cpu_affinity())
+    except (ImportError, AttributeError):
+        return list(range(os.cpu_count() or 1))
+
+
+def pin_to_core(core: int) -> bool:
+    '''Pin the current process to the core, by os.sched_setaffinity on linux or by psutil.'''
+    try:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, {core})
+            return True
+        import psutil
+        psutil.Process().cpu_affinity([core])
+        return True
+    except (ImportError, AttributeError, OSError, ValueError) as e:
+        logger.warning(f'Can not pin the worker to core {core}: {e}')
+        return False
+
+
+def _init_worker(index: int, core: int, model_dir: str, compress, shared_dir: str,
+                 features_dir: str, features_capacity: int):
+    '''The initializer of the worker process, it builds the caches of the worker.'''
+    if core is not None:
+        pin_to_core(core)
+    try:
+        # The sklearn dependency, limit the BLAS and OpenMP threads
+        from threadpoolctl import threadpool_limits
+        _WORKER['threadpool_limits'] = threadpool_limits(1)
+    except ImportError:
+        pass
+
+    from .model_storage.model_cache import ModelCache, ChecksumSystem
+    from .model_storage.shared_cache import SharedModelArena
+    from .feature_store import FeatureStore, use_feature_store
+    from .model_registry import ModelRegistry
+    from .tellme_which_model_to_use import tellme_predict_model, tellme_train_model, checkout_model
+
+    mc = ModelCache()
+    if shared_dir:
+        mc.use_shared(SharedModelArena(Path(shared_dir)))
+    _WORKER.update(index=index,
+                   core=core,
+                   mc=mc,
+                   cs=ChecksumSystem(compress=compress, model_dir=Path(model_dir)),
+                   mreg=ModelRegistry(tellme_train_model, tellme_predict_model, checkout_model),
+                   fs=use_feature_store(FeatureStore(Path(features_dir), features_capacity)))
+    logger.info(f'Inference worker {index} is ready, core: {core}, pid: {os.getpid()}')
+
+
+def _predict_in_worker(model_path: str, checksum: str, model_name: str, data, label):
+    '''Load the model from the cache of the worker and predict.'''
+    model_record = _WORKER['mc'].load(model_path, checksum, _WORKER['cs'])
+    predicting_model = _WORKER['mreg'].instance(model_name)
+    return predicting_model.predict(model_record['model'], data, label)
+
+
+def _warm_in_worker(model_path: str, checksum: str):
+    '''Load the model into the cache of the worker.'''
+    _WORKER['mc'].load(model_path, checksum, _WORKER['cs'])
+    return _WORKER['index']
+
+
+def _stats_in_worker() -> dict:
+    return dict(index=_WORKER.get('index'),
+                core=_WORKER.get('core'),
+                pid=os.getpid(),
+                models=len(_WORKER['mc'].buffer) if 'mc' in _WORKER else 0)
+
+
+class InferencePool:
+    '''The worker processes of the model predict, routed by the model checksum.'''
+
+    def __init__(self, workers: int, model_dir: Path, compress=0, shared_dir: Path = None,
+                 features_dir: Path = None, features_capacity: int = 64,
+                 pin_cores: bool = True, start_method: str = 'spawn'):
+        '''
+        :param workers int: the number of the worker processes.
+        :param model_dir Path: the model dir, like the ChecksumSystem of the server.
+        :param compress: the compress option of the ChecksumSystem.
+        :param shared_dir Path: the SharedModelArena dir, None if the arena is not used.
+        :param features_dir Path: the FeatureStore dir, it is shared on the disk.
+        :param pin_cores bool: pin the workers to the cores, the cores are used round robin.
+        :param start_method str: the multiprocessing start method, spawn is safe with the server threads.
+        '''
+        cores = available_cores()
+        self.context = multiprocessing.get_context(start_method)
+        self.initargs = [(i,
+                          cores[i % len(cores)] if pin_cores else None,
+                          Path(model_dir).as_posix(),
+                          compress,
+                          Path(shared_dir).as_posix() if shared_dir else '',
+                          Path(features_dir).as_posix(),
+                          features_capacity)
+                         for i in range(workers)]
+        self.lock = threading.Lock()
+        self.executors = [self._start(i) for i in range(workers)]
+        self.dispatched = [0] * workers
+        logger.info(f'Inference pool is started, workers: {workers}, pin cores: {pin_cores}')
+
+    def _start(self, index: int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=1,
+                                   mp_context=self.context,
+                                   initializer=_init_worker,
+                                   initargs=self.initargs[index])
+
+    def route(self, checksum: str) -> int:
+        '''The worker of the model, the checksum is the hex digest.'''
+        try:
+            return int(checksum[:8], 16) % len(self.executors)
+        except ValueError:
+            return hash(checksum) % len(self.executors)
+
+    def submit(self, index: int, func, *args):
+        executor = self.executors[index]
+        try:
+            return executor.submit(func, *args)
+        except BrokenProcessPool:
+            # The worker is dead, restart it, its cache is warmed again on the requests
+            with self.lock:
+                if self.executors[index] is executor:
+                    logger.error(f'Inference worker {index} is broken, restart it')
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.executors[index] = self._start(index)
+            return self.executors[index].submit(func, *args)
+
+    def predict(self, model_path: str, checksum: str, model_name: str, data, label):
+        '''
+        Predict in the worker of the model, it blocks until the prediction is done.
+
+        :param model_path str: the model path.
+        :param checksum str: the model checksum, the worker is routed by it.
+        :param model_name str: the predictor name of the registry.
+        :return: the prediction of the predictor.
+        '''
+        index = self.route(checksum)
+        with self.lock:
+            self.dispatched[index] += 1
+        future = self.submit(index, _predict_in_worker,
+                             model_path, checksum, model_name, data, label)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            # The worker is killed while predicting, it is restarted on the next request
+            raise RuntimeError(f'Inference worker {index} is broken') from e
+
+    def warm(self, model_path: str, checksum: str):
+        '''
+        Load the model into the worker it is routed to, it is the load of ModelWarmup,
+        and the check of find_latest_model before the predict, the cached model is not read again.
+        The load error of the worker is raised.
+
+        :param checksum str: the model checksum, the model without it is not routed.
+        '''
+        if checksum is None:
+            raise ValueError('The checksum is required to route the model')
+        return self.submit(self.route(checksum), _warm_in_worker, model_path, checksum).result()
+
+    def stats(self) -> list:
+        output = []
+        for index in range(len(self.executors)):
+            try:
+                stats = self.submit(index, _stats_in_worker).result(timeout=5)
+            except Exception as e:
+                stats = dict(index=index, error=str(e))
+            stats['dispatched'] = self.dispatched[index]
+            output.append(stats)
+        return output
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,290 @@
+"""
+File: model_registry.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Declarative model registry.
+    It resolves (project_name, label type) to the model names through the lookup tables,
+    keeps the model classes and the constructed (stateless) predictors,
+    and indexes the stored models by the model type.
+
+    The tables are built at startup from the known projects of config.registry.projects,
+    they are resolved once by the tellme_which_model_to_use functions.
+    The predict table is keyed by the label type, the train table by the sorted tuple of the types
+    in the train labels, the same as label_type returns for them.
+    The pairs not registered are resolved by the tellme functions per request, not memoized,
+    since the functions may read more than the label type.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import re
+import json
+import threading
+
+from typing import Callable
+from collections import OrderedDict
+
+from .log import logger
+from .known_errors import ModelLoadingError
+
+# The unique model name is f'{name}.{time.time()}'
+UNIQUE_MODEL_NAME_PATTERN = re.compile(r'^(?P<type>.*?)\.(?P<time>\d+(\.\d+)?)$')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def label_type(label):
+    '''
+    Get the label type, it is the key of the lookup tables.
+
+    The predict label is like '{"type":254,"time":1747646185506}',
+    the train label is the list of such records.
+
+    :return: the type, the tuple of the sorted types for the list, or None if it is unknown.
+    '''
+    try:
+        if isinstance(label, (str, bytes)):
+            label = json.loads(label)
+        if isinstance(label, dict):
+            return label['type']
+        if isinstance(label, (list, tuple)):
+            types = {label_type(e) for e in label}
+            if None in types or not types:
+                return None
+            return tuple(sorted(types, key=str))
+    except Exception:
+        pass
+    return None
+
+
+def model_type_of(unique_model_name: str) -> str:
+    '''Get the model type from the unique model name, f'{name}.{time.time()}'.'''
+    if m := UNIQUE_MODEL_NAME_PATTERN.match(unique_model_name):
+        return m.group('type')
+    return unique_model_name
+
+
+def model_time_of(unique_model_name: str) -> float:
+    '''Get the train time from the unique model name, 0 if it is unknown.'''
+    if m := UNIQUE_MODEL_NAME_PATTERN.match(unique_model_name):
+        return float(m.group('time'))
+    return 0.0
+
+
+def latest_of(models: list) -> dict:
+    '''Get the latest model by the train time, the later one in the list wins the tie.'''
+    return max(enumerate(models),
+               key=lambda e: (model_time_of(e[1].get('model_name', '')), e[0]))[1]
+
+
+def index_models(records: list) -> dict:
+    '''
+    Index the stored models by the model type.
+
+    :param records list: the records from get_model, every record has single model or multiple 'models'.
+    :return dict: {model_type: [model, ...]}, the models keep the order of the records.
+    '''
+    index = {}
+    for rec in records:
+        # Found multiple models, or found single model
+        for model in rec.get('models') or [rec]:
+            index.setdefault(model_type_of(
+                model.get('model_name', '')), []).append(model)
+    return index
+
+
+def _fingerprint(records: list) -> tuple:
+    '''The size and the ends of the records of get_model.'''
+    def ends(rec):
+        models = rec.get('models') or [rec]
+        return (rec.get('id'), len(models),
+                models[0].get('model_name'), models[-1].get('model_name'))
+    if not records:
+        return (0,)
+    return (len(records), ends(records[0]), ends(records[-1]))
+
+
+class ModelRegistry:
+    '''The model registry with the precomputed lookup tables.'''
+
+    def __init__(self, tellme_train_model: Callable = None, tellme_predict_model: Callable = None, checkout_model: Callable = None):
+        '''
+        :param tellme_train_model Callable: the fallback to resolve the train model names.
+        :param tellme_predict_model Callable: the fallback to resolve the predict model name.
+        :param checkout_model Callable: the fallback to resolve the model class.
+        '''
+        self.tellme_train_model = tellme_train_model
+        self.tellme_predict_model = tellme_predict_model
+        self.checkout_model = checkout_model
+        # (project_name, label_type) -> tuple of model names
+        self.train_table = {}
+        # (project_name, label_type) -> model name
+        self.predict_table = {}
+        # model name -> model class
+        self.classes = {}
+        # model name -> constructed predictor
+        self.instances = {}
+        # subject -> (fingerprint, index of the stored models)
+        self.indexes = OrderedDict()
+        self.index_capacity = 1024
+        self.lock = threading.Lock()
+
+    def register(self, model_name: str, Model=None, project_name: str = None, label_types: list = (), train: bool = True, predict: bool = True):
+        '''
+        Register the model.
+
+        :param model_name str: the model name.
+        :param Model: the model class.
+        :param project_name str: the project uses the model.
+        :param label_types list: the label types use the model.
+        :param train bool: whether the model is trained with the label types.
+        :param predict bool: whether the model predicts with the label types.
+        '''
+        if Model is not None:
+            self.classes[model_name] = Model
+        for lt in label_types:
+            key = (project_name, lt)
+            if train:
+                self.train_table[key] = self.train_table.get(
+                    key, ()) + (model_name,)
+            if predict:
+                self.predict_table[key] = model_name
+        return Model
+
+    def build(self, projects: dict):
+        '''
+        Build the lookup tables at startup, the pairs are resolved once by the tellme functions.
+
+        :param projects dict: {project_name: {'predict': [label type, ...], 'train': [[label type, ...], ...]}},
+                              the train entry is the set of the label types in the train labels,
+                              it is keyed by the sorted tuple like label_type of the label list.
+        :return int: the number of the registered pairs.
+        '''
+        count = 0
+        for project_name, conf in projects.items():
+            entries = [('predict', lt) for lt in conf.get('predict', [])]
+            entries += [('train', tuple(types)) for types in conf.get('train', [])]
+            for kind, lt in entries:
+                try:
+                    if kind == 'predict':
+                        # The label like the requests, only its type is known
+                        label = json.dumps({'type': lt, 'time': 0})
+                        model_names = (self.tellme_predict_model(label, project_name),)
+                    else:
+                        # The label list like get_train_label
+                        label = [{'id': i, 'type': t, 'time': 0} for i, t in enumerate(lt)]
+                        model_names = tuple(self.tellme_train_model(label, project_name))
+                    key = label_type(label)
+                except Exception as e:
+                    logger.warning(f'Registry can not resolve: {project_name}, {kind}, {lt}, {e}')
+                    continue
+                for model_name in model_names:
+                    self.register(model_name, self.checkout(model_name), project_name, [key],
+                                  train=kind == 'train',
+                                  predict=kind == 'predict')
+                count += 1
+        if not count:
+            logger.warning('Registry is empty, the models are resolved by the tellme functions per request, '
+                           'set config.registry.projects')
+        logger.info(f'Registry is built: {count} pairs, {len(self.classes)} models')
+        return count
+
+    def train_models(self, label, project_name: str) -> tuple:
+        '''Resolve the model names to train, the pairs not registered are resolved per request.'''
+        key = (project_name, label_type(label))
+        if key in self.train_table:
+            return self.train_table[key]
+        return tuple(self.tellme_train_model(label, project_name))
+
+    def predict_model(self, label, project_name: str) -> str:
+        '''Resolve the model name to predict, the pairs not registered are resolved per request.'''
+        key = (project_name, label_type(label))
+        if key in self.predict_table:
+            return self.predict_table[key]
+        return self.tellme_predict_model(label, project_name)
+
+    def checkout(self, model_name: str):
+        '''Resolve the model class.'''
+        if Model := self.classes.get(model_name):
+            return Model
+        if self.checkout_model is None:
+            raise ModelLoadingError.NameError
+        Model = self.checkout_model(model_name)
+        with self.lock:
+            self.classes[model_name] = Model
+        return Model
+
+    def instance(self, model_name: str):
+        '''Get the constructed predictor, the predictors are stateless, so they are shared.'''
+        if model := self.instances.get(model_name):
+            return model
+        model = self.checkout(model_name)()
+        with self.lock:
+            model = self.instances.setdefault(model_name, model)
+        logger.debug(f'Registry constructs predictor: {model_name}')
+        return model
+
+    @staticmethod
+    def lookup(index: dict, model_name: str) -> list:
+        '''
+        Lookup the stored models of the model name from the index of index_models.
+        The model type is looked up first, the prefix match is over the model types only when it misses,
+        like the prefix filter of the records.
+        '''
+        if models := index.get(model_name):
+            return models
+        return [model
+                for model_type, models in index.items()
+                if model_type.startswith(model_name)
+                for model in models]
+
+    def index(self, subject: tuple, records: list) -> dict:
+        '''
+        The index_models of the records of the subject, it is built once per record set.
+        The records of get_model are appended in the create time order,
+        so the record set is known by its size and its first and last records.
+        '''
+        fingerprint = _fingerprint(records)
+        with self.lock:
+            cached = self.indexes.get(subject)
+            if cached and cached[0] == fingerprint:
+                self.indexes.move_to_end(subject)
+                return cached[1]
+        index = index_models(records)
+        with self.lock:
+            self.indexes[subject] = (fingerprint, index)
+            self.indexes.move_to_end(subject)
+            while len(self.indexes) > self.index_capacity:
+                self.indexes.popitem(last=False)
+        return index
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    registry = ModelRegistry()
+    registry.register('attention', dict, 'project', [254, (1, 2)])
+    print(registry.predict_model('{"type":254,"time":1747646185506}', 'project'))
+    print(registry.train_models([{'id': 0, 'type': 2, 'time': 0}, {'id': 1, 'type': 1, 'time': 0}], 'project'))
+    index = index_models([{'models': [{'model_name': 'attention.1747646185.506', 'model_path': 'a,b'}]},
+                          {'model_name': 'attention.1747646190.1', 'model_path': 'c,d'}])
+    print(registry.lookup(index, 'attention'))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
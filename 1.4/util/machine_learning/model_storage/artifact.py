@@ -0,0 +1,230 @@
+"""
+File: artifact.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The versioned container format of the model files.
+
+    | MAGIC (8 bytes) | version (uint16) | header length (uint32) | JSON header | section | section | ... |
+
+    The JSON header holds the info, and the offset, size, sha256 and codec of every section.
+    The dict model is stored as one section per key, the other models as the single section.
+    So the listing, the auditing and the cache admission read the header only,
+    and the sections are loaded lazily.
+
+    The legacy .model files are the joblib blob of {'model': model, 'info': info},
+    they are still readable, and converted by migrate.py.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import io
+import json
+import struct
+import joblib
+import hashlib
+
+from typing import Any
+from pathlib import Path
+
+from ..log import logger
+
+MAGIC = b'BCIMODEL'
+VERSION = 1
+# version, header length
+PREFIX = struct.Struct('<HI')
+# The compressors of joblib
+CODECS = ['zlib', 'gzip', 'bz2', 'lzma', 'xz', 'lz4']
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def is_artifact(path: Path) -> bool:
+    '''Whether the file is in the container format.'''
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def compress_option(value):
+    '''
+    Parse the compress option in the config into the joblib compress.
+
+    :param value: 0 for no compression, the codec name as 'lz4', or the codec with level as 'zlib:3'.
+    :return: the joblib compress option.
+    '''
+    if not value:
+        return 0
+    if isinstance(value, int):
+        return ('zlib', value)
+    name, _, level = str(value).partition(':')
+    assert name in CODECS, f'Unsupported codec: {name}, options are {CODECS}'
+    if name == 'lz4':
+        # joblib raises on dump only, so check it at start
+        import lz4  # noqa: F401
+    return (name, int(level)) if level else (name, 3)
+
+
+def _dump_section(obj: Any, compress=0) -> bytes:
+    buf = io.BytesIO()
+    joblib.dump(obj, buf, compress=compress)
+    return buf.getvalue()
+
+
+def write_artifact(path: Path, info: dict, model: Any, compress=0, legacy_checksum: str = None) -> str:
+    '''
+    Write the model into the container format.
+
+    :param path Path: the destination.
+    :param info dict: the model info, it is stored in the header as JSON.
+    :param model Any: the model, the dict model is stored as one section per key.
+    :param compress: the joblib compress option of the sections.
+    :param legacy_checksum str: the checksum of the migrated legacy file, the db refers the model by it.
+    :return checksum str: the sha256 of the file.
+    '''
+    if isinstance(model, dict) and all(isinstance(k, str) for k in model):
+        layout = 'dict'
+        objs = model
+    else:
+        layout = 'object'
+        objs = {'model': model}
+
+    sections = {}
+    blobs = []
+    offset = 0
+    for key, obj in objs.items():
+        blob = _dump_section(obj, compress)
+        sections[key] = dict(offset=offset,
+                             size=len(blob),
+                             sha256=hashlib.sha256(blob).hexdigest(),
+                             codec=f'{compress[0]}:{compress[1]}' if compress else 'raw')
+        blobs.append(blob)
+        offset += len(blob)
+
+    # No timestamp in the header, so the identical models are the byte-identical files
+    header = dict(version=VERSION,
+                  info=info,
+                  layout=layout,
+                  sections=sections)
+    if legacy_checksum:
+        header['legacy_checksum'] = legacy_checksum
+    header = json.dumps(header, default=str).encode('utf-8')
+
+    h = hashlib.new('sha256')
+    path = Path(path)
+    with open(path, 'wb') as f:
+        for chunk in [MAGIC, PREFIX.pack(VERSION, len(header)), header, *blobs]:
+            f.write(chunk)
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModelArtifact:
+    '''
+    The model file in the container format, the sections are loaded lazily.
+
+    >>> art = ModelArtifact(path)
+    >>> art.info                  # Read the header only
+    >>> art.load_section('clf')   # Read and unpickle one section
+    >>> art.load_model()          # The whole model
+    '''
+
+    def __init__(self, path: Path, data: bytes = None):
+        '''
+        :param path Path: the model file.
+        :param data bytes: the content of the file if it has been read, the sections are sliced from it.
+        '''
+        self.path = Path(path)
+        self.data = data
+        f = io.BytesIO(data) if data is not None else open(self.path, 'rb')
+        with f:
+            magic = f.read(len(MAGIC))
+            assert magic == MAGIC, f'Not a model artifact: {path}'
+            version, length = PREFIX.unpack(f.read(PREFIX.size))
+            assert version <= VERSION, f'Unsupported artifact version: {version}'
+            self.header = json.loads(f.read(length).decode('utf-8'))
+        self.data_offset = len(MAGIC) + PREFIX.size + length
+
+    @property
+    def info(self) -> dict:
+        return self.header['info']
+
+    @property
+    def sections(self) -> dict:
+        return self.header['sections']
+
+    @property
+    def legacy_checksum(self) -> str:
+        return self.header.get('legacy_checksum')
+
+    def read_section(self, key: str, verify: bool = True) -> bytes:
+        section = self.sections[key]
+        start = self.data_offset + section['offset']
+        if self.data is not None:
+            blob = self.data[start:start + section['size']]
+        else:
+            with open(self.path, 'rb') as f:
+                f.seek(start)
+                blob = f.read(section['size'])
+        if verify:
+            assert hashlib.sha256(blob).hexdigest() == section['sha256'], \
+                f'The section fails on matching checksum: {self.path}, {key}'
+        return blob
+
+    def load_section(self, key: str, verify: bool = True) -> Any:
+        return joblib.load(io.BytesIO(self.read_section(key, verify)))
+
+    def load_model(self, verify: bool = True) -> Any:
+        model = {key: self.load_section(key, verify) for key in self.sections}
+        if self.header['layout'] == 'object':
+            return model['model']
+        return model
+
+
+def checksum_of(path: Path) -> str:
+    '''The checksum the model is referred by, the one of its legacy file for the migrated model, like read_model.'''
+    if is_artifact(path) and (legacy := ModelArtifact(path).legacy_checksum):
+        return legacy
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_info(path: Path) -> dict:
+    '''The model info, only the header is read for the container format.'''
+    if is_artifact(path):
+        return ModelArtifact(path).info
+    logger.warning(f'Reading info from the legacy model file: {path}')
+    return joblib.load(path)['info']
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    import tempfile
+    import numpy as np
+    path = Path(tempfile.mkdtemp(), 'a.model')
+    checksum = write_artifact(
+        path, {'name': 'name'}, {'w': np.ones(10), 'b': 1.0})
+    art = ModelArtifact(path)
+    print(checksum, art.header)
+    print(art.load_model())
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
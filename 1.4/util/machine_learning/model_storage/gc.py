@@ -0,0 +1,381 @@
+"""
+File: gc.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Garbage collection of the model directory.
+
+    - Keep the last K models per (subject, model type), the subject is read from the header only.
+    - The models are ordered by their train time, from the db reference, the time of the unique model name,
+      or from the header train_time of the older files. The header does not carry it any more,
+      so the identical models are the byte-identical files for the dedupe.
+      The file mtime is not used, so the hardlinks of the dedupe do not change the order.
+      The models of the unknown train time are kept.
+    - Keep the models referenced by the db rows and by the latest-model index whatever their age.
+      The run is aborted when the db is not reachable, nothing is removed without the references.
+    - Dedupe the byte-identical models by the hardlinks.
+    - Move the flat <name>.<sha256>.model files into the shards <model_dir>/<sha256[:2]>/,
+      the old model_path strings are resolved by resolve_model_path.
+    - The files in use, like the ones opened by the predicts on Windows, are retried and skipped.
+    - Clean the shared arenas whose models are gone, the arena is keyed by the checksum of the model file.
+    - Prune the feature store by config.features.max_mb and max_age_days.
+
+    It is the standalone job, not the thread of the server processes.
+    Only one run at a time by the lock file, it is dry run unless --apply or config.model.gc.dry_run is false.
+    Run it by cron or the Windows Task Scheduler, from the 1.4 folder:
+
+    python -m util.machine_learning.model_storage.gc --config config.yaml
+    python -m util.machine_learning.model_storage.gc --config config.yaml --apply
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import time
+import hashlib
+import argparse
+
+from pathlib import Path
+from typing import Callable
+from collections import defaultdict
+from contextlib import contextmanager
+
+from ..log import logger
+from .artifact import read_info, is_artifact, ModelArtifact
+
+SUBJECT_KEYS = ['org_id', 'user_id', 'project_name', 'name']
+
+# The retries of the files in use
+RETRIES = 3
+RETRY_SECONDS = 0.5
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def shard_of(fname: str) -> str:
+    '''The shard of the model file name, the prefix of its sha256 part.'''
+    parts = fname.split('.')
+    if len(parts) >= 3 and len(parts[-2]) == 64:
+        return parts[-2][:2]
+    return hashlib.sha256(fname.encode()).hexdigest()[:2]
+
+
+def sharded_path(model_dir: Path, fname: str) -> Path:
+    return Path(model_dir, shard_of(fname), fname)
+
+
+def resolve_model_path(model_dir: Path, model_path) -> Path:
+    '''
+    Resolve the model_path, the flat path recorded before sharding is found in its shard.
+
+    :return Path: the existing path, or the given path if it is not found.
+    '''
+    model_path = Path(model_path)
+    if model_path.is_file() or model_dir is None:
+        return model_path
+    path = sharded_path(model_dir, model_path.name)
+    if path.is_file():
+        return path
+    return model_path
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _retry(func, *args) -> bool:
+    '''Run the file operation, retry it when the file is in use, False if it still fails.'''
+    for i in range(RETRIES):
+        try:
+            func(*args)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            if i == RETRIES - 1:
+                logger.warning(f'GC skips the file in use: {args[0]}, {e}')
+                return False
+            time.sleep(RETRY_SECONDS)
+    return False
+
+
+@contextmanager
+def run_lock(model_dir: Path):
+    '''Only one GC runs on the model directory.'''
+    path = Path(model_dir, '.gc.lock')
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise RuntimeError(f'The other GC is running, or remove the stale lock: {path}')
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield path
+    finally:
+        path.unlink(missing_ok=True)
+
+
+class ModelGC:
+    '''The garbage collection of the model directory.'''
+
+    def __init__(self, model_dir: Path, keep: int = 3, references: Callable[[dict], dict] = None, protected: Callable[[], set] = None, dedupe: bool = True, shard: bool = True, arena=None):
+        '''
+        :param model_dir Path: the model directory.
+        :param keep int: the number of the latest models kept per (subject, model type).
+        :param references Callable: the file names referenced by the db, {file name: train time},
+                                    it is called with the subjects found in the headers.
+        :param protected Callable: the file names never removed, like the ones in the latest-model index.
+        :param arena SharedModelArena: the shared arena to clean, None if it is not used.
+        '''
+        self.model_dir = Path(model_dir)
+        self.keep = keep
+        self.references = references or (lambda subjects: {})
+        self.protected = protected or set
+        self.dedupe = dedupe
+        self.shard = shard
+        self.arena = arena
+        self.last_report = None
+        # The sha256 of the model files in the run
+        self.hashes = {}
+
+    def _hash(self, path: Path) -> str:
+        if path not in self.hashes:
+            self.hashes[path] = _file_hash(path)
+        return self.hashes[path]
+
+    def _checksums(self, paths: list) -> set:
+        '''The checksums the models are referred by, the file sha256 and the legacy checksum.'''
+        output = set()
+        for path in paths:
+            try:
+                output.add(self._hash(path))
+                if is_artifact(path) and (legacy := ModelArtifact(path).legacy_checksum):
+                    output.add(legacy)
+            except OSError as e:
+                logger.warning(f'GC can not read the model: {path}, {e}')
+        return output
+
+    def scan(self) -> list:
+        '''The model files, [dict(path, subject, query, model_type, train_time), ...].'''
+        entries = []
+        for path in self.model_dir.rglob('*.model'):
+            try:
+                info = read_info(path)
+                entries.append(dict(path=path,
+                                    subject=tuple(str(info.get(k)) for k in SUBJECT_KEYS),
+                                    query={k: info.get(k) for k in SUBJECT_KEYS},
+                                    model_type=path.name.split('.')[0],
+                                    train_time=info.get('train_time')))
+            except Exception as e:
+                logger.warning(f'GC skips the unreadable model: {path}, {e}')
+        return entries
+
+    def plan(self, entries: list) -> tuple:
+        '''
+        The files to remove, beyond the last K per (subject, model type) and not referenced.
+
+        :return remove list: the paths to remove.
+        :return unknown int: the number of the models kept for their unknown train time.
+        '''
+        subjects = {e['subject']: e['query'] for e in entries}
+        # Raise when the db is not reachable
+        references = self.references(subjects)
+        protected = set(self.protected()) | set(references)
+
+        groups = defaultdict(list)
+        unknown = 0
+        for e in entries:
+            train_time = e['train_time'] or references.get(e['path'].name)
+            if not train_time:
+                unknown += 1
+                continue
+            groups[(e['subject'], e['model_type'])].append((train_time, e['path']))
+
+        remove = []
+        for group in groups.values():
+            group.sort(key=lambda e: e[0], reverse=True)
+            remove.extend(path for _, path in group[self.keep:]
+                          if path.name not in protected)
+        return remove, unknown
+
+    def _dedupe(self, paths: list, dry_run: bool) -> tuple:
+        first = {}
+        linked = skipped = 0
+        for path in paths:
+            h = self._hash(path)
+            src = first.setdefault(h, path)
+            if src == path or os.path.samefile(src, path):
+                continue
+            if dry_run:
+                linked += 1
+                continue
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.link')
+            try:
+                os.link(src, tmp)
+            except OSError as e:
+                logger.warning(f'GC can not hardlink: {src}, {e}')
+                skipped += 1
+                continue
+            if _retry(os.replace, tmp, path):
+                linked += 1
+            else:
+                tmp.unlink(missing_ok=True)
+                skipped += 1
+        return linked, skipped
+
+    def _shard(self, paths: list, dry_run: bool) -> tuple:
+        output = []
+        sharded = skipped = 0
+        for path in paths:
+            # Only the flat files are moved
+            if path.parent != self.model_dir:
+                output.append(path)
+                continue
+            if dry_run:
+                sharded += 1
+                output.append(path)
+                continue
+            dst = sharded_path(self.model_dir, path.name)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            if _retry(os.replace, path, dst):
+                sharded += 1
+                output.append(dst)
+            else:
+                skipped += 1
+                output.append(path)
+        return output, sharded, skipped
+
+    def run(self, dry_run: bool = True) -> dict:
+        '''Run the GC once, the report counts the files.'''
+        tic = time.time()
+        self.hashes = {}
+        with run_lock(self.model_dir):
+            entries = self.scan()
+            remove, unknown = self.plan(entries)
+            removed = []
+            skipped = 0
+            for path in remove:
+                logger.debug(f'GC removes: {path}')
+                if dry_run or _retry(path.unlink):
+                    removed.append(path)
+                else:
+                    skipped += 1
+
+            gone = set(removed)
+            kept = [e['path'] for e in entries if e['path'] not in gone]
+            sharded = linked = 0
+            if self.shard:
+                kept, sharded, n = self._shard(kept, dry_run)
+                skipped += n
+            if self.dedupe:
+                linked, n = self._dedupe(kept, dry_run)
+                skipped += n
+            arenas = 0
+            if self.arena is not None:
+                arenas, n = self.arena.clean(self._checksums(kept), dry_run)
+                skipped += n
+
+        self.last_report = dict(dry_run=dry_run,
+                                scanned=len(entries),
+                                removed=len(removed),
+                                unknown_age=unknown,
+                                linked=linked,
+                                sharded=sharded,
+                                arenas=arenas,
+                                skipped=skipped,
+                                cost=time.time() - tic,
+                                finished=time.time())
+        logger.info(f'Model GC: {self.last_report}')
+        return self.last_report
+
+
+def references_from_db(get_model: Callable) -> Callable[[dict], dict]:
+    '''The model files referenced by the db rows of the subjects, {file name: train time}.'''
+    from ..model_registry import index_models, model_time_of
+
+    def references(subjects: dict) -> dict:
+        output = {}
+        for query in subjects.values():
+            for models in index_models(get_model(**query)).values():
+                for model in models:
+                    name = Path(model['model_path'].split(',')[0]).name
+                    output[name] = model_time_of(model.get('model_name', '')) or None
+        return output
+    return references
+
+
+def protected_from_index(index_dir: Path) -> Callable[[], set]:
+    '''The file names referred by the latest-model index.'''
+    from .warmup import list_from_index
+
+    def protected():
+        return {Path(model_path).name for model_path, _ in list_from_index(index_dir, None)}
+    return protected
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    from omegaconf import OmegaConf
+    from ...io import DirSystem
+    from ...data_access.backend import load_backend
+    from .shared_cache import SharedModelArena
+    from ..feature_store import FeatureStore
+
+    parser = argparse.ArgumentParser(
+        description='Garbage collection of the model directory.')
+    parser.add_argument('--config', default=os.environ.get('BCI_CONFIG', './config.yaml'),
+                        help='The config of the server, the model dir, the db and config.model.gc are read from it.')
+    parser.add_argument('--keep', type=int, default=None,
+                        help='The number of the latest models kept per subject and model type.')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--dry-run', action='store_true',
+                       help='Only report what would be done.')
+    group.add_argument('--apply', action='store_true',
+                       help='Remove, link and move the files.')
+    args = parser.parse_args()
+
+    conf = OmegaConf.load(args.config)
+    ds = DirSystem()
+    ds.load_config(conf)
+    db = load_backend(conf)
+    dry_run = conf.model.gc.dry_run
+    if args.dry_run or args.apply:
+        dry_run = args.dry_run
+
+    gc = ModelGC(ds.model_dir,
+                 keep=args.keep or conf.model.gc.keep,
+                 references=references_from_db(db.get_model),
+                 protected=protected_from_index(ds.model_dir.joinpath('latest')),
+                 dedupe=conf.model.gc.dedupe,
+                 shard=conf.model.gc.shard,
+                 arena=SharedModelArena(ds.model_dir.joinpath(conf.model.shared.subdir))
+                 if conf.model.shared.enabled else None)
+    print(gc.run(dry_run))
+
+    max_mb = conf.features.get('max_mb')
+    print(FeatureStore(ds.features_dir).prune(max_bytes=max_mb * 2 ** 20 if max_mb else None,
+                                              max_age_days=conf.features.get('max_age_days'),
+                                              dry_run=dry_run))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
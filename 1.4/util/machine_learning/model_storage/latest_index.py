@@ -0,0 +1,227 @@
+"""
+File: latest_index.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The latest-model index per (subject, model type).
+    It is updated whenever /train saves a model, so /predict finds the latest model in O(1),
+    and the "latest" is decided by the train time instead of the order of the records.
+
+    Every subject has its own small json file, the in-process cache is invalidated
+    by the train of this process, and by the file mtime for the other workers.
+    The file is updated under the file lock, so the concurrent processes do not lose the updates.
+
+    The index is not the source of truth, the db is.
+    The entry older than the ttl is not used, the caller looks up the db and reconciles the entry,
+    so the models rolled back or not persisted upstream are corrected.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import json
+import time
+import hashlib
+import threading
+
+from pathlib import Path
+from contextlib import contextmanager
+
+from ..log import logger
+
+SUBJECT_KEYS = ['org_id', 'user_id', 'project_name', 'name']
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+@contextmanager
+def file_lock(path: Path):
+    '''The exclusive lock across the processes, by fcntl on linux or by msvcrt on Windows.'''
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            while True:
+                f.seek(0)
+                try:
+                    # It retries for 10 seconds before raising
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class LatestModelIndex:
+    '''The latest model per (subject, model type).'''
+    directory: Path
+
+    def __init__(self, directory: Path, ttl: float = 600):
+        '''
+        :param directory Path: the directory of the index files.
+        :param ttl float: the seconds the entry is trusted since it is verified, 0 trusts it forever.
+        '''
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        # subject path -> (mtime, {model_type: entry})
+        self.cache = {}
+        self.lock = threading.Lock()
+        logger.info(f'Initialize latest model index with directory: {directory}')
+
+    @staticmethod
+    def subject_of(body: dict) -> tuple:
+        '''The subject of the request body.'''
+        return tuple(str(body[k]) for k in SUBJECT_KEYS)
+
+    def path(self, subject: tuple) -> Path:
+        h = hashlib.sha256('\n'.join(subject).encode()).hexdigest()
+        return self.directory.joinpath(f'{h}.json')
+
+    def _read(self, subject: tuple, fresh: bool = False) -> dict:
+        path = self.path(subject)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+
+        cached = self.cache.get(path)
+        if cached and cached[0] == mtime and not fresh:
+            return cached[1]
+
+        # The file is changed by the other worker
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)['models']
+        self.cache[path] = (mtime, entries)
+        return entries
+
+    def _trusted(self, entry: dict) -> bool:
+        if not self.ttl:
+            return True
+        return time.time() - entry.get('verified', 0) < self.ttl
+
+    def get(self, subject: tuple, model_type: str):
+        '''
+        Get the latest model of the subject.
+
+        :param subject tuple: the subject from subject_of.
+        :param model_type str: the model type, the model name of the registry.
+        :return dict: the entry, {'model_path', 'model_name', 'time', 'verified'},
+                      or None if not found or older than the ttl.
+        '''
+        with self.lock:
+            entries = self._read(subject)
+        if not (entry := entries.get(model_type)):
+            # The prefix match of the types is the fallback
+            found = [e for t, e in entries.items() if t.startswith(model_type)]
+            entry = max(found, key=lambda e: e['time']) if found else None
+        # The stale entry is reconciled with the db by the caller
+        if entry and self._trusted(entry):
+            return entry
+        return None
+
+    def get_all(self, subject: tuple) -> dict:
+        '''Get the latest models of all the types of the subject, {model_type: entry}.'''
+        with self.lock:
+            return dict(self._read(subject))
+
+    @logger.catch(reraise=True)
+    def update(self, subject: tuple, model_type: str, model_path: str, model_name: str, t: float = None, reconcile: bool = False):
+        '''
+        Update the latest model of the subject, the older models do not override the newer one.
+
+        :param model_path str: the 'path,checksum' string.
+        :param model_name str: the unique model name.
+        :param t float: the train time, default is now.
+        :param reconcile bool: the entry is the latest one of the db, it overrides the newer one.
+        '''
+        now = time.time()
+        entry = dict(model_path=model_path,
+                     model_name=model_name,
+                     time=now if t is None else t,
+                     verified=now)
+
+        def change(entries: dict):
+            if (old := entries.get(model_type)) and not reconcile:
+                if old['time'] > entry['time']:
+                    return None
+            entries[model_type] = entry
+            return entries
+
+        if self._write(subject, change) is None:
+            return self.get_all(subject)[model_type]
+        logger.debug(f'Latest model index update: {subject}, {model_type}')
+        return entry
+
+    def drop(self, subject: tuple, model_type: str):
+        '''Drop the entry, like the one whose model file is gone.'''
+        def change(entries: dict):
+            return entries if entries.pop(model_type, None) else None
+        self._write(subject, change)
+
+    def _write(self, subject: tuple, change):
+        '''Read, change and write the file under the file lock, change returns None for no change.'''
+        path = self.path(subject)
+        with self.lock, file_lock(path.with_suffix('.lock')):
+            # The other process may have changed the file since it was cached
+            entries = change(dict(self._read(subject, fresh=True)))
+            if entries is None:
+                return None
+
+            # Write and rename, the readers never see a partial file
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'subject': dict(zip(SUBJECT_KEYS, subject)), 'models': entries},
+                          f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self.cache[path] = (path.stat().st_mtime_ns, entries)
+        return entries
+
+    def invalidate(self, subject: tuple = None):
+        '''Invalidate the in-process cache of the subject, or all the cache.'''
+        with self.lock:
+            if subject is None:
+                self.cache.clear()
+            else:
+                self.cache.pop(self.path(subject), None)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    import tempfile
+    index = LatestModelIndex(Path(tempfile.mkdtemp()))
+    subject = index.subject_of(dict(org_id='org', user_id='user',
+                                    project_name='project', name='name'))
+    index.update(subject, 'attention', 'a.model,abc', 'attention.1.0', 1.0)
+    index.update(subject, 'attention', 'b.model,def', 'attention.2.0', 2.0)
+    index.update(subject, 'attention', 'c.model,ghi', 'attention.0.5', 0.5)
+    print(index.get(subject, 'attention'))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,104 @@
+"""
+File: migrate.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Migrate the legacy .model files into the container format.
+    The checksum of the legacy file is kept in the header as legacy_checksum,
+    so the model_path recorded in the db is still valid.
+
+    python -m util.machine_learning.model_storage.migrate D:/BCIProject/model --dry-run
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import io
+import joblib
+import hashlib
+import argparse
+
+from pathlib import Path
+
+from ..log import logger
+from .artifact import MAGIC, ModelArtifact, write_artifact, compress_option
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def migrate_file(path: Path, dry_run: bool = False, compress=0) -> str:
+    '''
+    Migrate the legacy model file in place.
+
+    :param path Path: the model file.
+    :param dry_run bool: only report what would be done.
+    :param compress: the joblib compress option of the sections.
+    :return status str: 'migrated', 'skipped' for the container format, 'dry-run'.
+    '''
+    path = Path(path)
+    data = open(path, 'rb').read()
+    if data.startswith(MAGIC):
+        return 'skipped'
+    legacy_checksum = hashlib.sha256(data).hexdigest()
+    dct = joblib.load(io.BytesIO(data))
+    if dry_run:
+        return 'dry-run'
+
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    write_artifact(tmp, dct['info'], dct['model'],
+                   compress=compress, legacy_checksum=legacy_checksum)
+    # Check the new file before replacing the legacy one
+    art = ModelArtifact(tmp)
+    assert art.legacy_checksum == legacy_checksum
+    art.load_model()
+    os.replace(tmp, path)
+    return 'migrated'
+
+
+def migrate_dir(directory: Path, dry_run: bool = False, compress=0) -> dict:
+    '''Migrate all the .model files in the directory recursively.'''
+    counts = dict(migrated=0, skipped=0, failed=0)
+    counts['dry-run'] = 0
+    for path in sorted(Path(directory).rglob('*.model')):
+        try:
+            status = migrate_file(path, dry_run, compress)
+            logger.info(f'{status}: {path}')
+            counts[status] += 1
+        except Exception as e:
+            logger.error(f'Failed to migrate {path}: {e}')
+            counts['failed'] += 1
+    return counts
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Migrate the legacy .model files into the container format.')
+    parser.add_argument('directory', help='The model directory.')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only report what would be done.')
+    parser.add_argument('--compress', default='0',
+                        help='The codec of the sections, 0, "lz4", "zlib:3", ...')
+    args = parser.parse_args()
+    compress = int(args.compress) if args.compress.isdigit() else args.compress
+    print(migrate_dir(Path(args.directory), args.dry_run,
+                      compress_option(compress)))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -1,3 +1,4 @@
+import io
 import time
 import joblib
 import random
@@ -6,11 +7,20 @@ import hashlib
 from typing import Any, Tuple
 from pathlib import Path
 from ..log import logger
+from .artifact import MAGIC, ModelArtifact, write_artifact, read_info, compress_option
+from .gc import resolve_model_path
 
 
 class ModelCache:
     '''Model cache for rapidly predicting.'''
     buffer = {}
+    # The SharedModelArena shared across the worker processes, None for the per-process cache only
+    shared = None
+
+    def use_shared(self, arena):
+        '''Use the shared arena as the tier below the per-process buffer.'''
+        ModelCache.shared = arena
+        return self
 
     @logger.catch(reraise=True)
     def insert(self, model, info, checksum: str):
@@ -30,10 +40,50 @@ class ModelCache:
         assert checksum in self.buffer, f'No model found with checksum: {checksum}'
         return self.buffer[checksum]
 
+    @logger.catch(reraise=True)
+    def load(self, model_path: Path, checksum: str, cs: 'ChecksumSystem'):
+        '''
+        Get the model record from the cache,
+        the model file is read only when it is not cached.
+
+        With the shared arena, the model is attached from the arena when the other worker has published it,
+        otherwise it is read from the model file and published,
+        and this worker attaches the arena too, so its numpy parameters are shared.
+        '''
+        if checksum in self.buffer:
+            logger.debug(f'Cache hit: {checksum}')
+            return self.buffer[checksum]
+
+        if self.shared is not None:
+            dct = self.shared.attach(checksum) if checksum else None
+            if dct is None:
+                model, info, checksum = cs.read_model(model_path, checksum)
+                try:
+                    self.shared.publish(checksum, model, info)
+                    dct = self.shared.attach(checksum)
+                except Exception as e:
+                    # Like the arena dir is full or not writable, the predict goes on
+                    logger.warning(f'Arena publish failed, use the unpickled model: {checksum}, {e}')
+                    dct = None
+                # The unpickled copy is used when the arena fails on its checksum again
+                dct = dct or {'model': model, 'info': info}
+            return self.insert(dct['model'], dct['info'], checksum)
+
+        model, info, checksum = cs.read_model(model_path, checksum)
+        return self.insert(model, info, checksum)
+
 
 class ChecksumSystem:
     '''Checksum system for model storage.'''
 
+    def __init__(self, compress=0, model_dir: Path = None):
+        '''
+        :param compress: the codec of the model sections, 0, 'lz4', 'zlib:3', see compress_option.
+        :param model_dir Path: the model directory, the flat model paths are resolved in its shards.
+        '''
+        self.compress = compress_option(compress)
+        self.model_dir = model_dir
+
     @logger.catch(reraise=True)
     def generate_random_filename(self, info: dict) -> str:
         '''Generate a checksum for the model info.'''
@@ -47,15 +97,12 @@ class ChecksumSystem:
     @logger.catch(reraise=True)
     def save_model(self, info: dict, model: Any, dst: Path):
         '''
-        Save the model.
-        Compute a checksum for the model info.
+        Save the model in the container format.
+        Compute a checksum for the model file.
         '''
         dst = Path(dst)
         dst.parent.mkdir(parents=True, exist_ok=True)
-        joblib.dump({'model': model, 'info': info}, dst)
-        h = hashlib.new('sha256')
-        h.update(open(dst, 'rb').read())
-        checksum = h.hexdigest()
+        checksum = write_artifact(dst, info, model, compress=self.compress)
         logger.info(f'Model saved to {dst}, checksum: {checksum}')
         return checksum
 
@@ -74,13 +121,28 @@ class ChecksumSystem:
         :return info: the model info.
         :return checksum: the checksum of the binary file.
         '''
-        model_path = Path(model_path)
-        h = hashlib.new('sha256')
-        h.update(open(model_path, 'rb').read())
-        checksum = h.hexdigest()
-        assert checksum == checksum, 'The model file fails on matching checksum.'
-        dct = joblib.load(model_path)
-        model = dct['model']
-        info = dct['info']
+        model_path = resolve_model_path(self.model_dir, model_path)
+        data = open(model_path, 'rb').read()
+        actual = hashlib.sha256(data).hexdigest()
+        if data.startswith(MAGIC):
+            art = ModelArtifact(model_path, data)
+            # The migrated file is still referred by the checksum of its legacy file
+            valid = [actual, art.legacy_checksum]
+            assert checksum is None or checksum in valid, 'The model file fails on matching checksum.'
+            # The whole file has been checked
+            model = art.load_model(verify=False)
+            info = art.info
+            checksum = checksum or art.legacy_checksum or actual
+        else:
+            assert checksum is None or checksum == actual, 'The model file fails on matching checksum.'
+            dct = joblib.load(io.BytesIO(data))
+            model = dct['model']
+            info = dct['info']
+            checksum = actual
         logger.info(f'Model loaded from {model_path}, checksum: {checksum}')
         return model, info, checksum
+
+    @logger.catch(reraise=True)
+    def read_info(self, model_path: Path) -> dict:
+        '''Read the model info, only the header is read for the container format.'''
+        return read_info(resolve_model_path(self.model_dir, model_path))
@@ -0,0 +1,215 @@
+"""
+File: shared_cache.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Shared model cache tier for the multi-worker deployments.
+    The loaded models are written once into the arena files keyed by checksum,
+    the numpy parameters are stored raw, so the workers attach them as read-only memmap.
+    The pages are shared by the OS across the worker processes,
+    instead of every worker holding its own unpickled copy.
+
+    The sha256 of every arena file is kept in its .sha256 file, written along with it under the file lock.
+    The arena is verified before it is unpickled, once per process, the failed one is removed,
+    so the model is read from the model file and published again.
+    The arenas of the removed models are cleaned by the model GC.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import time
+import joblib
+import hashlib
+import threading
+
+from typing import Any
+from pathlib import Path
+
+from ..log import logger
+from .latest_index import file_lock
+
+# The tmp files older than it are left by the crashed workers
+STALE_TMP_SECONDS = 3600
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+class SharedModelArena:
+    '''The mmap'd arena files of the models, keyed by checksum.'''
+    directory: Path
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.attached = 0
+        self.published = 0
+        self.rejected = 0
+        # The (checksum, size, mtime) of the verified arena files
+        self.verified = set()
+        logger.info(f'Initialize shared model arena with directory: {directory}')
+
+    def path(self, checksum: str) -> Path:
+        return self.directory.joinpath(checksum[:2], f'{checksum}.arena')
+
+    @staticmethod
+    def lock_path(path: Path) -> Path:
+        # One lock per shard, so the lock files are not left by the removed arenas
+        return path.parent.joinpath('.arena.lock')
+
+    @staticmethod
+    def digest_path(path: Path) -> Path:
+        return path.with_name(f'{path.name}.sha256')
+
+    @staticmethod
+    def _file_hash(path: Path) -> str:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def verify(self, checksum: str, path: Path) -> bool:
+        '''Check the arena file against its .sha256 file, the file is hashed once per process.'''
+        stat = path.stat()
+        key = (checksum, stat.st_size, stat.st_mtime_ns)
+        if key in self.verified:
+            return True
+        try:
+            with open(self.digest_path(path)) as f:
+                expected = f.read().strip()
+        except FileNotFoundError:
+            expected = None
+        if expected != self._file_hash(path):
+            return False
+        with self.lock:
+            self.verified.add(key)
+        return True
+
+    def remove(self, checksum: str):
+        '''Remove the arena and its .sha256 file, the processes attaching it keep their maps.'''
+        path = self.path(checksum)
+        with file_lock(self.lock_path(path)):
+            path.unlink(missing_ok=True)
+            self.digest_path(path).unlink(missing_ok=True)
+
+    def attach(self, checksum: str):
+        '''
+        Attach the model from the arena, it is verified before it is unpickled.
+
+        :return dict: the {'model', 'info'}, the numpy parameters are read-only memmap,
+                      or None if not published or it fails on matching the checksum.
+        '''
+        path = self.path(checksum)
+        if not path.is_file():
+            return None
+        try:
+            valid = self.verify(checksum, path)
+        except FileNotFoundError:
+            # Removed by the GC
+            return None
+        if not valid:
+            logger.error(f'Arena fails on matching checksum, remove it: {path}')
+            with self.lock:
+                self.rejected += 1
+            self.remove(checksum)
+            return None
+        dct = joblib.load(path, mmap_mode='r')
+        with self.lock:
+            self.attached += 1
+        logger.debug(f'Arena attach: {checksum}')
+        return dct
+
+    @logger.catch(reraise=True)
+    def publish(self, checksum: str, model: Any, info: dict) -> Path:
+        '''
+        Publish the model into the arena, it is written only once for every checksum.
+        '''
+        path = self.path(checksum)
+        if path.is_file():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The arena and its .sha256 file are written by one worker
+        with file_lock(self.lock_path(path)):
+            if path.is_file():
+                return path
+            # No compression, so the arrays are able to be memmapped
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            joblib.dump({'model': model, 'info': info}, tmp)
+            with open(self.digest_path(path), 'w') as f:
+                f.write(self._file_hash(tmp))
+            os.replace(tmp, path)
+        with self.lock:
+            self.published += 1
+        logger.debug(f'Arena publish: {checksum}')
+        return path
+
+    def checksums(self) -> set:
+        '''The checksums of the published arenas.'''
+        return {path.name[:-len('.arena')] for path in self.directory.glob('*/*.arena')}
+
+    def clean(self, live: set, dry_run: bool = True) -> tuple:
+        '''
+        Remove the arenas whose models are gone, and the stale tmp files.
+
+        :param live set: the checksums of the existing models.
+        :return removed int: the number of the removed arenas.
+        :return skipped int: the number of the arenas in use, like the mapped ones on Windows.
+        '''
+        removed = skipped = 0
+        for checksum in self.checksums() - set(live):
+            logger.debug(f'Arena clean: {checksum}')
+            if dry_run:
+                removed += 1
+                continue
+            try:
+                self.remove(checksum)
+                removed += 1
+            except OSError as e:
+                logger.warning(f'Arena is in use, skip it: {checksum}, {e}')
+                skipped += 1
+        if not dry_run:
+            for tmp in self.directory.glob('*/*.tmp'):
+                try:
+                    if time.time() - tmp.stat().st_mtime > STALE_TMP_SECONDS:
+                        tmp.unlink()
+                except OSError:
+                    pass
+        return removed, skipped
+
+    def stats(self) -> dict:
+        return dict(directory=self.directory.as_posix(),
+                    attached=self.attached,
+                    published=self.published,
+                    rejected=self.rejected)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    import tempfile
+    import numpy as np
+    arena = SharedModelArena(Path(tempfile.mkdtemp()))
+    arena.publish('abcd', {'w': np.ones((100, 100))}, {'name': 'name'})
+    dct = arena.attach('abcd')
+    print(type(dct['model']['w']), dct['model']['w'].flags.writeable)
+    print(arena.clean(set(), dry_run=False), arena.checksums())
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
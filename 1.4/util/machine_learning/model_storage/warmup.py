@@ -0,0 +1,162 @@
+"""
+File: warmup.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Warm up the model cache at server start.
+    The most recently used N models are preloaded into ModelCache,
+    so the first /predict of every user does not pay the file read, the hash and the unpickle.
+
+    The models are listed from:
+
+    - index: the latest-model index, ordered by the train time.
+    - db: the get_recent_models of the data access backend.
+    - mtime: the model files, ordered by the modification time.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import json
+import time
+import threading
+
+from pathlib import Path
+from typing import Callable
+
+from ..log import logger
+from .model_cache import ModelCache, ChecksumSystem
+from .artifact import checksum_of
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def list_from_index(index_dir: Path, n: int) -> list:
+    '''The latest models in the latest-model index, [(model_path, checksum), ...].'''
+    entries = []
+    for path in Path(index_dir).glob('*.json'):
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries.extend(json.load(f)['models'].values())
+        except Exception as e:
+            logger.warning(f'Failed to read the index: {path}, {e}')
+    entries.sort(key=lambda e: e['time'], reverse=True)
+    return [tuple(e['model_path'].split(',')) for e in entries[:n]]
+
+
+def list_from_mtime(model_dir: Path, n: int) -> list:
+    '''
+    The latest model files, [(model_path, checksum), ...].
+    The checksum is the one the db refers the model by, so the inference pool routes it like the predicts.
+    '''
+    paths = sorted(Path(model_dir).rglob('*.model'),
+                   key=lambda p: p.stat().st_mtime, reverse=True)
+    output = []
+    for p in paths[:n]:
+        try:
+            output.append((p.as_posix(), checksum_of(p)))
+        except OSError as e:
+            logger.warning(f'Warm up skips the model: {p}, {e}')
+    return output
+
+
+def list_from_db(get_recent_models: Callable, n: int) -> list:
+    '''The latest models in the db, [(model_path, checksum), ...].'''
+    return [tuple(e['model_path'].split(',')) for e in get_recent_models(n)]
+
+
+class ModelWarmup:
+    '''Preload the models into the cache, the progress is reported by status.'''
+
+    def __init__(self, mc: ModelCache, cs: ChecksumSystem, list_models: Callable[[], list], load: Callable = None):
+        '''
+        :param list_models Callable: list the models to preload, [(model_path, checksum), ...].
+        :param load Callable: load the model by (model_path, checksum), the default loads it into the mc,
+                              like the InferencePool.warm loads it into its worker.
+        '''
+        self.mc = mc
+        self.cs = cs
+        self.list_models = list_models
+        self.load = load or self._load
+        self.state = 'pending'
+        self.total = 0
+        self.loaded = 0
+        self.failed = 0
+        self.started = None
+        self.finished = None
+        self.thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'done'
+
+    def _load(self, model_path, checksum):
+        if checksum is None:
+            model, info, checksum = self.cs.read_model(model_path, checksum)
+            self.mc.insert(model, info, checksum)
+        else:
+            self.mc.load(model_path, checksum, self.cs)
+
+    def run(self):
+        self.state = 'running'
+        self.started = time.time()
+        try:
+            models = self.list_models()
+        except Exception as e:
+            logger.exception(e)
+            models = []
+        self.total = len(models)
+        logger.info(f'Warm up starts with {self.total} models')
+
+        for model_path, checksum in models:
+            try:
+                self.load(model_path, checksum)
+                self.loaded += 1
+            except Exception as e:
+                logger.warning(f'Warm up failed on {model_path}: {e}')
+                self.failed += 1
+
+        self.finished = time.time()
+        self.state = 'done'
+        logger.info(
+            f'Warm up done, loaded: {self.loaded}, failed: {self.failed}, cost: {self.finished - self.started:.2f}s')
+        return self
+
+    def start(self, background: bool = True):
+        '''Start the warm up, in the background thread or in place.'''
+        if not background:
+            return self.run()
+        self.thread = threading.Thread(
+            target=self.run, name='model-warmup', daemon=True)
+        self.thread.start()
+        return self
+
+    def status(self) -> dict:
+        return dict(state=self.state,
+                    ready=self.ready,
+                    total=self.total,
+                    loaded=self.loaded,
+                    failed=self.failed,
+                    started=self.started,
+                    finished=self.finished)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
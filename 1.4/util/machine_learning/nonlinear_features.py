@@ -0,0 +1,226 @@
+"""
+File: nonlinear_features.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Fast nonlinear-dynamics features for the EEG models.
+    They replace the per-call nolds functions.
+    All the functions work on the (..., samples) batches, usually (epochs, channels, samples).
+
+    - sample_entropy: the same as nolds.sampen, the template matches are counted by KD-tree.
+    - dfa: the same as nolds.dfa(fit_exp='poly'), the windows are detrended by the projection.
+    - higuchi_fd: the Higuchi fractal dimension, the offsets are summed by reshaping.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import numpy as np
+
+from scipy.spatial import cKDTree
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def _as_batch(data: np.ndarray):
+    '''Flatten the data into (batch, samples), and return the leading shape.'''
+    data = np.asarray(data, dtype=np.float64)
+    return data.reshape(-1, data.shape[-1]), data.shape[:-1]
+
+
+def default_tolerance(data: np.ndarray, emb_dim: int = 2) -> np.ndarray:
+    '''
+    The default tolerance of nolds.sampen.
+
+    :param data np.ndarray: the data in (..., samples) shape.
+    :return np.ndarray: the tolerance in (...) shape.
+    '''
+    return np.std(data, axis=-1, ddof=1) * 0.1164 * (0.5627 * np.log(emb_dim) + 1.3334)
+
+
+def _count_pairs(vectors: np.ndarray, tolerance: float, closed: bool) -> int:
+    '''Count the unordered pairs of the vectors within the chebyshev tolerance.'''
+    r = tolerance if closed else np.nextafter(tolerance, -np.inf)
+    if r < 0:
+        return 0
+    tree = cKDTree(vectors)
+    # The count includes the self pairs and both orders of each pair
+    count = tree.count_neighbors(tree, r, p=np.inf)
+    return (int(count) - len(vectors)) // 2
+
+
+def sample_entropy(data: np.ndarray, emb_dim: int = 2, tolerance=None, lag: int = 1, closed: bool = False) -> np.ndarray:
+    '''
+    Compute the sample entropy, the same as nolds.sampen with the chebyshev distance.
+
+    :param data np.ndarray: the data in (..., samples) shape.
+    :param emb_dim int: the embedding dimension.
+    :param tolerance: the tolerance, float or (...) array, default is the nolds default.
+    :param lag int: the delay of the embedding.
+    :param closed bool: whether the distance equals the tolerance counts as a match.
+    :return np.ndarray: the sample entropy in (...) shape.
+    '''
+    batch, shape = _as_batch(data)
+    if tolerance is None:
+        tolerance = default_tolerance(batch, emb_dim)
+    else:
+        tolerance = np.broadcast_to(
+            np.asarray(tolerance, dtype=np.float64), shape).reshape(-1)
+
+    n = batch.shape[-1]
+    min_len = emb_dim * lag + 1
+    assert n >= min_len, f'Not enough samples for embedding: {n} < {min_len}'
+
+    output = np.empty(len(batch))
+    for i, x in enumerate(batch):
+        # The templates of emb_dim + 1, and its first emb_dim columns
+        vectors = sliding_window_view(x, emb_dim * lag + 1)[:, ::lag]
+        a = _count_pairs(vectors[:, :emb_dim], tolerance[i], closed)
+        b = _count_pairs(vectors, tolerance[i], closed)
+        if a > 0 and b > 0:
+            output[i] = -np.log(b / a)
+        elif a == 0 and b == 0:
+            output[i] = np.nan
+        elif a == 0:
+            output[i] = -np.inf
+        else:
+            output[i] = np.inf
+    return output.reshape(shape)
+
+
+def logarithmic_n(min_n: int, max_n: float, factor: float) -> list:
+    '''The default window sizes of nolds.dfa.'''
+    max_i = int(np.floor(np.log(1.0 * max_n / min_n) / np.log(factor)))
+    ns = [min_n]
+    for i in range(max_i + 1):
+        n = int(np.floor(min_n * (factor ** i)))
+        if n > ns[-1]:
+            ns.append(n)
+    return ns
+
+
+def default_nvals(total_n: int) -> list:
+    '''The default window sizes of nolds.dfa.'''
+    if total_n > 70:
+        return logarithmic_n(4, 0.1 * total_n, 1.2)
+    if total_n > 10:
+        return [4, 5, 6, 7, 8, 9]
+    return [total_n - 2, total_n - 1]
+
+
+def _detrend_basis(n: int, order: int) -> np.ndarray:
+    '''The orthonormal basis of the polynomials of the window.'''
+    x = np.arange(n, dtype=np.float64)
+    q, _ = np.linalg.qr(np.vander(x, order + 1))
+    return q
+
+
+def dfa(data: np.ndarray, nvals=None, overlap: bool = True, order: int = 1) -> np.ndarray:
+    '''
+    Compute the detrended fluctuation analysis exponent.
+    It equals nolds.dfa(fit_trend='poly', fit_exp='poly').
+
+    :param data np.ndarray: the data in (..., samples) shape.
+    :param nvals: the window sizes, default is the nolds default.
+    :param overlap bool: whether the windows have 50% overlap.
+    :param order int: the order of the polynomial trend.
+    :return np.ndarray: the exponent in (...) shape.
+    '''
+    batch, shape = _as_batch(data)
+    total_n = batch.shape[-1]
+    nvals = np.asarray(default_nvals(total_n) if nvals is None else nvals)
+    assert len(nvals) >= 2, 'At least two nvals are needed'
+    assert nvals.min() >= 2, 'The nvals must be at least two'
+    assert nvals.max() < total_n, 'The nvals cannot be larger than the input size'
+
+    walk = np.cumsum(batch - batch.mean(axis=-1, keepdims=True), axis=-1)
+
+    fluctuations = np.empty((len(batch), len(nvals)))
+    for j, n in enumerate(nvals):
+        if overlap:
+            # The same windows as nolds, the last start is excluded
+            windows = sliding_window_view(walk[:, :-1], n, axis=-1)[:, ::n // 2]
+        else:
+            windows = walk[:, :total_n - total_n % n].reshape(len(batch), -1, n)
+        q = _detrend_basis(n, order)
+        residual = windows - (windows @ q) @ q.T
+        flucs = np.sum(residual ** 2, axis=-1) / n
+        fluctuations[:, j] = np.sqrt(flucs.mean(axis=-1))
+
+    output = np.full(len(batch), np.nan)
+    log_n = np.log(nvals)
+    for i, f in enumerate(fluctuations):
+        nonzero = f != 0
+        if np.any(nonzero):
+            output[i] = np.polyfit(log_n[nonzero], np.log(f[nonzero]), 1)[0]
+    return output.reshape(shape)
+
+
+def higuchi_fd(data: np.ndarray, kmax: int = 10) -> np.ndarray:
+    '''
+    Compute the Higuchi fractal dimension.
+
+    :param data np.ndarray: the data in (..., samples) shape.
+    :param kmax int: the maximum interval.
+    :return np.ndarray: the fractal dimension in (...) shape.
+    '''
+    batch, shape = _as_batch(data)
+    n = batch.shape[-1]
+    assert n > kmax, f'Not enough samples for kmax: {n} <= {kmax}'
+
+    ks = np.arange(1, kmax + 1)
+    lengths = np.empty((len(batch), kmax))
+    for j, k in enumerate(ks):
+        # The differences of lag k, the offset m takes diffs[m::k]
+        diffs = np.abs(batch[:, k:] - batch[:, :-k])
+        pad = (-diffs.shape[-1]) % k
+        diffs = np.pad(diffs, ((0, 0), (0, pad)))
+        sums = diffs.reshape(len(batch), -1, k).sum(axis=1)
+        counts = (n - np.arange(k) - 1) // k
+        lm = sums * (n - 1) / (counts * k) / k
+        lengths[:, j] = lm.mean(axis=-1)
+
+    x = np.log(1.0 / ks)
+    y = np.log(lengths)
+    # Batched least-squares slope
+    x = x - x.mean()
+    slope = (y - y.mean(axis=-1, keepdims=True)) @ x / np.sum(x ** 2)
+    return slope.reshape(shape)
+
+
+def nonlinear_features(data: np.ndarray) -> dict:
+    '''
+    Compute all the nonlinear features at once.
+
+    :param data np.ndarray: the data in (..., samples) shape.
+    :return dict: the features, {name: (...) array}.
+    '''
+    return dict(sample_entropy=sample_entropy(data),
+                dfa=dfa(data),
+                higuchi_fd=higuchi_fd(data))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    x = np.random.randn(4, 8, 250 * 5)
+    for k, v in nonlinear_features(x).items():
+        print(k, v.shape, v.mean())
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
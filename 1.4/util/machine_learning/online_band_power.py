@@ -0,0 +1,214 @@
+"""
+File: online_band_power.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Incremental Welch PSD and band powers for the sliding prediction windows.
+    The periodograms of the segments are kept in a circular buffer with their running sum,
+    the new segments are added and the expired ones are dropped.
+    So the cost of every update is O(new data) instead of O(window).
+
+    The result equals the batch Welch (SpectralFeatureExtractor.psd) of the covered samples,
+    which are the latest n_segments segments on the stream's segment grid.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import threading
+import numpy as np
+
+from collections import OrderedDict
+
+from .log import logger
+from .spectral_features import SpectralFeatureExtractor, get_extractor
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+class OnlineBandPower:
+    '''Incremental Welch estimator of one stream, (channels, samples) in, PSD out.'''
+    extractor: SpectralFeatureExtractor
+    n_segments: int
+
+    def __init__(self, window_samples: int, extractor: SpectralFeatureExtractor = None):
+        '''
+        :param window_samples int: the length of the sliding window.
+        :param extractor SpectralFeatureExtractor: the batch extractor, its window and masks are reused.
+        '''
+        self.extractor = extractor or get_extractor()
+        nperseg = self.extractor.nperseg
+        step = self.extractor.step
+        assert window_samples >= nperseg, f'The window is shorter than a segment: {window_samples} < {nperseg}'
+        self.n_segments = (window_samples - nperseg) // step + 1
+        # Recompute the running sum after the buffer is overwritten once, so the error does not accumulate
+        self.refresh_every = self.n_segments
+        self.reset()
+
+    def reset(self):
+        self.ring = None
+        self.total = None
+        self.pending = None
+        self.head = 0
+        self.count = 0
+        self.replaced = 0
+        self.end_time = None
+
+    def _allocate(self, n_channels: int):
+        n_freqs = len(self.extractor.freqs)
+        self.ring = np.zeros((self.n_segments, n_channels, n_freqs))
+        self.total = np.zeros((n_channels, n_freqs))
+        self.pending = np.zeros((n_channels, 0))
+
+    def push(self, x: np.ndarray):
+        '''
+        Push the new samples.
+
+        :param x np.ndarray: the new samples in (channels, samples) shape.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        if self.ring is None or self.ring.shape[1] != x.shape[0]:
+            self._allocate(x.shape[0])
+
+        nperseg = self.extractor.nperseg
+        step = self.extractor.step
+        # Only the new data and the leftover of the last push are segmented
+        self.pending = np.concatenate([self.pending, x], axis=-1)
+        n = self.pending.shape[-1]
+        if n < nperseg:
+            return self
+
+        periodograms = self.extractor.segment_periodograms(self.pending)
+        # (channels, segments, freqs) -> (segments, channels, freqs)
+        periodograms = periodograms.transpose(1, 0, 2)
+        # Only the latest n_segments matter
+        for p in periodograms[-self.n_segments:]:
+            self._add(p)
+        # Keep the samples of the next segment
+        self.pending = self.pending[:, len(periodograms) * step:]
+        return self
+
+    def _add(self, p: np.ndarray):
+        if self.count == self.n_segments:
+            self.total -= self.ring[self.head]
+            self.replaced += 1
+        else:
+            self.count += 1
+        self.ring[self.head] = p
+        self.total += p
+        self.head = (self.head + 1) % self.n_segments
+
+        if self.replaced >= self.refresh_every:
+            self.total = self.ring.sum(axis=0)
+            self.replaced = 0
+
+    def update_window(self, x: np.ndarray, end_time: float, srate: float = None):
+        '''
+        Update with the whole prediction window, only its new part is used.
+
+        :param x np.ndarray: the window in (channels, samples) shape.
+        :param end_time float: the time of the last sample, in milliseconds.
+        :param srate float: the sampling rate, default is the extractor's.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        srate = srate or self.extractor.srate
+        if self.end_time is None or self.ring is None or self.ring.shape[1] != x.shape[0]:
+            n_new = x.shape[-1]
+            self.reset()
+        else:
+            n_new = int(round((end_time - self.end_time) * srate / 1000))
+
+        # The stream goes back, or jumps over the window, restart it
+        if n_new < 0 or n_new > x.shape[-1]:
+            logger.debug(f'Online band power restarts, new samples: {n_new}')
+            self.reset()
+            n_new = x.shape[-1]
+
+        if n_new > 0:
+            self.push(x[:, -n_new:])
+        self.end_time = end_time
+        return self
+
+    @property
+    def ready(self) -> bool:
+        return self.count > 0
+
+    def psd(self):
+        '''
+        The PSD of the covered samples.
+
+        :return freqs np.ndarray: the frequencies.
+        :return psd np.ndarray: the PSD in (channels, freqs) shape.
+        '''
+        assert self.ready, 'Not enough samples for a segment'
+        return self.extractor.freqs, self.total / self.count
+
+    def band_powers(self, relative: bool = False) -> dict:
+        '''The band powers of the covered samples, {name: (channels) array}.'''
+        freqs, psd = self.psd()
+        powers = self.extractor.integrate(freqs, psd)
+        if relative:
+            total = powers['total']
+            powers = {name: p / total for name, p in powers.items()}
+        return powers
+
+
+class OnlineBandPowerPool:
+    '''The online estimators of the users, the least recently used ones are dropped.'''
+
+    def __init__(self, window_samples: int, capacity: int = 256, extractor: SpectralFeatureExtractor = None):
+        self.window_samples = window_samples
+        self.capacity = capacity
+        self.extractor = extractor or get_extractor()
+        self.buffer = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key) -> OnlineBandPower:
+        '''
+        Get the estimator of the key, like (org_id, user_id, project_name, name).
+        '''
+        with self.lock:
+            if key not in self.buffer:
+                self.buffer[key] = OnlineBandPower(
+                    self.window_samples, self.extractor)
+            self.buffer.move_to_end(key)
+            while len(self.buffer) > self.capacity:
+                self.buffer.popitem(last=False)
+            return self.buffer[key]
+
+    def drop(self, key):
+        with self.lock:
+            self.buffer.pop(key, None)
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    extractor = get_extractor()
+    window = extractor.nperseg + extractor.step * 9
+    stream = np.random.randn(8, window * 5)
+    online = OnlineBandPower(window, extractor)
+    for end in range(window, stream.shape[-1] + 1, extractor.step):
+        online.update_window(stream[:, end - window:end],
+                             end_time=end / extractor.srate * 1000)
+        freqs, psd = online.psd()
+        f, p = extractor.psd(stream[:, end - window:end])
+        assert np.allclose(psd, p)
+    print('Equal to the batch Welch')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
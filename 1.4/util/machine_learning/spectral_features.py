@@ -0,0 +1,232 @@
+"""
+File: spectral_features.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Shared spectral features for the EEG models.
+    The Welch PSDs are computed for all the epochs and channels in one batched call,
+    and the canonical band powers are returned at once.
+    The attention (theta / beta), memory (alpha / theta) and visual focus models reuse it.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import numpy as np
+
+from functools import lru_cache
+from scipy.signal import get_window
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .log import logger
+
+# The sampling rate of the EEG device
+SRATE = 250
+
+# The canonical bands, (low, high) in Hz, the high edge is excluded
+BANDS = {
+    'delta': (1, 4),
+    'theta': (4, 8),
+    'alpha': (8, 13),
+    'beta': (13, 30),
+    'gamma': (30, 45),
+}
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+class SpectralFeatureExtractor:
+    '''
+    Batched Welch PSD and band powers.
+
+    The window, its scale and the frequency-bin masks are computed once,
+    so the repeated calls only pay the segmenting and the FFT.
+    The results equal scipy.signal.welch(x, fs=srate, nperseg=nperseg, noverlap=noverlap).
+    '''
+    srate: float
+    nperseg: int
+    noverlap: int
+    window: np.ndarray
+    freqs: np.ndarray
+    band_masks: dict
+
+    def __init__(self, srate: float = SRATE, nperseg: int = None, noverlap: int = None, bands: dict = None):
+        '''
+        :param srate float: the sampling rate.
+        :param nperseg int: the segment length, default is 2 seconds.
+        :param noverlap int: the overlap between segments, default is half of the segment.
+        :param bands dict: the bands, default is the canonical BANDS.
+        '''
+        self.srate = srate
+        self.nperseg = int(nperseg or srate * 2)
+        self.noverlap = int(self.nperseg // 2 if noverlap is None else noverlap)
+        assert 0 <= self.noverlap < self.nperseg, f'Invalid noverlap: {self.noverlap}'
+        self.step = self.nperseg - self.noverlap
+        self.bands = dict(bands or BANDS)
+
+        # Precompute the window and its density scale
+        self.window = get_window('hann', self.nperseg)
+        self.scale = 1.0 / (self.srate * np.sum(self.window ** 2))
+
+        # Precompute the one-sided doubling, the Nyquist bin is not doubled for even nperseg
+        self.freqs = np.fft.rfftfreq(self.nperseg, 1.0 / self.srate)
+        self.one_sided = np.full(len(self.freqs), 2.0)
+        self.one_sided[0] = 1.0
+        if self.nperseg % 2 == 0:
+            self.one_sided[-1] = 1.0
+        self.df = self.freqs[1] - self.freqs[0]
+
+        # Precompute the frequency-bin masks
+        self.band_masks = {name: (self.freqs >= low) & (self.freqs < high)
+                           for name, (low, high) in self.bands.items()}
+        logger.debug(
+            f'Spectral extractor: srate={self.srate}, nperseg={self.nperseg}, noverlap={self.noverlap}')
+
+    def config(self) -> dict:
+        '''The configuration, it identifies the computed features.'''
+        return dict(srate=self.srate,
+                    nperseg=self.nperseg,
+                    noverlap=self.noverlap,
+                    bands={k: list(v) for k, v in self.bands.items()})
+
+    def segment_periodograms(self, x: np.ndarray) -> np.ndarray:
+        '''
+        Compute the periodograms of every segment.
+
+        :param x np.ndarray: the data in (..., samples) shape.
+        :return np.ndarray: the periodograms in (..., segments, freqs) shape.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        segments = sliding_window_view(
+            x, self.nperseg, axis=-1)[..., ::self.step, :]
+        # Constant detrend, the same as scipy's default
+        segments = segments - segments.mean(axis=-1, keepdims=True)
+        spec = np.fft.rfft(segments * self.window, axis=-1)
+        return (spec.real ** 2 + spec.imag ** 2) * (self.scale * self.one_sided)
+
+    def psd(self, x: np.ndarray):
+        '''
+        Compute the Welch PSD for all the epochs and channels in one call.
+
+        :param x np.ndarray: the data in (..., samples) shape, usually (epochs, channels, samples).
+        :return freqs np.ndarray: the frequencies.
+        :return psd np.ndarray: the PSD in (..., freqs) shape.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        n = x.shape[-1]
+        # The data is shorter than a segment, use the shorter extractor like scipy does
+        if n < self.nperseg:
+            assert n > 1, f'Not enough samples: {n}'
+            short = get_extractor(self.srate, n, n // 2,
+                                  tuple(self.bands.items()))
+            return short.psd(x)
+        return self.freqs, self.segment_periodograms(x).mean(axis=-2)
+
+    def integrate(self, freqs: np.ndarray, psd: np.ndarray) -> dict:
+        '''
+        Integrate the PSD into the band powers.
+
+        :param freqs np.ndarray: the frequencies of the psd.
+        :param psd np.ndarray: the PSD in (..., freqs) shape.
+        :return dict: the band powers, {name: (...) array}, the 'total' is the power of all the bands.
+        '''
+        # The grid of the same length may have the other sampling rate
+        if len(freqs) == len(self.freqs) and np.array_equal(freqs, self.freqs):
+            masks = self.band_masks
+            df = self.df
+        else:
+            masks = {name: (freqs >= low) & (freqs < high)
+                     for name, (low, high) in self.bands.items()}
+            df = freqs[1] - freqs[0]
+        powers = {name: psd[..., mask].sum(axis=-1) * df
+                  for name, mask in masks.items()}
+        powers['total'] = np.sum([powers[name] for name in masks], axis=0)
+        return powers
+
+    def band_powers(self, x: np.ndarray, relative: bool = False) -> dict:
+        '''
+        Compute all the band powers at once.
+
+        :param x np.ndarray: the data in (..., samples) shape.
+        :param relative bool: whether to divide the band powers by the total power.
+        :return dict: the band powers, {name: (...) array}.
+        '''
+        freqs, psd = self.psd(x)
+        powers = self.integrate(freqs, psd)
+        if relative:
+            total = powers['total']
+            powers = {name: p / total for name, p in powers.items()}
+        return powers
+
+    def band_power_array(self, x: np.ndarray, relative: bool = False) -> np.ndarray:
+        '''
+        Compute all the band powers and stack them as the last axis.
+
+        :param x np.ndarray: the data in (..., samples) shape.
+        :param relative bool: whether to divide the band powers by the total power.
+        :return np.ndarray: the band powers in (..., bands) shape, ordered as self.bands.
+        '''
+        powers = self.band_powers(x, relative=relative)
+        return np.stack([powers[name] for name in self.bands], axis=-1)
+
+
+@lru_cache(maxsize=16)
+def get_extractor(srate: float = SRATE, nperseg: int = None, noverlap: int = None, bands: tuple = None) -> SpectralFeatureExtractor:
+    '''
+    Get the shared extractor, the extractors are reused across the models.
+
+    :param bands tuple: the bands as tuple of (name, (low, high)) pairs, since it is the cache key.
+    '''
+    return SpectralFeatureExtractor(srate, nperseg, noverlap, dict(bands) if bands else None)
+
+
+def band_ratio(powers: dict, numerator: str, denominator: str, eps: float = 1e-12) -> np.ndarray:
+    '''
+    Compute the ratio between two bands, like theta / beta.
+
+    :param powers dict: the band powers from SpectralFeatureExtractor.band_powers.
+    :return np.ndarray: the ratio.
+    '''
+    return powers[numerator] / (powers[denominator] + eps)
+
+
+def theta_beta_ratio(powers: dict) -> np.ndarray:
+    '''The feature of the attention model.'''
+    return band_ratio(powers, 'theta', 'beta')
+
+
+def alpha_theta_ratio(powers: dict) -> np.ndarray:
+    '''The feature of the memory model.'''
+    return band_ratio(powers, 'alpha', 'theta')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    from scipy.signal import welch
+
+    x = np.random.randn(20, 8, SRATE * 4)
+    extractor = get_extractor()
+    freqs, psd = extractor.psd(x)
+    f, p = welch(x, fs=SRATE, nperseg=extractor.nperseg)
+    print(np.allclose(freqs, f), np.allclose(psd, p))
+    powers = extractor.band_powers(x)
+    print({k: v.shape for k, v in powers.items()})
+    print(theta_beta_ratio(powers).mean(), alpha_theta_ratio(powers).mean())
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,249 @@
+"""
+File: memory_diagnostics.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The memory diagnostics of the long-running server.
+
+    - The tracemalloc snapshots are taken on the interval,
+      the top allocation sites are diffed against the first snapshot and the previous one.
+    - The RSS of the process, by psutil if it is installed, or by /proc on linux.
+    - The bytes and the entries of the caches, like the ModelCache and the FeatureStore.
+    - The live matplotlib figures, they leak when the figures are not closed.
+
+    The tracemalloc slows down the allocations, so it is started only in the diagnostics mode.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import os
+import sys
+import time
+import threading
+import tracemalloc
+import numpy as np
+
+from typing import Callable
+
+from .log import logger
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def rss_bytes() -> int:
+    '''The resident set size of the process, None if it is unknown.'''
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def nbytes_of(obj, max_depth: int = 6, _seen: set = None) -> dict:
+    '''
+    The bytes of the object, the numpy arrays are counted by their buffers.
+
+    :return dict: the private bytes, and the mapped bytes of the memmaps shared across the processes.
+    '''
+    seen = _seen if _seen is not None else set()
+    output = dict(private=0, mapped=0)
+    if id(obj) in seen or max_depth < 0:
+        return output
+    seen.add(id(obj))
+
+    if isinstance(obj, np.memmap):
+        output['mapped'] += obj.nbytes
+        return output
+    if isinstance(obj, np.ndarray):
+        output['private'] += obj.nbytes
+        return output
+
+    output['private'] += sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        children = list(obj.values())
+    elif isinstance(obj, (list, tuple, set)):
+        children = list(obj)
+    elif hasattr(obj, '__dict__'):
+        children = list(vars(obj).values())
+    else:
+        children = []
+    for child in children:
+        sub = nbytes_of(child, max_depth - 1, seen)
+        output['private'] += sub['private']
+        output['mapped'] += sub['mapped']
+    return output
+
+
+def live_figures() -> int:
+    '''The number of the live matplotlib figures, None if matplotlib is not imported.'''
+    if 'matplotlib.pyplot' not in sys.modules:
+        return None
+    return len(sys.modules['matplotlib.pyplot'].get_fignums())
+
+
+class MemoryDiagnostics:
+    '''The periodic tracemalloc snapshots and the memory accounting.'''
+
+    def __init__(self, interval: float = 600, top: int = 20, frames: int = 5):
+        '''
+        :param interval float: the seconds between the snapshots.
+        :param top int: the number of the top allocation sites.
+        :param frames int: the frames kept per allocation.
+        '''
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        # name -> Callable returns the cache, its bytes are counted
+        self.caches = {}
+        self.baseline = None
+        self.previous = None
+        self.current = None
+        self.history = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def register_cache(self, name: str, get: Callable):
+        '''Count the bytes of the cache, get returns its entries like the dict.'''
+        self.caches[name] = get
+
+    def snapshot(self):
+        '''Take the snapshot, the tracemalloc itself is excluded.'''
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        with self.lock:
+            if self.baseline is None:
+                self.baseline = snapshot
+            self.previous = self.current
+            self.current = snapshot
+            self.history.append(dict(time=time.time(),
+                                     rss=rss_bytes(),
+                                     traced=tracemalloc.get_traced_memory()[0]))
+            self.history = self.history[-144:]
+        return snapshot
+
+    def start(self):
+        '''Start the tracemalloc and the snapshots on the interval.'''
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.snapshot()
+
+        def loop():
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    logger.exception(e)
+
+        self.thread = threading.Thread(target=loop, name='memory-diagnostics', daemon=True)
+        self.thread.start()
+        logger.warning(f'Memory diagnostics is started, interval: {self.interval}s')
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        tracemalloc.stop()
+
+    @staticmethod
+    def _stat(stat) -> dict:
+        frame = stat.traceback[0]
+        return dict(site=f'{frame.filename}:{frame.lineno}',
+                    size=stat.size,
+                    count=stat.count)
+
+    @staticmethod
+    def _diff(stat) -> dict:
+        frame = stat.traceback[0]
+        return dict(site=f'{frame.filename}:{frame.lineno}',
+                    size=stat.size,
+                    size_diff=stat.size_diff,
+                    count_diff=stat.count_diff)
+
+    def cache_accounting(self) -> dict:
+        output = {}
+        for name, get in self.caches.items():
+            try:
+                cache = get()
+                output[name] = dict(entries=len(cache), **nbytes_of(cache))
+            except Exception as e:
+                output[name] = dict(error=str(e))
+        return output
+
+    def report(self, fresh: bool = True) -> dict:
+        '''
+        The memory report.
+
+        :param fresh bool: take the snapshot now, instead of using the latest periodic one.
+        '''
+        output = dict(rss=rss_bytes(),
+                      live_figures=live_figures(),
+                      caches=self.cache_accounting(),
+                      tracing=tracemalloc.is_tracing())
+        if not tracemalloc.is_tracing():
+            return output
+        if fresh:
+            self.snapshot()
+
+        with self.lock:
+            current, previous, baseline = self.current, self.previous, self.baseline
+            output['history'] = list(self.history)
+        output['traced'], output['traced_peak'] = tracemalloc.get_traced_memory()
+        output['top'] = [self._stat(s)
+                         for s in current.statistics('lineno')[:self.top]]
+        output['growth_since_start'] = [self._diff(s)
+                                        for s in current.compare_to(baseline, 'lineno')[:self.top]]
+        if previous is not None:
+            output['growth_since_previous'] = [self._diff(s)
+                                               for s in current.compare_to(previous, 'lineno')[:self.top]]
+        return output
+
+
+def register_memory_diagnostics(app, diagnostics: MemoryDiagnostics, token: str):
+    '''Register the /admin/memory route.'''
+    from flask import request, jsonify
+    from .admin import admin_required
+
+    @app.route('/admin/memory', methods=['GET'])
+    @admin_required(token)
+    def _admin_memory():
+        '''The memory report, ?fresh=0 to use the latest periodic snapshot'''
+        fresh = request.args.get('fresh', '1') != '0'
+        return jsonify({'status': 'success', 'body': diagnostics.report(fresh)})
+
+    return diagnostics
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    md = MemoryDiagnostics(interval=3600, top=5).start()
+    cache = {'a': np.ones((1000, 1000))}
+    md.register_cache('cache', lambda: cache)
+    leak = [bytearray(1024) for _ in range(1000)]
+    report = md.report()
+    print(report['rss'], report['caches'], report['growth_since_start'][:2])
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,222 @@
+"""
+File: metrics.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The per-stage latency of the routes.
+    The stages are timed by StageTimer, and recorded into the in-process histograms
+    labeled by route, stage, project_name and model_type.
+    The histograms are rendered in the Prometheus text format for /metrics.
+
+    @timed('predict')
+    def _predict():
+        with stage('parse'):
+            ...
+        set_labels(project_name=..., model_type=...)
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import math
+import time
+import bisect
+import inspect
+import functools
+import threading
+
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+# The buckets in seconds, the trainings take tens of seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+LABELS = ('route', 'stage', 'project_name', 'model_type')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+class Histogram:
+    '''The histogram of the durations.'''
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    '''The histograms of the stage durations, keyed by the labels.'''
+
+    def __init__(self, name: str = 'bci_stage_duration_seconds', buckets: tuple = BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels):
+        key = tuple(str(labels.get(k, '')) for k in LABELS)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    def render(self) -> str:
+        '''The histograms in the Prometheus text format.'''
+        lines = [f'# HELP {self.name} The duration of the route stages.',
+                 f'# TYPE {self.name} histogram']
+        with self.lock:
+            items = [(key, list(h.counts), h.sum, h.count)
+                     for key, h in sorted(self.histograms.items())]
+        for key, counts, total, count in items:
+            labels = ','.join(f'{k}="{self._escape(v)}"'
+                              for k, v in zip(LABELS, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = '+Inf' if bound == math.inf else repr(bound)
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    '''
+    Time the stages of one request.
+    The durations are recorded on finish, when the labels like the model_type are known.
+    '''
+
+    def __init__(self, registry: MetricsRegistry, route: str):
+        self.registry = registry
+        self.labels = dict(route=route, project_name='', model_type='')
+        self.records = []
+        self.started = time.perf_counter()
+
+    def set_labels(self, **labels):
+        '''Set the labels of the request.'''
+        self.labels.update({k: v for k, v in labels.items() if v is not None})
+
+    @contextmanager
+    def stage(self, name: str, **labels):
+        '''Time the stage, the labels override the ones of the request.'''
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((name, time.perf_counter() - tic, labels))
+
+    def wrap(self, name: str, func):
+        '''Time the func as the stage, for the func running in the other thread.'''
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def finish(self):
+        self.records.append(('total', time.perf_counter() - self.started, {}))
+        for name, cost, labels in self.records:
+            self.registry.observe(cost, **dict(self.labels, stage=name, **labels))
+
+
+METRICS = MetricsRegistry()
+_CURRENT: ContextVar = ContextVar('stage_timer', default=None)
+
+
+def timed(route: str, registry: MetricsRegistry = METRICS):
+    '''Time the route, the stages inside are timed by stage().'''
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            # The async views of the ASGI mode
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                timer = StageTimer(registry, route)
+                token = _CURRENT.set(timer)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _CURRENT.reset(token)
+                    timer.finish()
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = StageTimer(registry, route)
+            token = _CURRENT.set(timer)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _CURRENT.reset(token)
+                timer.finish()
+        return wrapper
+    return decorator
+
+
+def current_timer():
+    '''The timer of the current request, None outside the timed routes.'''
+    return _CURRENT.get()
+
+
+def stage(name: str, **labels):
+    '''Time the stage of the current request, nothing is done outside the timed routes.'''
+    timer = _CURRENT.get()
+    return timer.stage(name, **labels) if timer else nullcontext()
+
+
+def set_labels(**labels):
+    '''Set the labels of the current request.'''
+    timer = _CURRENT.get()
+    if timer:
+        timer.set_labels(**labels)
+
+
+def wrap(name: str, func):
+    '''Time the func running in the other thread as the stage of the current request.'''
+    timer = _CURRENT.get()
+    return timer.wrap(name, func) if timer else func
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    @timed('predict')
+    def predict():
+        set_labels(project_name='project', model_type='AttentionModel')
+        with stage('fetch'):
+            time.sleep(0.01)
+        with stage('inference'):
+            time.sleep(0.002)
+
+    for _ in range(3):
+        predict()
+    print(METRICS.render())
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
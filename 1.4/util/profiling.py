@@ -0,0 +1,208 @@
+"""
+File: profiling.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The opt-in profiling of the live server.
+
+    - StackSampler samples the stacks of all the threads, the waitress threads included,
+      for the bounded time, and returns the collapsed stacks for the flamegraph tools.
+    - RequestProfiler runs cProfile for the request with the profile header,
+      the stats are saved as the .prof file, and its path is returned in the response header.
+
+    Nothing is registered when the profiling is disabled, so there is no overhead.
+
+    curl -H "X-Admin-Token: $TOKEN" "http://localhost:7384/admin/profile?seconds=10" > predict.folded
+    flamegraph.pl predict.folded > predict.svg
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import sys
+import hmac
+import math
+import time
+import cProfile
+import threading
+
+from pathlib import Path
+from collections import Counter
+
+from .log import logger
+
+# The shortest sampling interval, the shorter one holds the GIL from the server threads
+MIN_INTERVAL = 0.001
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def _frame_name(frame) -> str:
+    # The first line of the function, so the samples of the function are merged
+    code = frame.f_code
+    return f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    '''Sample the stacks of all the threads, only one sampling runs at a time.'''
+
+    def __init__(self, max_seconds: float = 60):
+        self.max_seconds = max_seconds
+        self.lock = threading.Lock()
+
+    def sample(self, seconds: float, interval: float = 0.005) -> Counter:
+        '''
+        Sample the stacks.
+
+        :param seconds float: the sampling time, it is bounded by max_seconds.
+        :param interval float: the sampling interval.
+        :return Counter: the collapsed stacks, {'thread;outer;...;inner': count}.
+        '''
+        seconds = min(seconds, self.max_seconds)
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError('The other sampling is running')
+        try:
+            stacks = Counter()
+            me = threading.get_ident()
+            stop = time.perf_counter() + seconds
+            while time.perf_counter() < stop:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    stacks[';'.join(reversed(stack))] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        '''The collapsed stacks file of the flamegraph tools.'''
+        return '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common()) + '\n'
+
+
+class RequestProfiler:
+    '''The WSGI middleware, run cProfile for the requests with the profile header.'''
+
+    def __init__(self, wsgi_app, directory: Path, header: str = 'X-Profile', token: str = ''):
+        '''
+        :param directory Path: the directory of the .prof files.
+        :param header str: the header switches on the profile.
+        :param token str: the admin token, the header value must match it.
+        '''
+        self.wsgi_app = wsgi_app
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.environ_key = 'HTTP_' + header.upper().replace('-', '_')
+        self.header = header
+        self.token = token
+        # The profiler is process-wide on the newer pythons, one request is profiled at a time
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        given = environ.get(self.environ_key)
+        if not self.token or given is None or not hmac.compare_digest(given, self.token):
+            return self.wsgi_app(environ, start_response)
+        if not self.lock.acquire(blocking=False):
+            logger.warning('The other request is being profiled, skip the profile')
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self.lock.release()
+
+    def _profile(self, environ, start_response):
+        route = environ.get('PATH_INFO', '').strip('/').replace('/', '-') or 'root'
+        path = self.directory.joinpath(
+            f'{route}-{time.time():.6f}-{threading.get_ident()}.prof')
+
+        def _start_response(status, headers, exc_info=None):
+            headers = list(headers) + [(f'{self.header}-Path', path.as_posix())]
+            return start_response(status, headers, exc_info)
+
+        profile = cProfile.Profile()
+        profile.enable()
+        iterable = None
+        try:
+            # The body is consumed in the profile
+            iterable = self.wsgi_app(environ, _start_response)
+            return list(iterable)
+        finally:
+            # The WSGI iterable is closed by its consumer, it is consumed here
+            if hasattr(iterable, 'close'):
+                iterable.close()
+            profile.disable()
+            profile.dump_stats(path)
+            logger.info(f'Request profile saved: {path}')
+
+
+def register_profiling(app, conf, token: str, directory: Path):
+    '''
+    Register the /admin/profile route and the request profiler.
+
+    :param app Flask: the app.
+    :param conf: the config.admin.profiling.
+    :param token str: the admin token.
+    :param directory Path: the directory of the .prof files.
+    '''
+    from flask import Response, request, jsonify
+    from .admin import admin_required
+
+    sampler = StackSampler(conf.max_seconds)
+
+    @app.route('/admin/profile', methods=['GET'])
+    @admin_required(token)
+    def _admin_profile():
+        '''The collapsed stacks of all the threads'''
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval = float(request.args.get('interval', 0.005))
+            if not (math.isfinite(seconds) and seconds > 0):
+                raise ValueError('The seconds must be positive')
+            if not (math.isfinite(interval) and MIN_INTERVAL <= interval <= seconds):
+                raise ValueError(f'The interval must be in [{MIN_INTERVAL}, seconds]')
+        except ValueError as e:
+            return jsonify({'status': 'error', 'msg': str(e), 'body': '{}'}), 400
+        try:
+            stacks = sampler.sample(seconds, interval)
+        except RuntimeError as e:
+            return jsonify({'status': 'error', 'msg': str(e), 'body': '{}'}), 409
+        return Response(sampler.collapsed(stacks), mimetype='text/plain')
+
+    app.wsgi_app = RequestProfiler(app.wsgi_app, directory, conf.request_header, token)
+    logger.warning(f'Profiling is enabled, the request profiles are saved in {directory}')
+    return sampler
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    def busy():
+        while True:
+            sum(i * i for i in range(10000))
+
+    threading.Thread(target=busy, name='busy', daemon=True).start()
+    print(StackSampler.collapsed(StackSampler().sample(0.5))[:500])
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
@@ -0,0 +1,124 @@
+"""
+File: response.py
+Author: Chuncheng Zhang
+Date: 2026-10-19
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Trim the responses to the upstream service.
+
+    - The projection, the client asks for the fields of the body it needs,
+      by ?fields=pred,models or by the fields key of the request body.
+      The subject keys are kept, so the response is still matched to the request.
+    - The compression, the responses above the size are compressed
+      by the br (when brotli is installed) or the gzip the client accepts.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2026-10-19 ------------------------
+# Requirements and constants
+import gzip
+
+from .log import logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The keys identify the subject of the response, they are always kept
+SUBJECT_KEYS = ['name', 'org_id', 'user_id', 'project_name']
+
+COMPRESSIBLE = ('application/json', 'text/')
+
+
+# %% ---- 2026-10-19 ------------------------
+# Function and class
+def requested_fields(args, body) -> list:
+    '''
+    The fields the client asks for, None if the whole body is asked.
+
+    :param args: the query args of the request.
+    :param body: the request body, its fields key is the list or the comma separated str.
+    '''
+    fields = args.get('fields')
+    if fields is None and isinstance(body, dict):
+        fields = body.get('fields')
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return [f.strip() for f in fields if f.strip()]
+
+
+def project(body, fields: list):
+    '''Keep the fields and the subject keys of the body.'''
+    if fields is None or not isinstance(body, dict):
+        return body
+    return {k: v for k, v in body.items() if k in fields or k in SUBJECT_KEYS}
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    # The mtime is fixed, the same body is compressed to the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def register_compression(app, conf):
+    '''
+    Compress the responses after the requests.
+
+    :param app Flask: the app.
+    :param conf: the config.response.compression.
+    '''
+    from flask import request
+
+    encodings = [e for e in conf.encodings if e != 'br' or brotli is not None]
+
+    @app.after_request
+    def _compress(response):
+        if (response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE)):
+            return response
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < conf.min_size:
+            return response
+
+        response.set_data(compress(data, encoding, conf.level))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    logger.info(f'Response compression: {encodings}, above {conf.min_size} bytes')
+    return encodings
+
+
+# %% ---- 2026-10-19 ------------------------
+# Play ground
+if __name__ == '__main__':
+    body = dict(name='name', org_id='orgId', user_id='userId', project_name='projectName',
+                label_content='{}', data=[[0.0] * 250] * 8, pred=[0.5])
+    fields = requested_fields({}, dict(fields='pred'))
+    print(fields, project(body, fields))
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending
+
+
+# %% ---- 2026-10-19 ------------------------
+# Pending